@@ -0,0 +1,134 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+def user_cache_key(user_id):
+    return f'accounts:user:{user_id}'
+
+
+def invalidate_cached_user(user_id):
+    caches[settings.AUTH_USER_CACHE_ALIAS].delete(user_cache_key(user_id))
+
+
+class VerifiedTokenCache:
+    """
+    Small thread-safe LRU of raw token -> validated token, so a token's signature is
+    checked once per process rather than on every request. Entries are dropped once
+    the token's own expiry passes.
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._tokens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, raw_token):
+        with self._lock:
+            token = self._tokens.get(raw_token)
+            if token is None:
+                return None
+            if token.get('exp', 0) <= time.time():
+                del self._tokens[raw_token]
+                return None
+            self._tokens.move_to_end(raw_token)
+            return token
+
+    def set(self, raw_token, token):
+        with self._lock:
+            self._tokens[raw_token] = token
+            self._tokens.move_to_end(raw_token)
+            while len(self._tokens) > self.max_size:
+                self._tokens.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._tokens.clear()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication without the per-request user query.
+
+    Verified tokens are kept in an in-process LRU; a token never changes, so that is safe
+    in every worker. With AUTH_USER_CACHE_ENABLED, users are read from the Django cache
+    (AUTH_USER_CACHE_ALIAS) for AUTH_USER_CACHE_TIMEOUT seconds, and saving or deleting a
+    user drops its entry (see accounts.signals). The setting is only on by default with a
+    cache every worker shares: then deactivation and password changes apply on the next
+    request in every worker. Changes made with queryset.update() bypass the signals and are
+    picked up when the entry expires. Without it, the user is read from the database on
+    every request.
+    """
+    token_cache = VerifiedTokenCache(settings.AUTH_TOKEN_CACHE_SIZE)
+
+    def get_validated_token(self, raw_token):
+        token = self.token_cache.get(raw_token)
+        if token is None:
+            token = super().get_validated_token(raw_token)
+            self.token_cache.set(raw_token, token)
+        return token
+
+    async def aauthenticate(self, request):
+        """
+        authenticate() for async views: the user lookup awaits the cache and the async ORM.
+        """
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+
+        return await self.aget_user(validated_token), validated_token
+
+    def get_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        cache = caches[settings.AUTH_USER_CACHE_ALIAS]
+        user = cache.get(user_cache_key(user_id)) if settings.AUTH_USER_CACHE_ENABLED else None
+        if user is None:
+            try:
+                user = self.user_model.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            if settings.AUTH_USER_CACHE_ENABLED:
+                cache.set(user_cache_key(user_id), user, timeout=settings.AUTH_USER_CACHE_TIMEOUT)
+        return self.check_user(user, validated_token)
+
+    async def aget_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        cache = caches[settings.AUTH_USER_CACHE_ALIAS]
+        user = await cache.aget(user_cache_key(user_id)) if settings.AUTH_USER_CACHE_ENABLED else None
+        if user is None:
+            try:
+                user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            if settings.AUTH_USER_CACHE_ENABLED:
+                await cache.aset(user_cache_key(user_id), user, timeout=settings.AUTH_USER_CACHE_TIMEOUT)
+        return self.check_user(user, validated_token)
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+    def check_user(self, user, validated_token):
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
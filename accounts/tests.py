@@ -3,6 +3,13 @@ from rest_framework import status
 from rest_framework.test import APITestCase
 #The APITestCase class provides a test client that supports JSON requests and simplifies testing of DRF endpoints.
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from .authentication import VerifiedTokenCache
+from . import urls as account_urls
+from expense_tracker.testing import QueryBudgetMixin
+import time
 
 User = get_user_model()
 
@@ -97,3 +104,115 @@ class UserRegistrationLoginTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         # Expect the error to indicate that username is required.
         self.assertIn('username', response.data)
+
+
+@override_settings(AUTH_USER_CACHE_ENABLED=True)
+class CachedJWTAuthenticationTests(APITestCase):
+    """
+    Authenticated requests reuse verified tokens and cached users instead of querying auth_user.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="jwtuser", password="JwtPass123!",
+            email="jwtuser@example.com", first_name="Jwt", last_name="User"
+        )
+        response = self.client.post(reverse('token_obtain_pair'), {
+            "username": "jwtuser", "password": "JwtPass123!"
+        }, format='json')
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        self.list_url = reverse('expense-list-create')
+
+    @override_settings(EXPENSE_CACHE_ENABLED=True)
+    def test_repeated_requests_skip_user_query(self):
+        self.assertEqual(self.client.get(self.list_url).status_code, status.HTTP_200_OK)
+        # Token, user and the list response all come from caches
+        with self.assertNumQueries(0):
+            response = self.client.get(self.list_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_user_changes_are_seen(self):
+        self.client.get(self.list_url)
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(self.list_url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.user.is_active = True
+        self.user.save()
+        self.assertEqual(self.client.get(self.list_url).status_code, status.HTTP_200_OK)
+
+        self.user.delete()
+        self.assertEqual(self.client.get(self.list_url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(AUTH_USER_CACHE_ENABLED=False)
+    def test_user_read_every_request_without_a_shared_cache(self):
+        # The default with local memory: another worker's save could never drop this worker's copy
+        self.client.get(self.list_url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.list_url)
+        self.assertTrue(any('auth_user' in query['sql'] for query in queries.captured_queries))
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.client.get(self.list_url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_invalid_token_rejected(self):
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer not.a.token")
+        self.assertEqual(self.client.get(self.list_url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_token_cache_is_bounded_and_honours_expiry(self):
+        cache = VerifiedTokenCache(max_size=2)
+        future = time.time() + 60
+        cache.set(b'a', {'exp': future})
+        cache.set(b'b', {'exp': future})
+        cache.get(b'a')
+        cache.set(b'c', {'exp': future})
+        # b was the least recently used entry
+        self.assertIsNone(cache.get(b'b'))
+        self.assertIsNotNone(cache.get(b'a'))
+        self.assertIsNotNone(cache.get(b'c'))
+
+        cache.set(b'old', {'exp': time.time() - 1})
+        self.assertIsNone(cache.get(b'old'))
+
+
+class AccountQueryBudgetTests(QueryBudgetMixin, APITestCase):
+    """
+    Every account endpoint runs within a fixed number of queries and never repeats one.
+    """
+    budget_urlconf = account_urls
+    query_budgets = {
+        ('register', 'POST'): 2,
+        ('login', 'POST'): 9, #Django session login: session insert/update and last_login
+        ('token_obtain_pair', 'POST'): 1,
+        ('token_refresh', 'POST'): 1,
+        ('token_verify', 'POST'): 0,
+    }
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="budgetuser", password="BudgetPass123!",
+            email="budgetuser@example.com", first_name="Budget", last_name="User"
+        )
+        self.credentials = {"username": "budgetuser", "password": "BudgetPass123!"}
+
+    def test_register(self):
+        with self.assertQueryBudget('register', 'POST'):
+            response = self.client.post(reverse('register'), {
+                "username": "newbudgetuser", "password": "StrongPass123!", "password2": "StrongPass123!",
+                "email": "newbudget@example.com", "first_name": "New", "last_name": "Budget"
+            }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_login(self):
+        with self.assertQueryBudget('login', 'POST'):
+            response = self.client.post(reverse('login'), self.credentials, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_tokens(self):
+        with self.assertQueryBudget('token_obtain_pair', 'POST'):
+            tokens = self.client.post(reverse('token_obtain_pair'), self.credentials, format='json').data
+        with self.assertQueryBudget('token_refresh', 'POST'):
+            response = self.client.post(reverse('token_refresh'), {"refresh": tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with self.assertQueryBudget('token_verify', 'POST'):
+            response = self.client.post(reverse('token_verify'), {"token": tokens['access']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -4,6 +4,8 @@ from rest_framework import status
 from django.contrib.auth import login
 from .serializers import UserRegistrationSerializer, UserLoginSerializer
 from rest_framework.permissions import AllowAny
+from rest_framework_simplejwt import views as jwt_views
+from expense_tracker.metrics import observe_serialization
 import logging
 logger = logging.getLogger(__name__)
 
@@ -28,7 +30,9 @@ class UserRegistrationView(APIView):
 
     def post(self, request):
         serializer = UserRegistrationSerializer(data=request.data)
-        if serializer.is_valid():
+        with observe_serialization(request):
+            valid = serializer.is_valid()
+        if valid:
             '''
             the is_valid method automatically:
             Triggers field-level validation.
@@ -60,7 +64,9 @@ class UserLoginView(APIView):
     
     def post(self, request):
         serializer = UserLoginSerializer(data=request.data)
-        if serializer.is_valid():
+        with observe_serialization(request):
+            valid = serializer.is_valid()
+        if valid:
             user = serializer.validated_data['user']
             login(request, user) #log the user in using Django's session system
             #we optionally call Django’s login() method if you plan to use session-based authentication. Later, when integrating JWT, the authentication mechanism will change.
@@ -68,3 +74,23 @@ class UserLoginView(APIView):
         
         logger.info("Login failed: %s", serializer.errors)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class ObservedTokenViewMixin:
+    #simplejwt's token views do all of their work (credential checks, signing) in serializer
+    #validation, so the whole post is reported as serialization time.
+    def post(self, request, *args, **kwargs):
+        with observe_serialization(request):
+            return super().post(request, *args, **kwargs)
+
+
+class TokenObtainPairView(ObservedTokenViewMixin, jwt_views.TokenObtainPairView):
+    pass
+
+
+class TokenRefreshView(ObservedTokenViewMixin, jwt_views.TokenRefreshView):
+    pass
+
+
+class TokenVerifyView(ObservedTokenViewMixin, jwt_views.TokenVerifyView):
+    pass
@@ -0,0 +1,332 @@
+"""
+Load-test the API end to end and compare the results with a stored baseline.
+
+    DB_ENGINE=sqlite python -m benchmarks.api --expenses 10000
+    python -m benchmarks.api --users 50 --expenses 1000000 --target gunicorn --concurrency 8
+    python -m benchmarks.api --output benchmarks/baseline.json     # record a baseline on this machine
+    python -m benchmarks.api --baseline benchmarks/baseline.json   # then compare later runs with it
+    python -m benchmarks.api --target uvicorn --concurrency 32 --db-latency 20 --scenarios list detail
+
+A throwaway test database is seeded with --expenses rows spread over --users users,
+then every scenario (token, list, filter, search, summary, detail, create, update)
+sends --requests requests through Django's test client (--target inprocess) or over
+HTTP to a gunicorn started with gunicorn.conf.py: sync WSGI workers (--target gunicorn)
+or uvicorn ASGI workers serving the async expense views (--target uvicorn). Throughput
+and p50/p95/p99 latency are printed and optionally written as JSON. With --baseline, a
+scenario whose p95 grew or throughput dropped by more than --tolerance fails the run
+with exit status 1. Results are only comparable on the same machine, database and data,
+so no baseline is committed: record one with --output before using --baseline.
+
+--db-latency adds that many milliseconds to every query the server runs (see
+benchmarks.latency), to compare the WSGI and ASGI targets under I/O-bound load: run
+both with the same --workers and --concurrency and compare throughput and p99.
+--db-pool runs the server with DB_POOL=True, to measure what the connection pool saves
+per request (benchmarks.connections isolates the connection cost itself).
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from benchmarks.common import BENCHMARK_PASSWORD, create_users, seed, test_database
+
+from django.db import connection
+from django.test import Client
+
+from expenses.models import Expense
+from expenses.seeding import SEARCH_TERMS
+
+AUTH = '/api/v1/auth'
+EXPENSES = '/api/v1/expenses'
+SCENARIOS = ['token', 'list', 'filter', 'search', 'summary', 'detail', 'create', 'update']
+
+
+class InProcessClient:
+    """
+    Requests through Django's test client: the full middleware and view stack without a server.
+    """
+    def request(self, method, path, body=None, token=None):
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {token}'} if token else {}
+        data = json.dumps(body) if body is not None else None
+        response = Client().generic(method, path, data or '', content_type='application/json', **headers)
+        return response.status_code, response.content
+
+
+class HTTPClient:
+    def __init__(self, base_url):
+        self.base_url = base_url
+
+    def request(self, method, path, body=None, token=None):
+        request = urllib.request.Request(
+            self.base_url + path, method=method,
+            data=json.dumps(body).encode('utf-8') if body is not None else None,
+            headers={'Content-Type': 'application/json', **({'Authorization': f'Bearer {token}'} if token else {})},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+
+class GunicornServer:
+    """
+    gunicorn with the project's gunicorn.conf.py, pointed at the benchmark database.
+    With asgi=True it runs uvicorn workers and routes the expense endpoints to the async views.
+    """
+    def __init__(self, database_env, workers, asgi=False, db_latency=0, db_pool=False):
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            self.port = sock.getsockname()[1]
+        self.env = {
+            **os.environ, **database_env,
+            'GUNICORN_BIND': f'127.0.0.1:{self.port}',
+            'GUNICORN_WORKERS': str(workers),
+            'PROMETHEUS_MULTIPROC_DIR': tempfile.mkdtemp(prefix='expense_benchmark_metrics_'),
+            'GUNICORN_WORKER_CLASS': 'uvicorn_worker.UvicornWorker' if asgi else 'sync',
+            'ASYNC_EXPENSE_VIEWS': str(asgi),
+            'DB_POOL': str(db_pool),
+        }
+        if db_latency:
+            self.env['BENCHMARK_DB_LATENCY_MS'] = str(db_latency)
+            self.env['GUNICORN_APP'] = f"benchmarks.latency:{'asgi' if asgi else 'wsgi'}_application"
+        self.process = None
+
+    def __enter__(self):
+        self.process = subprocess.Popen(
+            ['gunicorn', '-c', 'gunicorn.conf.py'],
+            env=self.env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        client = HTTPClient(self.base_url)
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            try:
+                client.request('GET', f'{EXPENSES}/')
+                return self
+            except OSError:
+                time.sleep(0.2)
+        self.process.terminate()
+        raise RuntimeError("gunicorn did not start within 30 seconds")
+
+    def __exit__(self, *exc_info):
+        self.process.terminate()
+        self.process.wait(timeout=30)
+
+    @property
+    def base_url(self):
+        return f'http://127.0.0.1:{self.port}'
+
+
+class Workload:
+    """
+    Builds the requests of each scenario, cycling through the benchmark users.
+    """
+    def __init__(self, client, users):
+        self.client = client
+        self.users = users
+        self.tokens = {}
+        self.expense_ids = {}
+        for user in users:
+            status, content = client.request(
+                'POST', f'{AUTH}/token/', {'username': user.username, 'password': BENCHMARK_PASSWORD}
+            )
+            if status != 200:
+                raise RuntimeError(f"Could not obtain a token for {user.username}: {status} {content[:200]}")
+            self.tokens[user.pk] = json.loads(content)['access']
+            self.expense_ids[user.pk] = list(
+                Expense.objects.filter(user=user).order_by('-date', '-id').values_list('id', flat=True)[:100]
+            ) or [0]
+        categories = [code for code, _ in Expense.CATEGORY_CHOICES]
+        self.categories = itertools.cycle(categories)
+        self.words = itertools.cycle(SEARCH_TERMS)
+        self.counter = itertools.count()
+
+    def next_request(self, scenario):
+        i = next(self.counter)
+        user = self.users[i % len(self.users)]
+        token = self.tokens[user.pk]
+        expense_id = self.expense_ids[user.pk][i % len(self.expense_ids[user.pk])]
+        if scenario == 'token':
+            return 'POST', f'{AUTH}/token/', {'username': user.username, 'password': BENCHMARK_PASSWORD}, None
+        if scenario == 'list':
+            return 'GET', f'{EXPENSES}/?page_size=50', None, token
+        if scenario == 'filter':
+            return 'GET', f'{EXPENSES}/?filter=past_month&category={next(self.categories)}&page_size=50', None, token
+        if scenario == 'search':
+            return 'GET', f'{EXPENSES}/?search={next(self.words)}&page_size=50', None, token
+        if scenario == 'summary':
+            return 'GET', f'{EXPENSES}/summary/?group_by=month', None, token
+        if scenario == 'detail':
+            return 'GET', f'{EXPENSES}/{expense_id}/', None, token
+        if scenario == 'create':
+            return 'POST', f'{EXPENSES}/', {
+                'amount': f'{i % 500 + 1}.25', 'date': str(date.today() - timedelta(days=i % 365)),
+                'description': f'benchmark {i}', 'category': next(self.categories),
+            }, token
+        if scenario == 'update':
+            return 'PATCH', f'{EXPENSES}/{expense_id}/', {'amount': f'{i % 500 + 1}.75'}, token
+        raise ValueError(f"Unknown scenario: {scenario}")
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def run_scenario(workload, scenario, requests, concurrency, warmup):
+    for _ in range(warmup):
+        workload.client.request(*workload.next_request(scenario))
+
+    def timed(_):
+        method, path, body, token = workload.next_request(scenario)
+        started = time.perf_counter()
+        status, _content = workload.client.request(method, path, body, token)
+        return time.perf_counter() - started, status < 400
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            samples = list(pool.map(timed, range(requests)))
+    else:
+        samples = [timed(i) for i in range(requests)]
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency * 1000 for latency, _ok in samples)
+    return {
+        'requests': requests,
+        'errors': sum(1 for _latency, ok in samples if not ok),
+        'rps': round(requests / elapsed, 1),
+        'mean_ms': round(statistics.fmean(latencies), 2),
+        'p50_ms': round(percentile(latencies, 0.50), 2),
+        'p95_ms': round(percentile(latencies, 0.95), 2),
+        'p99_ms': round(percentile(latencies, 0.99), 2),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Return the regressions of `results` against `baseline` as human-readable lines.
+    """
+    for key in ('target', 'database', 'users', 'expenses', 'concurrency', 'db_latency_ms', 'db_pool'):
+        if baseline['meta'].get(key, 0) != results['meta'][key]:
+            return [f"baseline was recorded with {key}={baseline['meta'].get(key)!r}, not {results['meta'][key]!r}"]
+    regressions = []
+    for scenario, current in results['scenarios'].items():
+        previous = baseline['scenarios'].get(scenario)
+        if previous is None:
+            continue
+        if current['errors'] > previous['errors']:
+            regressions.append(f"{scenario}: {current['errors']} errors (baseline {previous['errors']})")
+        if current['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{scenario}: p95 {current['p95_ms']}ms (baseline {previous['p95_ms']}ms)")
+        if current['rps'] < previous['rps'] * (1 - tolerance):
+            regressions.append(f"{scenario}: {current['rps']} req/s (baseline {previous['rps']} req/s)")
+    return regressions
+
+
+def print_results(results):
+    print(f"{'scenario':<10} {'req/s':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'errors':>7}")
+    for scenario, stats in results['scenarios'].items():
+        print(
+            f"{scenario:<10} {stats['rps']:>9.1f} {stats['p50_ms']:>7.2f}ms {stats['p95_ms']:>7.2f}ms "
+            f"{stats['p99_ms']:>7.2f}ms {stats['errors']:>7}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--expenses', type=int, default=10000, help="Expenses seeded in total (1k to 10M).")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed of the generated data.")
+    parser.add_argument('--seed-workers', type=int, default=1, help="Loader processes for seeding (PostgreSQL).")
+    parser.add_argument('--requests', type=int, default=200, help="Measured requests per scenario.")
+    parser.add_argument('--warmup', type=int, default=10, help="Unmeasured requests per scenario.")
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument('--target', choices=['inprocess', 'gunicorn', 'uvicorn'], default='inprocess')
+    parser.add_argument('--concurrency', type=int, default=1, help="Parallel clients (server targets only).")
+    parser.add_argument('--workers', type=int, default=3, help="gunicorn worker processes.")
+    parser.add_argument(
+        '--db-latency', type=float, default=0, help="Milliseconds added to every query (server targets only)."
+    )
+    parser.add_argument(
+        '--db-pool', action='store_true', help="Serve with the psycopg connection pool (server targets only)."
+    )
+    parser.add_argument('--output', help="Write the results as JSON to this file.")
+    parser.add_argument('--baseline', help="Fail if the results regress against this JSON file.")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed relative regression (default 20%%).")
+    args = parser.parse_args()
+    if args.target == 'inprocess' and (args.concurrency != 1 or args.db_latency or args.db_pool):
+        parser.error("--concurrency, --db-latency and --db-pool need --target gunicorn or uvicorn")
+    baseline = None
+    if args.baseline:
+        # Checked before seeding, which can take minutes
+        if not os.path.exists(args.baseline):
+            parser.error(
+                f"baseline {args.baseline} does not exist. Baselines depend on the machine and database, so "
+                f"none is committed: record one here with the same options and --output {args.baseline}, "
+                f"then rerun with --baseline {args.baseline}."
+            )
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+
+    with test_database() as database_env:
+        started = time.perf_counter()
+        users = create_users(args.users)
+        seed(users, args.expenses, seed=args.seed, workers=args.seed_workers)
+        print(f"Seeded {args.expenses} expenses for {args.users} users in {time.perf_counter() - started:.1f}s")
+
+        results = {
+            'meta': {
+                'target': args.target, 'database': connection.vendor, 'users': args.users,
+                'expenses': args.expenses, 'seed': args.seed, 'requests': args.requests,
+                'concurrency': args.concurrency, 'db_latency_ms': args.db_latency, 'db_pool': args.db_pool,
+                'python': platform.python_version(),
+                'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            },
+            'scenarios': {},
+        }
+        if args.target != 'inprocess':
+            results['meta']['workers'] = args.workers
+            server = GunicornServer(
+                database_env, args.workers, asgi=args.target == 'uvicorn',
+                db_latency=args.db_latency, db_pool=args.db_pool,
+            )
+            with server:
+                workload = Workload(HTTPClient(server.base_url), users)
+                for scenario in args.scenarios:
+                    results['scenarios'][scenario] = run_scenario(
+                        workload, scenario, args.requests, args.concurrency, args.warmup
+                    )
+        else:
+            workload = Workload(InProcessClient(), users)
+            for scenario in args.scenarios:
+                results['scenarios'][scenario] = run_scenario(workload, scenario, args.requests, 1, args.warmup)
+
+    print_results(results)
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+            output.write('\n')
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("REGRESSIONS against the baseline:", *regressions, sep='\n  ')
+            sys.exit(1)
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%}).")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Helpers shared by the benchmark scripts: Django setup, a throwaway database and data seeding.
+"""
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'expense_tracker.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test.utils import setup_test_environment, teardown_test_environment  # noqa: E402
+
+from expenses import seeding  # noqa: E402
+
+BENCHMARK_PASSWORD = 'BenchmarkPass123!'
+
+
+@contextmanager
+def test_database():
+    """
+    Create a throwaway test database for the duration of the block and yield the
+    environment variables that point another process (e.g. gunicorn) at it.
+    """
+    setup_test_environment()
+    sqlite_path = None
+    if connection.vendor == 'sqlite':
+        #A file rather than the default in-memory database, so other processes can open it.
+        sqlite_path = os.path.join(tempfile.mkdtemp(prefix='expense_benchmark_'), 'db.sqlite3')
+        connection.settings_dict.setdefault('TEST', {})['NAME'] = sqlite_path
+    old_name = connection.creation.create_test_db(verbosity=0)
+    if connection.vendor == 'sqlite':
+        env = {'DB_ENGINE': 'sqlite', 'SQLITE_PATH': sqlite_path}
+    else:
+        env = {'POSTGRES_DB': connection.settings_dict['NAME']}
+    try:
+        yield env
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+        if sqlite_path is not None:
+            shutil.rmtree(os.path.dirname(sqlite_path), ignore_errors=True)
+
+
+def create_users(count, prefix='benchmark'):
+    return seeding.create_users(count, prefix=prefix, password=BENCHMARK_PASSWORD)
+
+
+def seed(users, count, seed=0, workers=1):
+    """
+    Insert `count` synthetic expenses spread over `users` (see expenses.seeding).
+    """
+    return seeding.seed_expenses([user.pk for user in users], count, seed=seed, workers=workers)
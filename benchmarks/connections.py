@@ -0,0 +1,80 @@
+"""
+Per-request cost of the database connection strategies (PostgreSQL only):
+
+    connect     a new connection per request, the default
+    persistent  one connection kept open per worker thread (DB_CONN_MAX_AGE)
+    pool        a psycopg_pool.ConnectionPool shared by the worker's threads (DB_POOL=True)
+
+Each simulated request takes a connection, runs the detail endpoint's query and releases
+the connection the way Django does at the end of a request.
+
+    python -m benchmarks.connections --requests 1000
+
+For the end-to-end effect, compare `python -m benchmarks.api --target gunicorn` with and
+without --db-pool.
+"""
+import argparse
+import statistics
+import sys
+import time
+
+from benchmarks.common import create_users, seed, test_database
+
+from django.db import connection
+
+from expenses.models import Expense
+
+MODES = ['connect', 'persistent', 'pool']
+QUERY = f'SELECT * FROM {Expense._meta.db_table} WHERE id = %s AND user_id = %s'
+
+
+def run(mode, requests, expense):
+    wrapper = connection.copy()
+    if mode == 'pool':
+        wrapper.settings_dict['OPTIONS']['pool'] = {'min_size': 1, 'max_size': 1}
+    timings = []
+    try:
+        for _ in range(requests):
+            started = time.perf_counter()
+            with wrapper.cursor() as cursor:
+                cursor.execute(QUERY, [expense.pk, expense.user_id])
+                cursor.fetchall()
+            if mode != 'persistent':
+                wrapper.close()
+            timings.append((time.perf_counter() - started) * 1000)
+    finally:
+        wrapper.close()
+        if mode == 'pool':
+            wrapper.close_pool()
+    timings.sort()
+    return {
+        'mean_ms': statistics.fmean(timings),
+        'p50_ms': timings[len(timings) // 2],
+        'p95_ms': timings[int(len(timings) * 0.95) - 1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+    args = parser.parse_args()
+    if connection.vendor != 'postgresql':
+        sys.exit("Connection pooling needs PostgreSQL.")
+
+    with test_database():
+        seed(create_users(1), 100)
+        expense = Expense.objects.first()
+        results = {mode: run(mode, args.requests, expense) for mode in args.modes}
+
+    baseline = results.get('connect')
+    print(f"{'mode':<11} {'mean':>9} {'p50':>9} {'p95':>9} {'saved/request':>14}")
+    for mode, stats in results.items():
+        saved = f"{baseline['mean_ms'] - stats['mean_ms']:.2f}ms" if baseline else '-'
+        print(
+            f"{mode:<11} {stats['mean_ms']:>7.2f}ms {stats['p50_ms']:>7.2f}ms {stats['p95_ms']:>7.2f}ms {saved:>14}"
+        )
+
+
+if __name__ == '__main__':
+    main()
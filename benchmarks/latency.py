@@ -0,0 +1,30 @@
+"""
+The project's WSGI and ASGI applications with BENCHMARK_DB_LATENCY_MS milliseconds added to
+every database query, to model a remote or busy database. Used by benchmarks.api --db-latency:
+
+    BENCHMARK_DB_LATENCY_MS=20 gunicorn -c gunicorn.conf.py benchmarks.latency:wsgi_application
+"""
+import os
+import time
+
+from django.db.backends.signals import connection_created
+
+from expense_tracker.asgi import application as asgi_application
+from expense_tracker.wsgi import application as wsgi_application
+
+__all__ = ['asgi_application', 'wsgi_application']
+
+DB_LATENCY = float(os.environ.get('BENCHMARK_DB_LATENCY_MS', 0)) / 1000
+
+
+def slow_execute(execute, sql, params, many, context):
+    time.sleep(DB_LATENCY)
+    return execute(sql, params, many, context)
+
+
+def add_latency(sender, connection, **kwargs):
+    if DB_LATENCY and slow_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(slow_execute)
+
+
+connection_created.connect(add_latency)
@@ -0,0 +1,57 @@
+"""
+Compare the expense list serialization paths at 1k, 10k and 100k rows.
+
+    DB_ENGINE=sqlite python -m benchmarks.list_serialization
+    python -m benchmarks.list_serialization --sizes 1000 10000 100000 --repeat 5
+
+Each path is timed end to end (query, serialization and JSON rendering) against a
+throwaway test database, reporting the best of --repeat runs.
+"""
+import argparse
+import time
+
+from benchmarks.common import create_users, seed, test_database
+
+from rest_framework.renderers import JSONRenderer
+
+from expenses.models import Expense
+from expenses.renderers import FastJSONRenderer
+from expenses.serializers import EXPENSE_COLUMNS, ExpenseSerializer, serialize_expense_rows
+
+
+def serializer_path(queryset):
+    return JSONRenderer().render(ExpenseSerializer(queryset, many=True).data)
+
+
+def fast_path(queryset):
+    return FastJSONRenderer().render(serialize_expense_rows(queryset.values_list(*EXPENSE_COLUMNS)))
+
+
+def best_of(func, queryset, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        output = func(queryset)
+        timings.append(time.perf_counter() - started)
+    return min(timings), output
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with test_database():
+        [user] = create_users(1)
+        seed([user], max(args.sizes))
+        print(f"{'rows':>8} {'serializer':>12} {'fast path':>12} {'speedup':>8}")
+        for size in args.sizes:
+            queryset = Expense.objects.filter(user=user).order_by('-date', '-id')[:size]
+            slow, expected = best_of(serializer_path, queryset, args.repeat)
+            fast, output = best_of(fast_path, queryset, args.repeat)
+            assert output == expected, "fast path output differs from ExpenseSerializer"
+            print(f"{size:>8} {slow * 1000:>10.1f}ms {fast * 1000:>10.1f}ms {slow / fast:>7.1f}x")
+
+if __name__ == '__main__':
+    main()
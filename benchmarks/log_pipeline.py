@@ -0,0 +1,104 @@
+"""
+Time spent in the logging call by request threads during an error burst, for the previous
+synchronous file handler and the queued pipeline (expense_tracker.log.QueueLogHandler).
+
+Each thread logs --records errors with a traceback. --disk-latency adds that many
+milliseconds to every flush to the log file, to model a slow or busy disk:
+
+    python -m benchmarks.log_pipeline --threads 8 --records 500 --disk-latency 2
+"""
+import argparse
+import logging
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+import benchmarks.common  # noqa: F401 (Django setup)
+
+from expense_tracker.log import QueueLogHandler
+
+MODES = ['sync', 'queue']
+VERBOSE = '[{asctime}] {levelname} [{name}] {message}'
+
+
+def slow_flush(handler, latency):
+    flush = handler.flush
+
+    def flush_with_latency():
+        time.sleep(latency)
+        flush()
+    handler.flush = flush_with_latency
+
+
+def make_handler(mode, filename, latency, queue_size):
+    if mode == 'sync':
+        handler = logging.FileHandler(filename)
+        handler.setFormatter(logging.Formatter(VERBOSE, style='{'))
+        file_handler = handler
+    else:
+        handler = QueueLogHandler(filename, queue_size=queue_size, console=False)
+        file_handler = handler.targets[0]
+    if latency:
+        slow_flush(file_handler, latency)
+    return handler
+
+
+def burst(logger, records, timings):
+    for index in range(records):
+        try:
+            raise ValueError(f"failure {index}")
+        except ValueError as e:
+            started = time.perf_counter()
+            logger.error("Unexpected error in %s: %s", 'get', e, exc_info=e)
+            timings.append((time.perf_counter() - started) * 1000)
+
+
+def run(mode, threads, records, latency, queue_size):
+    directory = tempfile.mkdtemp(prefix='expense_log_benchmark_')
+    handler = make_handler(mode, os.path.join(directory, 'benchmark.log'), latency, queue_size)
+    logger = logging.getLogger(f'benchmarks.log_pipeline.{mode}')
+    logger.propagate = False
+    logger.addHandler(handler)
+    timings = []
+    workers = [threading.Thread(target=burst, args=(logger, records, timings)) for _ in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    dropped = getattr(handler, 'dropped', 0)
+    logger.removeHandler(handler)
+    handler.close()
+    timings.sort()
+    return {
+        'mean_ms': statistics.fmean(timings),
+        'p99_ms': timings[int(len(timings) * 0.99) - 1],
+        'max_ms': timings[-1],
+        'burst_s': elapsed,
+        'dropped': dropped,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--records', type=int, default=500, help="Records logged by each thread.")
+    parser.add_argument('--disk-latency', type=float, default=0, help="Milliseconds added to every file flush.")
+    parser.add_argument('--queue-size', type=int, default=10000)
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+    args = parser.parse_args()
+
+    print(f"{'mode':<6} {'mean':>9} {'p99':>9} {'max':>9} {'burst':>8} {'dropped':>8}")
+    for mode in args.modes:
+        stats = run(mode, args.threads, args.records, args.disk_latency / 1000, args.queue_size)
+        print(
+            f"{mode:<6} {stats['mean_ms']:>7.3f}ms {stats['p99_ms']:>7.3f}ms {stats['max_ms']:>7.2f}ms "
+            f"{stats['burst_s']:>7.2f}s {stats['dropped']:>8}"
+        )
+
+
+if __name__ == '__main__':
+    main()
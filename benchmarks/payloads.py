@@ -0,0 +1,75 @@
+"""
+Size and encoding time of an expense list page in each response format and content coding.
+
+    DB_ENGINE=sqlite python -m benchmarks.payloads
+    python -m benchmarks.payloads --sizes 100 1000 10000 --repeat 5
+
+Formats are DRF's stock JSONRenderer (the baseline), FastJSONRenderer (the default),
+columnar JSON and MessagePack; each is measured uncompressed and with gzip and brotli at
+the levels CompressionMiddleware uses. Times are the best of --repeat runs of rendering
+plus compressing.
+"""
+import argparse
+import time
+
+from benchmarks.common import create_users, seed, test_database
+
+from rest_framework.renderers import JSONRenderer
+
+from expense_tracker.middleware import CODINGS, compressor
+from expenses.models import Expense
+from expenses.renderers import ColumnarJSONRenderer, FastJSONRenderer, MessagePackRenderer, msgpack
+from expenses.serializers import EXPENSE_COLUMNS, serialize_expense_rows
+
+RENDERERS = {
+    'json (stock)': JSONRenderer,
+    'json': FastJSONRenderer,
+    'columnar': ColumnarJSONRenderer,
+}
+if msgpack is not None:
+    RENDERERS['msgpack'] = MessagePackRenderer
+
+
+def encode(renderer, data, coding):
+    body = renderer.render(data)
+    if coding is None:
+        return body
+    compress, finish = compressor(coding)
+    return compress(body) + finish()
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        output = func()
+        timings.append(time.perf_counter() - started)
+    return min(timings), output
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with test_database():
+        [user] = create_users(1)
+        seed([user], max(args.sizes))
+        print(f"{'rows':>6} {'format':<13} {'coding':<9} {'bytes':>11} {'vs stock':>9} {'encode':>10}")
+        for size in args.sizes:
+            rows = Expense.objects.filter(user=user).order_by('-date', '-id').values_list(*EXPENSE_COLUMNS)[:size]
+            data = serialize_expense_rows(rows)
+            baseline = len(JSONRenderer().render(data))
+            for name, renderer_class in RENDERERS.items():
+                renderer = renderer_class()
+                for coding in (None, *CODINGS):
+                    seconds, body = best_of(lambda: encode(renderer, data, coding), args.repeat)
+                    print(
+                        f"{size:>6} {name:<13} {coding or 'identity':<9} {len(body):>11,} "
+                        f"{len(body) / baseline:>8.1%} {seconds * 1000:>8.2f}ms"
+                    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+System checks for settings that work in a single process but not with several gunicorn
+workers (registered by expenses.apps.ExpensesConfig).
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Error, Tags, Warning, register
+
+SHARED_CACHE_HINT = (
+    "Point CACHE_BACKEND/CACHE_LOCATION at a cache every worker shares, e.g. "
+    "django.core.cache.backends.redis.RedisCache."
+)
+
+
+def is_process_local(alias):
+    """
+    Whether the cache `alias` lives in each process's own memory, so what one worker writes
+    or deletes there is never seen by the others.
+    """
+    return isinstance(caches[alias], LocMemCache)
+
+
+@register(Tags.caches)
+def check_replica_pins(app_configs, **kwargs):
+    if settings.DATABASE_REPLICAS and is_process_local(settings.DB_ROUTING_CACHE_ALIAS):
+        return [Error(
+            "DB_REPLICAS is set, but read-your-writes pins are kept in a local-memory cache: "
+            "after a write, other workers would still read the user's data from a lagging replica.",
+            hint=SHARED_CACHE_HINT,
+            id='expense_tracker.E001',
+        )]
+    return []
+
+
+@register(Tags.caches)
+def check_response_cache(app_configs, **kwargs):
+    if settings.EXPENSE_CACHE_ENABLED and is_process_local(settings.EXPENSE_CACHE_ALIAS):
+        return [Warning(
+            "EXPENSE_CACHE_ENABLED is on with a local-memory cache: a write invalidates cached "
+            "responses only in the worker that handled it, so run a single worker process.",
+            hint=SHARED_CACHE_HINT,
+            id='expense_tracker.W001',
+        )]
+    return []
+
+
+@register(Tags.caches)
+def check_user_cache(app_configs, **kwargs):
+    if settings.AUTH_USER_CACHE_ENABLED and is_process_local(settings.AUTH_USER_CACHE_ALIAS):
+        return [Warning(
+            "AUTH_USER_CACHE_ENABLED is on with a local-memory cache: a deactivated user or a "
+            "changed password is seen only by the worker that saved it, so run a single worker process.",
+            hint=SHARED_CACHE_HINT,
+            id='expense_tracker.W002',
+        )]
+    return []
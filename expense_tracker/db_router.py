@@ -0,0 +1,174 @@
+"""
+Read-replica routing (DB_REPLICAS in settings).
+
+Only views that opt in read from a replica: after authenticating a safe request they call
+use_replica(), which picks one replica for the whole request so its queries see one
+consistent snapshot. Everything else, including every write, uses the primary.
+
+Read-your-writes: every expense write path calls expenses.cache.invalidate_user(), which
+pins the user to the primary for DB_PRIMARY_STICKY_SECONDS. Pins live in the cache, which
+must be shared by all workers (e.g. Redis): with replicas configured, a local-memory cache
+fails the expense_tracker.E001 system check.
+
+Replicas lagging by more than DB_REPLICA_MAX_LAG seconds, or unreachable, are skipped until
+the next check, DB_REPLICA_CHECK_INTERVAL seconds later; with none left reads use the primary.
+"""
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+from .metrics import metrics_enabled, record_replica_lag
+
+logger = logging.getLogger(__name__)
+
+#Seconds the replica is behind: 0 when it has replayed everything it received (an idle primary
+#sends nothing, so the last replay timestamp alone would report ever-growing lag), and 0 on a
+#server that is not a standby at all, such as a second database standing in for a replica.
+LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+#The replica chosen for the current request's reads; None reads from the primary.
+_read_alias = ContextVar('read_alias', default=None)
+
+
+def pin_key(user_id):
+    return f'db:primary:{user_id}'
+
+
+def pin_to_primary(user_id):
+    """
+    Send this user's reads to the primary for the next DB_PRIMARY_STICKY_SECONDS.
+    """
+    if settings.DATABASE_REPLICAS and settings.DB_PRIMARY_STICKY_SECONDS > 0:
+        caches[settings.DB_ROUTING_CACHE_ALIAS].set(pin_key(user_id), True, settings.DB_PRIMARY_STICKY_SECONDS)
+
+
+def is_pinned(user_id):
+    return caches[settings.DB_ROUTING_CACHE_ALIAS].get(pin_key(user_id)) is not None
+
+
+async def ais_pinned(user_id):
+    return await caches[settings.DB_ROUTING_CACHE_ALIAS].aget(pin_key(user_id)) is not None
+
+
+def measure_lag(alias):
+    """
+    Replication lag of the replica in seconds, or None when it can't be reached.
+    """
+    connection = connections[alias]
+    try:
+        if connection.vendor != 'postgresql':
+            connection.ensure_connection()
+            return 0.0
+        with connection.cursor() as cursor:
+            cursor.execute(LAG_SQL)
+            lag = cursor.fetchone()[0]
+    except DatabaseError:
+        logger.warning("Replica %s is unreachable; reading from the primary", alias, exc_info=True)
+        return None
+    return None if lag is None else float(lag)
+
+
+class ReplicaHealth:
+    """
+    Per-process record of each replica's lag, measured at most every DB_REPLICA_CHECK_INTERVAL
+    seconds by the first request that needs it.
+    """
+    def __init__(self):
+        self.checked = {}
+
+    def due(self):
+        now = time.monotonic()
+        return any(
+            alias not in self.checked or now - self.checked[alias][0] >= settings.DB_REPLICA_CHECK_INTERVAL
+            for alias in settings.DATABASE_REPLICAS
+        )
+
+    def lag(self, alias):
+        checked_at, lag = self.checked.get(alias, (None, None))
+        if checked_at is None or time.monotonic() - checked_at >= settings.DB_REPLICA_CHECK_INTERVAL:
+            lag = measure_lag(alias)
+            self.checked[alias] = (time.monotonic(), lag)
+            if lag is not None and lag > settings.DB_REPLICA_MAX_LAG:
+                logger.warning("Replica %s is %.1fs behind; reading from the primary", alias, lag)
+            if metrics_enabled():
+                record_replica_lag(alias, lag)
+        return lag
+
+    def choose(self):
+        """
+        A random replica within DB_REPLICA_MAX_LAG, or None when there is none.
+        """
+        healthy = [
+            alias for alias in settings.DATABASE_REPLICAS
+            if (lag := self.lag(alias)) is not None and lag <= settings.DB_REPLICA_MAX_LAG
+        ]
+        return random.choice(healthy) if healthy else None
+
+
+replica_health = ReplicaHealth()
+
+
+@contextmanager
+def request_routing():
+    """
+    Scope for one request's routing decision: reads use the primary until use_replica()
+    is called inside it, and again once it exits.
+    """
+    token = _read_alias.set(None)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def use_replica(user_id):
+    """
+    Route the rest of the current request's reads to a replica, unless the user has written
+    recently or no replica is healthy. Returns the chosen alias, or None for the primary.
+    """
+    if not settings.DATABASE_REPLICAS or is_pinned(user_id):
+        return None
+    alias = replica_health.choose()
+    _read_alias.set(alias)
+    return alias
+
+
+async def ause_replica(user_id):
+    if not settings.DATABASE_REPLICAS or await ais_pinned(user_id):
+        return None
+    # A due lag check queries the replicas, which must run sync
+    alias = await sync_to_async(replica_health.choose)() if replica_health.due() else replica_health.choose()
+    _read_alias.set(alias)
+    return alias
+
+
+class ReplicaRouter:
+    """
+    Reads go to the replica use_replica() chose for the current request, everything else to
+    the primary. Aliases are always returned explicitly so objects loaded from a replica are
+    still saved to, and their relations read from, the primary outside replica reads.
+    """
+    def db_for_read(self, model, **hints):
+        return _read_alias.get() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication
+        return False if db in settings.DATABASE_REPLICAS else None
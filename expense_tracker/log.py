@@ -0,0 +1,341 @@
+"""
+Non-blocking logging (the 'queue' handler in settings.LOGGING).
+
+Request threads only put records on a bounded in-memory queue; a background thread in each
+process drains it in batches and writes them to size-rotated JSON-lines files (and the
+console). When the queue is full, records are dropped and counted instead of making the
+request wait; the writer reports the number dropped in its next batch.
+"""
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.utils.functional import empty
+
+from .metrics import metrics_enabled, record_log_drop
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+#The request being served by the current thread or task, for the request_id, user_id and
+#elapsed_ms fields of its log records.
+current_request = ContextVar('current_request', default=None)
+
+#Attributes every LogRecord has; anything else was passed with extra={...} and is logged too.
+RECORD_ATTRIBUTES = frozenset(logging.makeLogRecord({}).__dict__) | {'message', 'asctime', 'taskName'}
+
+
+class RequestContext:
+    __slots__ = ('id', 'request', 'started')
+
+    def __init__(self, request_id, request):
+        self.id = request_id
+        self.request = request
+        self.started = time.perf_counter()
+
+    @property
+    def user_id(self):
+        # Only a user authentication already loaded: resolving the lazy one would query the database
+        user = getattr(self.request, 'user', None)
+        if user is None or getattr(user, '_wrapped', None) is empty:
+            return None
+        return user.pk if user.is_authenticated else None
+
+
+class RequestLogMiddleware:
+    """
+    Give every request an id, from its X-Request-ID header or a new one, that is added to
+    its log records and returned in the X-Request-ID response header.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        context = self.context(request)
+        token = current_request.set(context)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_request.reset(token)
+        response['X-Request-ID'] = context.id
+        return response
+
+    async def __acall__(self, request):
+        context = self.context(request)
+        token = current_request.set(context)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_request.reset(token)
+        response['X-Request-ID'] = context.id
+        return response
+
+    def context(self, request):
+        request_id = request.headers.get('X-Request-ID', '')
+        # Client-supplied ids end up in log files: accept only short printable tokens
+        if not (0 < len(request_id) <= 64 and request_id.isprintable() and ' ' not in request_id):
+            request_id = uuid.uuid4().hex
+        return RequestContext(request_id, request)
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    One JSON object per record: time, level, logger, message, the request fields, any
+    `extra` fields and the formatted exception.
+    """
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for name, value in record.__dict__.items():
+            if name not in RECORD_ATTRIBUTES and value is not None:
+                entry[name] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        if record.stack_info:
+            entry['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class BatchRotatingFileHandler(RotatingFileHandler):
+    """
+    RotatingFileHandler that can write a batch of records with one write and one flush,
+    and that several processes (gunicorn workers) can share.
+
+    Each batch's size check, rollover and write hold an exclusive lock on `<filename>.lock`,
+    so only one process rotates the file at a time, and a process whose file was rotated by
+    another one reopens the new file before writing instead of appending to a backup.
+    Without fcntl (Windows) there is no lock: give each process its own file there.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lock_file = None
+        self.lock_pid = None
+
+    def emit_batch(self, records):
+        try:
+            text = ''.join(self.format(record) + self.terminator for record in records)
+            with self.process_lock():
+                if self.stream is not None and self.rotated_elsewhere():
+                    self.stream.close()
+                    self.stream = None
+                if self.stream is None:
+                    self.stream = self._open()
+                if self.maxBytes > 0:
+                    # Everything written so far has been flushed, so the file size is current
+                    size = os.fstat(self.stream.fileno()).st_size
+                    if size and size + len(text.encode(self.encoding or 'utf-8')) > self.maxBytes:
+                        self.doRollover()
+                        if self.stream is None:
+                            self.stream = self._open()
+                self.stream.write(text)
+                self.flush()
+        except Exception:
+            self.handleError(records[-1])
+
+    def rotated_elsewhere(self):
+        """
+        Whether the open stream is no longer the file at baseFilename.
+        """
+        try:
+            return os.stat(self.baseFilename).st_ino != os.fstat(self.stream.fileno()).st_ino
+        except FileNotFoundError:
+            return True
+
+    @contextmanager
+    def process_lock(self):
+        if fcntl is None:
+            yield
+            return
+        # flock locks belong to the open file, which a forked child shares: open one per process
+        if self.lock_pid != os.getpid():
+            self.lock_file = open(self.baseFilename + '.lock', 'a')
+            self.lock_pid = os.getpid()
+        fcntl.flock(self.lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+
+    def close(self):
+        with self.lock:
+            if self.lock_file is not None and self.lock_pid == os.getpid():
+                self.lock_file.close()
+            self.lock_file = self.lock_pid = None
+        super().close()
+
+
+class BatchQueueListener(QueueListener):
+    """
+    QueueListener that takes every queued record, up to batch_size, at once and hands
+    them to handlers with an emit_batch() method in one call.
+    """
+    def __init__(self, queue, handlers, batch_size, dropped):
+        super().__init__(queue, *handlers, respect_handler_level=True)
+        self.batch_size = batch_size
+        self.dropped = dropped
+        self.reported = 0
+
+    def _monitor(self):
+        while True:
+            batch = [self.dequeue(True)]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.dequeue(False))
+                except queue.Empty:
+                    break
+            taken = len(batch)
+            stop = self._sentinel in batch
+            if stop:
+                batch = batch[:batch.index(self._sentinel)]
+            self.handle_batch(batch + self.drop_report())
+            for _ in range(taken):
+                self.queue.task_done()
+            if stop:
+                return
+
+    def drop_report(self):
+        dropped = self.dropped()
+        if dropped == self.reported:
+            return []
+        record = logging.makeLogRecord({
+            'name': __name__, 'levelno': logging.WARNING, 'levelname': 'WARNING',
+            'msg': "Log queue full: dropped %d records (%d since start)",
+            'args': (dropped - self.reported, dropped),
+        })
+        self.reported = dropped
+        return [record]
+
+    def handle_batch(self, records):
+        for handler in self.handlers:
+            accepted = [
+                record for record in records
+                if record.levelno >= handler.level and handler.filter(record)
+            ]
+            if not accepted:
+                continue
+            if hasattr(handler, 'emit_batch'):
+                with handler.lock:
+                    handler.emit_batch(accepted)
+            else:
+                for record in accepted:
+                    handler.handle(record)
+
+    def enqueue_sentinel(self):
+        # The queue may be full: wait for room rather than lose the shutdown signal
+        self.queue.put(self._sentinel, timeout=5)
+
+
+class QueueLogHandler(QueueHandler):
+    """
+    Put records on a bounded queue for a background thread that writes them, in batches,
+    as JSON lines to `filename` (rotated at max_bytes, backup_count old files kept) and,
+    with console=True, as text to stderr.
+
+    Never blocks: a record that finds the queue full is dropped and counted. The writer
+    thread is started on first use in each process, so it survives forking workers, and
+    stopped, after writing out the queue, when logging shuts down at exit.
+    """
+    console_format = '[{asctime}] {levelname} [{name}] {message}'
+
+    def __init__(self, filename, max_bytes=10 * 1024 * 1024, backup_count=5, queue_size=10000,
+                 batch_size=256, console=True):
+        super().__init__(queue.Queue(maxsize=queue_size))
+        file_handler = BatchRotatingFileHandler(
+            filename, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True,
+        )
+        file_handler.setFormatter(JSONFormatter())
+        self.targets = [file_handler]
+        if console:
+            console_handler = logging.StreamHandler()
+            console_handler.setFormatter(logging.Formatter(self.console_format, style='{'))
+            self.targets.append(console_handler)
+        self.batch_size = batch_size
+        self.dropped = 0
+        self.drop_lock = threading.Lock()
+        self.listener = None
+        self.listener_pid = None
+        self.start_lock = threading.Lock()
+
+    def prepare(self, record):
+        """
+        Copy the record with its message merged and the request fields added. Formatting the
+        JSON and the traceback is left to the writer thread.
+        """
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg, record.args = record.getMessage(), None
+        context = current_request.get()
+        if context is not None:
+            record.request_id = getattr(record, 'request_id', context.id)
+            record.user_id = getattr(record, 'user_id', context.user_id)
+            elapsed_ms = round((time.perf_counter() - context.started) * 1000, 2)
+            record.elapsed_ms = getattr(record, 'elapsed_ms', elapsed_ms)
+        return record
+
+    def enqueue(self, record):
+        if self.listener_pid != os.getpid():
+            self.start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # += is a read then a write: request threads dropping at once would lose counts
+            with self.drop_lock:
+                self.dropped += 1
+            if metrics_enabled():
+                record_log_drop(record.levelname)
+
+    def start(self):
+        with self.start_lock:
+            if self.listener_pid == os.getpid():
+                return
+            # A forked child inherits the queue but not the writer thread: start its own
+            self.queue = queue.Queue(maxsize=self.queue.maxsize)
+            self.listener = BatchQueueListener(self.queue, self.targets, self.batch_size, lambda: self.dropped)
+            self.listener.start()
+            self.listener_pid = os.getpid()
+
+    def stop(self):
+        """
+        Write out the queued records and stop the writer thread.
+        """
+        with self.start_lock:
+            if self.listener is not None and self.listener_pid == os.getpid():
+                self.listener.stop()
+            self.listener = self.listener_pid = None
+
+    def flush(self):
+        """
+        Wait until every record queued so far has been written.
+        """
+        if self.listener is not None and self.listener_pid == os.getpid():
+            self.queue.join()
+
+    def close(self):
+        self.stop()
+        for handler in self.targets:
+            handler.close()
+        super().close()
@@ -0,0 +1,210 @@
+import hmac
+import os
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden, HttpResponseNotFound
+
+from .middleware import QueryRecorder
+
+try:
+    import prometheus_client
+    from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, multiprocess
+except ImportError:  # prometheus_client is optional; without it metrics are disabled
+    prometheus_client = None
+
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+#psycopg_pool statistics that are current values; the others count events since the last read.
+POOL_GAUGES = ('pool_min', 'pool_max', 'pool_size', 'pool_available', 'requests_waiting')
+
+if prometheus_client is not None:
+    REQUESTS = Counter(
+        'http_requests_total', "Requests by route, method and response status.",
+        ['route', 'method', 'status'],
+    )
+    LATENCY = Histogram(
+        'http_request_duration_seconds', "Time from the request entering Django to the response leaving it.",
+        ['route', 'method'],
+    )
+    REQUEST_SIZE = Histogram(
+        'http_request_size_bytes', "Request body size.", ['route', 'method'], buckets=SIZE_BUCKETS,
+    )
+    RESPONSE_SIZE = Histogram(
+        'http_response_size_bytes', "Response body size (streamed responses are not counted).",
+        ['route', 'method'], buckets=SIZE_BUCKETS,
+    )
+    DB_TIME = Histogram(
+        'http_request_db_seconds', "Time spent running database queries per request.", ['route', 'method'],
+    )
+    DB_QUERIES = Histogram(
+        'http_request_db_queries', "Database queries per request.", ['route', 'method'],
+        buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50),
+    )
+    SERIALIZATION = Histogram(
+        'serialization_duration_seconds', "Time spent serializing or validating payloads in a view.", ['route'],
+    )
+    DB_POOL = Gauge(
+        'db_pool', "Connection pool sizes and waiting requests, summed over the live workers.",
+        ['alias', 'stat'], multiprocess_mode='livesum',
+    )
+    DB_POOL_EVENTS = Counter(
+        'db_pool_events_total', "Connection pool events and time totals (*_ms) reported by psycopg_pool.",
+        ['alias', 'stat'],
+    )
+    DB_REPLICA_LAG = Gauge(
+        'db_replica_lag_seconds', "Replication lag of each read replica at its last check (+Inf: unreachable).",
+        ['alias'], multiprocess_mode='mostrecent',
+    )
+    LOG_DROPPED = Counter(
+        'log_records_dropped_total', "Log records dropped because the logging queue was full.", ['level'],
+    )
+    BUDGET_ALERTS = Counter(
+        'budget_alerts_total', "Budgets whose monthly spend reached their alert threshold.", ['category'],
+    )
+    RESPONSE_CACHE = Counter(
+        'response_cache_lookups_total', "Response cache lookups by cache (list, timeseries) and result (hit, miss).",
+        ['cache', 'result'],
+    )
+
+
+def metrics_enabled():
+    return prometheus_client is not None and settings.METRICS_ENABLED
+
+
+def route_name(request):
+    #URL names keep the label set small: /api/v1/expenses/42/ is reported as expense-detail.
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None and match.view_name else 'unmatched'
+
+
+@contextmanager
+def observe_serialization(request):
+    """
+    Time a serialization or validation step of the current view.
+    """
+    if not metrics_enabled():
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        SERIALIZATION.labels(route_name(request)).observe(time.perf_counter() - started)
+
+
+class MetricsMiddleware:
+    """
+    Record latency, request/response size, status and database time for every request.
+
+    Under gunicorn, set PROMETHEUS_MULTIPROC_DIR (gunicorn.conf.py does) so every worker
+    writes its samples to a shared directory and /metrics reports the sum across workers.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not metrics_enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        recorder = QueryRecorder()
+        with recorder.record():
+            response = self.get_response(request)
+        self.observe(request, response, time.perf_counter() - started, recorder)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        recorder = QueryRecorder()
+        #Async views query through sync_to_async in the request's own thread, and connections
+        #are per thread, so the recorder is installed (and removed) from that thread.
+        stack = await sync_to_async(recorder.record)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        self.observe(request, response, time.perf_counter() - started, recorder)
+        return response
+
+    def observe(self, request, response, elapsed, recorder):
+        route, method = route_name(request), request.method
+        REQUESTS.labels(route, method, str(response.status_code)).inc()
+        LATENCY.labels(route, method).observe(elapsed)
+        REQUEST_SIZE.labels(route, method).observe(int(request.META.get('CONTENT_LENGTH') or 0))
+        if not response.streaming:
+            RESPONSE_SIZE.labels(route, method).observe(len(response.content))
+        DB_TIME.labels(route, method).observe(recorder.seconds)
+        DB_QUERIES.labels(route, method).observe(recorder.count)
+        for alias in connections:
+            pool = getattr(connections[alias], 'pool', None)
+            if pool is not None:
+                record_pool_stats(alias, pool)
+
+
+def record_pool_stats(alias, pool):
+    """
+    Publish a psycopg_pool.ConnectionPool's statistics (DB_POOL in settings). The event
+    counters are read with pop_stats(), which resets them, so each event is counted once.
+    """
+    for stat, value in pool.pop_stats().items():
+        if stat in POOL_GAUGES:
+            DB_POOL.labels(alias, stat).set(value)
+        else:
+            DB_POOL_EVENTS.labels(alias, stat).inc(value)
+
+
+def record_replica_lag(alias, lag):
+    """
+    Publish a read replica's lag as measured by expense_tracker.db_router.
+    """
+    DB_REPLICA_LAG.labels(alias).set(float('inf') if lag is None else lag)
+
+
+def record_log_drop(level):
+    LOG_DROPPED.labels(level).inc()
+
+
+def record_budget_alert(category):
+    BUDGET_ALERTS.labels(category).inc()
+
+
+def record_cache_lookup(cache, hit):
+    RESPONSE_CACHE.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def get_registry():
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return prometheus_client.REGISTRY
+
+
+def metrics_view(request):
+    """
+    Prometheus text exposition of all metrics. Scrapers must send METRICS_TOKEN as a
+    bearer token; without a token configured, only METRICS_PUBLIC=True allows access.
+    """
+    if not metrics_enabled():
+        return HttpResponseNotFound()
+    if settings.METRICS_TOKEN:
+        expected = f'Bearer {settings.METRICS_TOKEN}'.encode()
+        if not hmac.compare_digest(request.headers.get('Authorization', '').encode(), expected):
+            return HttpResponseForbidden()
+    elif not settings.METRICS_PUBLIC:
+        return HttpResponseForbidden()
+    return HttpResponse(
+        prometheus_client.generate_latest(get_registry()),
+        content_type=prometheus_client.CONTENT_TYPE_LATEST,
+    )
@@ -0,0 +1,208 @@
+import logging
+import re
+import time
+import zlib
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; without it responses are only gzip-compressed
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+
+class QueryRecorder:
+    """
+    Database execute wrapper that counts queries, repeated (identical SQL and
+    parameters) queries and the time spent in the database.
+    """
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+            try:
+                self.statements[(sql, repr(params))] += 1
+            except TypeError:
+                self.statements[(sql, None)] += 1
+
+    @property
+    def duplicates(self):
+        return sum(times - 1 for times in self.statements.values() if times > 1)
+
+    def record(self):
+        """
+        Context manager installing the recorder on every configured database connection.
+        """
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self))
+        return stack
+
+
+class QueryProfilingMiddleware:
+    """
+    With QUERY_PROFILING enabled, report the number of queries, duplicate queries and
+    database time of each request in X-DB-* and Server-Timing response headers, and log
+    requests that repeat queries. Disabled, the middleware removes itself at startup.
+
+    Queries run while a streaming response is consumed are not included.
+    """
+    def __init__(self, get_response):
+        if not settings.QUERY_PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        with recorder.record():
+            response = self.get_response(request)
+
+        milliseconds = recorder.seconds * 1000
+        response['X-DB-Query-Count'] = str(recorder.count)
+        response['X-DB-Duplicate-Queries'] = str(recorder.duplicates)
+        response['X-DB-Time-Ms'] = f"{milliseconds:.2f}"
+        response['Server-Timing'] = f'db;dur={milliseconds:.2f};desc="{recorder.count} queries"'
+        if recorder.duplicates:
+            logger.warning(
+                "%s %s ran %d duplicate queries out of %d",
+                request.method, request.path, recorder.duplicates, recorder.count,
+            )
+        return response
+
+
+#Content codings in order of preference when the client accepts several equally.
+CODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+CODED_ETAG_RE = re.compile(r'-(?:br|gzip)"')
+
+
+def preferred_coding(accept_encoding):
+    """
+    The coding from CODINGS the Accept-Encoding header ranks highest, or None for none.
+    """
+    weights = {}
+    for part in accept_encoding.split(','):
+        coding, *params = part.split(';')
+        weight = 1.0
+        for param in params:
+            name, _, value = param.strip().partition('=')
+            if name.lower() == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding.strip().lower()] = weight
+    default = weights.get('*', 0.0)
+    weight, _, coding = max(
+        (weights.get(coding, default), -preference, coding) for preference, coding in enumerate(CODINGS)
+    )
+    return coding if weight > 0 else None
+
+
+def compressor(coding):
+    """
+    (compress, finish) functions of a new incremental encoder for the coding.
+    """
+    if coding == 'br':
+        encoder = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+        return encoder.process, encoder.finish
+    encoder = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return encoder.compress, encoder.flush
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress responses of at least COMPRESSION_MIN_SIZE bytes, and all streamed ones,
+    with brotli or gzip, whichever the client's Accept-Encoding prefers.
+
+    Unlike Django's GZipMiddleware this keeps ETags strong, so If-Match keeps working for
+    clients that fetched a compressed response: the coding is appended to the ETag
+    ("abc" becomes "abc-gzip") and stripped again from If-Match and If-None-Match before
+    the view compares them.
+    """
+    def __init__(self, get_response):
+        if not settings.COMPRESSION_ENABLED:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def process_request(self, request):
+        for header in ('HTTP_IF_MATCH', 'HTTP_IF_NONE_MATCH'):
+            value = request.META.get(header)
+            if value and CODED_ETAG_RE.search(value):
+                request.META[header] = CODED_ETAG_RE.sub('"', value)
+                if header == 'HTTP_IF_NONE_MATCH':
+                    request.coded_if_none_match = value
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding'):
+            return response
+        coding = preferred_coding(request.headers.get('Accept-Encoding', ''))
+        if response.status_code == 304:
+            return self.restore_etag(request, response)
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if coding is None:
+            return response
+        compress, finish = compressor(coding)
+        if response.streaming:
+            response.streaming_content = self.compress_stream(response, compress, finish)
+            response.headers.pop('Content-Length', None)
+        else:
+            content = compress(response.content) + finish()
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response.headers['Content-Length'] = str(len(content))
+
+        etag = response.headers.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = f'{etag[:-1]}-{coding}"'
+        response.headers['Content-Encoding'] = coding
+        return response
+
+    def compress_stream(self, response, compress, finish):
+        chunks = response.streaming_content
+        if response.is_async:
+            async def stream():
+                async for chunk in chunks:
+                    if data := compress(chunk):
+                        yield data
+                yield finish()
+        else:
+            def stream():
+                for chunk in chunks:
+                    if data := compress(chunk):
+                        yield data
+                yield finish()
+        return stream()
+
+    def restore_etag(self, request, response):
+        """
+        A 304 answers with the ETag the client holds, coding included.
+        """
+        sent = getattr(request, 'coded_if_none_match', None)
+        etag = response.headers.get('ETag')
+        if sent and etag and etag.startswith('"'):
+            for coding in CODINGS:
+                coded = f'{etag[:-1]}-{coding}"'
+                if coded in sent:
+                    response.headers['ETag'] = coded
+                    break
+        return response
@@ -38,6 +38,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres', #full-text search and trigram lookups
 
     #custom apps
     'rest_framework',
@@ -49,6 +50,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'expense_tracker.log.RequestLogMiddleware', #request ids for log records and X-Request-ID
+    'expense_tracker.middleware.QueryProfilingMiddleware', #first, so it sees every query of the request
+    'expense_tracker.metrics.MetricsMiddleware',
+    'expense_tracker.middleware.CompressionMiddleware', #inside metrics, so response sizes are what is sent
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -58,6 +63,30 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+#QUERY_PROFILING=True adds X-DB-Query-Count, X-DB-Duplicate-Queries, X-DB-Time-Ms and Server-Timing
+#headers to every response. Meant for development and profiling runs, not production traffic.
+QUERY_PROFILING = config('QUERY_PROFILING', default=False, cast=bool)
+
+#Prometheus metrics at /metrics (needs prometheus_client). Set METRICS_TOKEN to require
+#"Authorization: Bearer <token>" from the scraper. Without a token the endpoint answers 403,
+#unless METRICS_PUBLIC=True opens it (e.g. when only an internal network can reach it).
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+METRICS_PUBLIC = config('METRICS_PUBLIC', default=False, cast=bool)
+
+#Responses of at least COMPRESSION_MIN_SIZE bytes, and streamed exports, are compressed with brotli
+#(when installed) or gzip, whichever the client's Accept-Encoding prefers. The levels favour speed
+#over ratio: COMPRESSION_GZIP_LEVEL is 1-9, COMPRESSION_BROTLI_QUALITY 0-11.
+COMPRESSION_ENABLED = config('COMPRESSION_ENABLED', default=True, cast=bool)
+COMPRESSION_MIN_SIZE = config('COMPRESSION_MIN_SIZE', default=1024, cast=int)
+COMPRESSION_GZIP_LEVEL = config('COMPRESSION_GZIP_LEVEL', default=6, cast=int)
+COMPRESSION_BROTLI_QUALITY = config('COMPRESSION_BROTLI_QUALITY', default=4, cast=int)
+
+#Route the expense list/detail endpoints to the async views (expenses.async_views). They pay off
+#under ASGI (GUNICORN_WORKER_CLASS=uvicorn_worker.UvicornWorker); under WSGI each request would
+#run them in its own event loop.
+ASYNC_EXPENSE_VIEWS = config('ASYNC_EXPENSE_VIEWS', default=False, cast=bool)
+
 ROOT_URLCONF = 'expense_tracker.urls'
 
 TEMPLATES = [
@@ -91,25 +120,124 @@ DATABASES = {
 }
 '''
 
-DATABASES = {
+#DB_ENGINE=sqlite runs the project (and the test suite) without PostgreSQL.
+#Postgres-only features such as full-text/trigram search fall back to portable queries.
+DB_ENGINE = config('DB_ENGINE', default='postgresql')
+
+#Aliases of the read replicas, added below from DB_REPLICAS (PostgreSQL only).
+DATABASE_REPLICAS = []
+
+if DB_ENGINE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': config('SQLITE_PATH', default=str(BASE_DIR / 'db.sqlite3')),
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': config('POSTGRES_DB'),
+            'USER': config('POSTGRES_USER'),
+            'PASSWORD': config('POSTGRES_PASSWORD'),
+            'HOST': config('POSTGRES_HOST', default='db'),
+            'PORT': config('POSTGRES_PORT', default='5432'),
+        }
+    }
+
+    #Without a pool every request opens and closes its own connection. DB_CONN_MAX_AGE (seconds)
+    #keeps a connection per worker thread open instead; DB_POOL=True (psycopg 3 only) shares a
+    #psycopg_pool.ConnectionPool between the threads of each worker process:
+    #DB_POOL_MIN_SIZE connections are kept open and at most DB_POOL_MAX_SIZE are opened,
+    #requests wait up to DB_POOL_TIMEOUT seconds for a free one, and connections are
+    #closed after DB_POOL_MAX_LIFETIME seconds or DB_POOL_MAX_IDLE idle seconds above the
+    #minimum. Either way connections are health-checked before reuse. Pool statistics are
+    #exported at /metrics.
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+    if config('DB_POOL', default=False, cast=bool):
+        DATABASES['default']['OPTIONS'] = {
+            'pool': {
+                'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+                'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+                'timeout': config('DB_POOL_TIMEOUT', default=10, cast=float),
+                'max_lifetime': config('DB_POOL_MAX_LIFETIME', default=1800, cast=float),
+                'max_idle': config('DB_POOL_MAX_IDLE', default=300, cast=float),
+            },
+        }
+    else:
+        DATABASES['default']['CONN_MAX_AGE'] = config('DB_CONN_MAX_AGE', default=0, cast=int)
+
+    #Read replicas: DB_REPLICAS is a comma-separated list of replica hosts (host or host:port)
+    #that serve the expense list, detail and summary reads (see expense_tracker/db_router.py);
+    #they share the primary's credentials and connection settings. DB_REPLICA_NAME points them
+    #at another database, e.g. a second local database standing in for a replica.
+    for index, replica in enumerate(filter(None, config('DB_REPLICAS', default='').split(',')), start=1):
+        host, _, port = replica.strip().partition(':')
+        alias = f'replica_{index}'
+        DATABASES[alias] = {
+            **DATABASES['default'],
+            'NAME': config('DB_REPLICA_NAME', default=DATABASES['default']['NAME']),
+            'HOST': host,
+            'PORT': port or DATABASES['default']['PORT'],
+            'OPTIONS': dict(DATABASES['default'].get('OPTIONS', {})),
+            'TEST': {'MIRROR': 'default'},
+        }
+        DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['expense_tracker.db_router.ReplicaRouter']
+
+#A replica further behind than DB_REPLICA_MAX_LAG seconds, or unreachable, is skipped until its
+#next check, DB_REPLICA_CHECK_INTERVAL seconds later. After a write the user's reads stay on the
+#primary for DB_PRIMARY_STICKY_SECONDS; keep it above max lag + check interval so users always
+#read their own writes. Pins are stored in DB_ROUTING_CACHE_ALIAS, which must be shared by all
+#workers (e.g. Redis) for a pin to reach every worker; a system check rejects local memory.
+DB_REPLICA_MAX_LAG = config('DB_REPLICA_MAX_LAG', default=5, cast=float)
+DB_REPLICA_CHECK_INTERVAL = config('DB_REPLICA_CHECK_INTERVAL', default=5, cast=float)
+DB_PRIMARY_STICKY_SECONDS = config('DB_PRIMARY_STICKY_SECONDS', default=15, cast=int)
+DB_ROUTING_CACHE_ALIAS = 'default'
+
+
+#Cache used for per-user API responses (see expenses/cache.py). Local memory by default;
+#point CACHE_BACKEND/CACHE_LOCATION at e.g. django.core.cache.backends.redis.RedisCache to
+#share it between workers. The local-memory backend evicts least recently used entries
+#once it holds CACHE_MAX_ENTRIES; for Redis, bound it with maxmemory + allkeys-lru.
+CACHE_BACKEND = config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache')
+#Local memory is private to each process: a write invalidates cached responses only in the
+#worker that handled it. So the response cache (and the user cache below) is only on by
+#default with another backend;
+#EXPENSE_CACHE_ENABLED=True turns it on with local memory for a single process.
+CACHE_SHARED = not CACHE_BACKEND.endswith('LocMemCache')
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': config('POSTGRES_DB'),
-        'USER': config('POSTGRES_USER'),
-        'PASSWORD': config('POSTGRES_PASSWORD'),
-        'HOST': config('POSTGRES_HOST', default='db'),
-        'PORT': config('POSTGRES_PORT', default='5432'),
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': config('CACHE_LOCATION', default='expense-tracker'),
     }
 }
+if CACHE_BACKEND.endswith(('LocMemCache', 'FileBasedCache', 'DatabaseCache')):
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=10000, cast=int)}
 
+EXPENSE_CACHE_ALIAS = 'default'
+EXPENSE_CACHE_ENABLED = config('EXPENSE_CACHE_ENABLED', default=CACHE_SHARED, cast=bool)
+EXPENSE_CACHE_TIMEOUT = config('EXPENSE_CACHE_TIMEOUT', default=300, cast=int)
+
+#Used by accounts.authentication.CachedJWTAuthentication. Like the response cache, the user
+#cache is only on by default with a shared backend: with local memory, a deactivated user
+#would keep authenticating on the workers that didn't save the change.
+AUTH_USER_CACHE_ALIAS = 'default'
+AUTH_USER_CACHE_ENABLED = config('AUTH_USER_CACHE_ENABLED', default=CACHE_SHARED, cast=bool)
+AUTH_USER_CACHE_TIMEOUT = config('AUTH_USER_CACHE_TIMEOUT', default=300, cast=int)
+AUTH_TOKEN_CACHE_SIZE = config('AUTH_TOKEN_CACHE_SIZE', default=1024, cast=int)
 
 #configure the REST framework to use JWT authentication and set some basic token settings.
 from datetime import timedelta
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-        #This class will automatically handle the token parsing and validation for incoming requests.
+        'accounts.authentication.CachedJWTAuthentication',
+        #simplejwt's JWTAuthentication plus a verified-token LRU and a user cache, so authenticated
+        #requests don't query auth_user. It handles the token parsing and validation for incoming requests.
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         #'rest_framework.permissions.IsAuthenticated',
@@ -191,41 +319,37 @@ To ensure that these logged errors are captured (for example, in the console or
 '''
 
 
+#Records are put on a bounded queue and written by a background thread in each process, so
+#logging never blocks a request on disk or console I/O (see expense_tracker/log.py). The file
+#gets one JSON object per line, with request_id, user_id and elapsed_ms for records logged
+#while serving a request, and rotates at LOG_MAX_BYTES keeping LOG_BACKUP_COUNT old files.
+#When more than LOG_QUEUE_SIZE records are waiting, new ones are dropped and counted
+#(log_records_dropped_total at /metrics) instead of waiting.
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
-    'formatters': {
-        'verbose': {
-            'format': '[{asctime}] {levelname} [{name}] {message}',
-            'style': '{',
-        },
-        'simple': {
-            'format': '{levelname}: {message}',
-            'style': '{',
-        },
-    },
     'handlers': {
-        'console': {
-            'class': 'logging.StreamHandler',
-            'formatter': 'verbose',
-        },
-        'file': {
-            'class': 'logging.FileHandler',
+        'queue': {
+            'class': 'expense_tracker.log.QueueLogHandler',
             'filename': os.path.join(BASE_DIR, 'logs', 'expense_tracker.log'),
-            'formatter': 'verbose',
+            'max_bytes': config('LOG_MAX_BYTES', default=10 * 1024 * 1024, cast=int),
+            'backup_count': config('LOG_BACKUP_COUNT', default=5, cast=int),
+            'queue_size': config('LOG_QUEUE_SIZE', default=10000, cast=int),
+            'batch_size': config('LOG_BATCH_SIZE', default=256, cast=int),
+            'console': config('LOG_CONSOLE', default=True, cast=bool),
         },
     },
     'loggers': {
         # Capture logs from your application
         '': {
-            'handlers': ['console', 'file'],
+            'handlers': ['queue'],
             'level': 'INFO',  # Change to DEBUG for more detailed output
         },
         # Optionally override specific loggers
         'django.request': {
-            'handlers': ['console', 'file'],
+            'handlers': ['queue'],
             'level': 'ERROR',
             'propagate': False,
         },
     },
-}
\ No newline at end of file
+}
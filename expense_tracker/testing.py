@@ -0,0 +1,40 @@
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """
+    Test case mixin for pinning the number of queries an endpoint may run.
+
+    Subclasses list their endpoints in `query_budgets`, mapping (url name, method) to
+    the maximum number of queries, and test_budgets_cover_urlconf() fails when a URL in
+    `budget_urlconf` has no budget, so new endpoints can't skip the check.
+    """
+    query_budgets = {}
+    budget_urlconf = None
+
+    @contextmanager
+    def assertQueryBudget(self, url_name, method):
+        budget = self.query_budgets[(url_name, method)]
+        with CaptureQueriesContext(connection) as context:
+            yield context
+        statements = [query['sql'] for query in context.captured_queries]
+        repeated = sorted({
+            sql for sql in statements
+            if statements.count(sql) > 1 and not sql.startswith(('SAVEPOINT', 'RELEASE SAVEPOINT'))
+        })
+        queries = '\n'.join(f"{index}. {sql}" for index, sql in enumerate(statements, start=1))
+        self.assertLessEqual(
+            len(statements), budget,
+            f"{method} {url_name} ran {len(statements)} queries, budget is {budget}:\n{queries}",
+        )
+        self.assertEqual(repeated, [], f"{method} {url_name} repeated queries:\n{queries}")
+
+    def test_budgets_cover_urlconf(self):
+        if self.budget_urlconf is None:
+            return
+        budgeted = {url_name for url_name, method in self.query_budgets}
+        for pattern in self.budget_urlconf.urlpatterns:
+            self.assertIn(pattern.name, budgeted, f"URL '{pattern.name}' has no query budget.")
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class ExpensesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'expenses'
+
+    def ready(self):
+        from expense_tracker import checks  # noqa: F401
+
+        from . import signals  # noqa: F401
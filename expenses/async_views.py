@@ -0,0 +1,172 @@
+from asgiref.sync import sync_to_async
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import classonlymethod
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import AuthenticationFailed, NotAcceptable, NotAuthenticated, NotFound
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.views import exception_handler
+
+from accounts.authentication import CachedJWTAuthentication
+from expense_tracker.db_router import ause_replica, request_routing
+from expense_tracker.metrics import observe_serialization
+
+from .cache import list_cache
+from .conditional import alist_validators, check_preconditions, expense_validators, set_validators
+from .models import Expense
+from .parsers import EXPENSE_PARSERS
+from .renderers import EXPENSE_RENDERERS
+from .serializers import ExpenseSerializer, expense_columns, serialize_expense_rows
+from .views import ExpenseListMixin, ExpenseView, exception_response
+
+
+class AsyncExpenseView(ExpenseListMixin, View):
+    """
+    ExpenseView on Django's async ORM, routed instead of it when ASYNC_EXPENSE_VIEWS is set
+    and meant for the ASGI deployment (see gunicorn.conf.py).
+
+    Reads await the cache and the database, so a slow query suspends only its own request
+    instead of blocking a worker. Writes need transaction.atomic() and row locks, which have
+    no async API in Django 5.1, so they run ExpenseView's handlers in a worker thread.
+
+    DRF 3.15 views are sync-only, so authentication, content negotiation, error handling and
+    rendering are done here with the same classes: ExpenseView's formats, no browsable API.
+    """
+    authentication = CachedJWTAuthentication()
+    renderers = [renderer() for renderer in EXPENSE_RENDERERS]
+    negotiator = DefaultContentNegotiation()
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        # Token authentication needs no CSRF protection, as with DRF's APIView
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        with request_routing():
+            return await self.handle_request(request, *args, **kwargs)
+
+    async def handle_request(self, request, *args, **kwargs):
+        request = Request(request, parsers=[parser() for parser in EXPENSE_PARSERS])
+        self.request = request
+        try:
+            self.renderer, self.media_type = self.negotiator.select_renderer(request, self.renderers)
+            # As APIView does: ETags and cache keys depend on the format
+            request.accepted_renderer, request.accepted_media_type = self.renderer, self.media_type
+        except NotAcceptable as e:
+            self.renderer, self.media_type = self.renderers[0], self.renderers[0].media_type
+            return self.finalize(exception_handler(e, {'request': request, 'view': self}))
+        try:
+            user_auth = await self.authentication.aauthenticate(request)
+            if user_auth is None:
+                raise NotAuthenticated()
+        except (AuthenticationFailed, NotAuthenticated) as e:
+            e.auth_header = self.authentication.authenticate_header(request)
+            return self.finalize(exception_handler(e, {'request': request, 'view': self}))
+        request.user, request.auth = user_auth
+        if request.method in SAFE_METHODS:
+            await ause_replica(request.user.pk)
+
+        handler = getattr(self, request.method.lower(), None)
+        if request.method.lower() not in self.http_method_names or handler is None:
+            return await self.http_method_not_allowed(request, *args, **kwargs)
+        try:
+            response = await handler(request, *args, **kwargs)
+        except Exception as e:
+            response = exception_response(e, handler.__name__)
+        return self.finalize(response)
+
+    def finalize(self, response):
+        """
+        Render a DRF Response with the negotiated renderer; Django responses pass through.
+        """
+        if isinstance(response, Response):
+            response.accepted_renderer = self.renderer
+            response.accepted_media_type = self.media_type
+            response.renderer_context = {'request': self.request, 'response': response, 'view': self}
+            response.render()
+            patch_vary_headers(response, ['Accept'])
+        return response
+
+    async def get(self, request, pk=None):
+        if pk is not None:
+            return await self.retrieve(request, pk)
+
+        fields = self.get_fields(request.query_params)
+
+        # Serve repeated list queries from the per-user cache without touching the database
+        cache_key = await list_cache.akey(request)
+        cached = await list_cache.aget(cache_key)
+        if cached is not None:
+            data, etag = cached
+            not_modified = check_preconditions(request, etag, None)
+            if not_modified is not None:
+                return not_modified
+            return set_validators(Response(data), etag, None)
+
+        queryset = Expense.objects.filter(user=request.user)
+        if request.query_params.get('search'):
+            # search_expenses() checks the database for pg_trgm on first use, which must run sync
+            queryset = await sync_to_async(self.apply_filters)(queryset, request.query_params)
+        else:
+            queryset = self.apply_filters(queryset, request.query_params)
+
+        # Answer conditional requests before running the list query or serializing
+        etag = await alist_validators(queryset, request)
+        not_modified = check_preconditions(request, etag, None)
+        if not_modified is not None:
+            return not_modified
+
+        paginator = self.pagination_class()
+        if paginator.is_requested(request):
+            ordering, columns, position = self.get_keyset_ordering(request.query_params, fields)
+            page = await paginator.apaginate_queryset(
+                queryset.values_list(*columns), request, view=self,
+                ordering=ordering, position=position
+            )
+            with observe_serialization(request):
+                data = paginator.get_paginated_data(serialize_expense_rows(page, fields))
+        else:
+            queryset = self.order_list(queryset, request.query_params)
+            rows = [row async for row in queryset.values_list(*expense_columns(fields))]
+            with observe_serialization(request):
+                data = serialize_expense_rows(rows, fields)
+
+        await list_cache.aset(cache_key, (data, etag))
+        return set_validators(Response(data), etag, None)
+
+    async def retrieve(self, request, pk):
+        fields = self.get_fields(request.query_params)
+        try:
+            expense = await self.only_fields(Expense.objects.all(), fields).aget(pk=pk, user=request.user)
+        except Expense.DoesNotExist:
+            raise NotFound("Expense not found.")
+        etag, last_modified = expense_validators(expense, request, fields)
+        not_modified = check_preconditions(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+        with observe_serialization(request):
+            data = ExpenseSerializer(expense, fields=fields).data
+        return set_validators(Response(data), etag, last_modified)
+
+    async def post(self, request):
+        return await self.write(request, 'post')
+
+    async def put(self, request, pk):
+        return await self.write(request, 'put', pk=pk)
+
+    async def patch(self, request, pk):
+        return await self.write(request, 'patch', pk=pk)
+
+    async def delete(self, request, pk):
+        return await self.write(request, 'delete', pk=pk)
+
+    async def write(self, request, method, **kwargs):
+        """
+        Run ExpenseView's handler for a write in a worker thread, transaction and all.
+        """
+        view = ExpenseView()
+        view.request, view.args, view.kwargs, view.format_kwarg = request, (), kwargs, None
+        return await sync_to_async(getattr(view, method))(request, **kwargs)
@@ -0,0 +1,159 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from expense_tracker.metrics import metrics_enabled, record_budget_alert
+
+from .models import Budget, Expense
+
+logger = logging.getLogger(__name__)
+
+SPENT_FIELD = DecimalField(max_digits=14, decimal_places=2)
+
+
+def period_of(date):
+    return date.replace(day=1)
+
+
+def next_period(period):
+    return period_of(period + timedelta(days=32))
+
+
+def current_period():
+    return period_of(timezone.now().date())
+
+
+def period_spend(period):
+    """
+    Subquery: what the budget's user spent in its category during the month `period`.
+    """
+    spend = (
+        Expense.objects.filter(
+            user=OuterRef('user'), category=OuterRef('category'),
+            date__gte=period, date__lt=next_period(period),
+        )
+        .order_by()
+        .values('user')
+        .annotate(total=Sum('amount'))
+        .values('total')
+    )
+    return Coalesce(Subquery(spend), Value(Decimal('0')), output_field=SPENT_FIELD)
+
+
+def apply_budget_changes(user_id, changes):
+    """
+    Add the current-month part of (date, category, total, count) expense changes to the
+    user's budgets with one UPDATE, then check the thresholds of those whose spend grew.
+
+    Budgets still on an earlier month are moved to this one in the same statement, with
+    their spend recomputed (which includes the write). Must run in the write's transaction.
+    """
+    period = current_period()
+    totals = defaultdict(Decimal)
+    for date, category, total, count in changes:
+        if period_of(date) == period:
+            totals[category] += Decimal(str(total))
+    totals = {category: total for category, total in totals.items() if total}
+    if not totals:
+        return
+
+    increment = Case(
+        *[When(category=category, then=Value(total)) for category, total in totals.items()],
+        default=Value(Decimal('0')), output_field=SPENT_FIELD,
+    )
+    updated = Budget.objects.filter(user_id=user_id, category__in=totals).update(
+        spent=Case(
+            When(period_start=period, then=F('spent') + increment),
+            default=period_spend(period), output_field=SPENT_FIELD,
+        ),
+        period_start=period,
+    )
+    grown = [category for category, total in totals.items() if total > 0]
+    if updated and grown:
+        check_thresholds(user_id, grown, period)
+
+
+def check_thresholds(user_id, categories, period):
+    """
+    Alert, once per month, for the user's budgets in `categories` whose spend has reached
+    their threshold. Reads at most one budget row per category.
+    """
+    crossed = list(
+        Budget.objects.filter(user_id=user_id, category__in=categories, period_start=period)
+        .exclude(alerted_period=period)
+        .alias(used=F('spent') * 100)
+        .filter(used__gte=F('amount') * F('threshold'))
+    )
+    if not crossed:
+        return
+    Budget.objects.filter(pk__in=[budget.pk for budget in crossed]).update(alerted_period=period)
+    transaction.on_commit(partial(send_alerts, crossed))
+
+
+def send_alerts(budgets):
+    for budget in budgets:
+        logger.warning(
+            "Budget alert: user %s has spent %s of their %s %s budget (threshold %s%%)",
+            budget.user_id, budget.spent, budget.amount, budget.category, budget.threshold,
+            extra={'budget_id': budget.pk, 'category': budget.category},
+        )
+        if metrics_enabled():
+            record_budget_alert(budget.category)
+
+
+def roll_over(queryset):
+    """
+    Move budgets still on an earlier month to the current one, recomputing their spend.
+    """
+    period = current_period()
+    return queryset.filter(period_start__lt=period).update(spent=period_spend(period), period_start=period)
+
+
+def reconcile_budgets(user_ids=None):
+    """
+    Recompute every budget's spend for the current month from the expense table.
+    Returns the number of budgets updated.
+
+    The budgets are locked first, so the recomputation sees every committed write and
+    writes still in progress add their change after it.
+    """
+    budgets = Budget.objects.all()
+    if user_ids is not None:
+        budgets = budgets.filter(user_id__in=user_ids)
+    period = current_period()
+    with transaction.atomic():
+        list(budgets.select_for_update().values_list('pk', flat=True))
+        return budgets.update(spent=period_spend(period), period_start=period)
+
+
+def find_budget_drift(user_ids=None):
+    """
+    Compare each budget's running spend with the sum of its expenses in its period.
+    Returns a list of (user_id, category, period_start, expected, stored) tuples.
+    """
+    budgets = Budget.objects.all()
+    if user_ids is not None:
+        budgets = budgets.filter(user_id__in=user_ids)
+    budgets = list(budgets.values_list('user_id', 'category', 'period_start', 'spent'))
+
+    expected = {}
+    for period in {period for _, _, period, _ in budgets}:
+        expenses = Expense.objects.filter(date__gte=period, date__lt=next_period(period))
+        if user_ids is not None:
+            expenses = expenses.filter(user_id__in=user_ids)
+        for row in expenses.values('user_id', 'category').annotate(total=Sum('amount')).order_by():
+            expected[(row['user_id'], row['category'], period)] = row['total']
+
+    drift = []
+    for user_id, category, period, spent in sorted(budgets):
+        total = expected.get((user_id, category, period), Decimal('0'))
+        if total != spent:
+            drift.append((user_id, category, period, total, spent))
+    return drift
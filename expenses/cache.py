@@ -0,0 +1,150 @@
+import threading
+import time
+from functools import partial
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils import timezone
+
+from expense_tracker.db_router import pin_to_primary
+from expense_tracker.metrics import metrics_enabled, record_cache_lookup
+
+from .conditional import normalize_params, representation
+
+
+def get_cache():
+    return caches[settings.EXPENSE_CACHE_ALIAS]
+
+
+def version_key(user_id):
+    return f'expenses:version:{user_id}'
+
+
+def _bump_version(user_id):
+    cache = get_cache()
+    try:
+        cache.incr(version_key(user_id))
+    except ValueError:
+        #Missing (never set or evicted): start from a fresh, never-used value so
+        #entries cached under an older version can't become reachable again.
+        cache.set(version_key(user_id), time.time_ns(), timeout=None)
+
+
+def invalidate_user(user_id):
+    """
+    Make every cached response of this user unreachable by bumping their data version.
+
+    The version is bumped right away, so the writing request and anything reading inside
+    its transaction never see stale entries, and again on commit, so a response computed
+    from pre-commit data by a concurrent request can't outlive the write.
+
+    The user's reads are also pinned to the primary database, again counting from the
+    commit, so they don't read from a replica that hasn't replayed the write yet.
+    """
+    if settings.EXPENSE_CACHE_ENABLED:
+        _bump_version(user_id)
+        transaction.on_commit(partial(_bump_version, user_id))
+    pin_to_primary(user_id)
+    transaction.on_commit(partial(pin_to_primary, user_id))
+
+
+@receiver(setting_changed)
+def clear_on_toggle(setting, **kwargs):
+    #Writes don't bump versions while the cache is off, so entries from before it was last
+    #on may be stale (tests turn it on and off with override_settings).
+    if setting == 'EXPENSE_CACHE_ENABLED':
+        get_cache().clear()
+
+
+class VersionedResponseCache:
+    """
+    Per-user response cache keyed by (namespace, user, data version, normalised query).
+
+    Writes never delete keys: invalidate_user() bumps the user's version and old entries
+    age out through the backend's own eviction (LRU with MAX_ENTRIES for the local-memory
+    backend, maxmemory-policy for Redis) or the timeout.
+
+    With EXPENSE_CACHE_ENABLED off, key() returns None, and get() and set() do nothing
+    with it, so callers need no checks of their own.
+    """
+    _lock = threading.Lock()
+
+    def __init__(self, namespace):
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, request):
+        if not settings.EXPENSE_CACHE_ENABLED:
+            return None
+        cache = get_cache()
+        user_id = request.user.pk
+        version = cache.get(version_key(user_id))
+        if version is None:
+            version = time.time_ns()
+            if not cache.add(version_key(user_id), version, timeout=None):
+                version = cache.get(version_key(user_id), version)
+        return self.make_key(request, version)
+
+    async def akey(self, request):
+        if not settings.EXPENSE_CACHE_ENABLED:
+            return None
+        cache = get_cache()
+        user_id = request.user.pk
+        version = await cache.aget(version_key(user_id))
+        if version is None:
+            version = time.time_ns()
+            if not await cache.aadd(version_key(user_id), version, timeout=None):
+                version = await cache.aget(version_key(user_id), version)
+        return self.make_key(request, version)
+
+    def make_key(self, request, version):
+        #Relative date filters (past_week, ...) change meaning at midnight, so the day is part of the key.
+        #Entries hold each format's own ETag, so the format is too.
+        query = md5(
+            f'{timezone.now().date()}:{representation(request)}:{request.get_host()}'
+            f'?{normalize_params(request.query_params)}'.encode('utf-8'),
+            usedforsecurity=False,
+        ).hexdigest()
+        return f'expenses:{self.namespace}:{request.user.pk}:{version}:{query}'
+
+    def get(self, key):
+        if key is None:
+            return None
+        return self.count(get_cache().get(key))
+
+    async def aget(self, key):
+        if key is None:
+            return None
+        return self.count(await get_cache().aget(key))
+
+    def count(self, entry):
+        #hits/misses are this process's totals; the Counter is summed across workers on /metrics
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if metrics_enabled():
+            record_cache_lookup(self.namespace, entry is not None)
+        return entry
+
+    def set(self, key, entry):
+        if key is not None:
+            get_cache().set(key, entry, timeout=settings.EXPENSE_CACHE_TIMEOUT)
+
+    async def aset(self, key, entry):
+        if key is not None:
+            await get_cache().aset(key, entry, timeout=settings.EXPENSE_CACHE_TIMEOUT)
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+
+list_cache = VersionedResponseCache('list')
+timeseries_cache = VersionedResponseCache('timeseries')
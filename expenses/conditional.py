@@ -0,0 +1,96 @@
+import json
+from hashlib import md5
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def normalize_params(params):
+    """
+    Canonical form of the query string: parameter order and empty values don't matter.
+    """
+    return '&'.join(
+        f'{key}={value}'
+        for key in sorted(params)
+        for value in sorted(params.getlist(key))
+        if value != ''
+    )
+
+
+def representation(request):
+    """
+    The negotiated response format. It is part of every ETag and cache key: JSON, columnar
+    JSON and MessagePack bodies of the same data are different representations.
+    """
+    renderer = getattr(request, 'accepted_renderer', None)
+    return renderer.format if renderer is not None else ''
+
+
+def make_etag(*parts):
+    return md5(':'.join(str(part) for part in parts).encode('utf-8'), usedforsecurity=False).hexdigest()
+
+
+def list_validators(queryset, request):
+    """
+    ETag for a filtered expense list, from one aggregate query.
+
+    Any create or update moves max(updated_at) and any delete changes the count,
+    so together with the user and the normalised query parameters they identify
+    the response without serializing it. Lists have no Last-Modified: a delete
+    doesn't move max(updated_at), so If-Modified-Since would answer 304 with the
+    deleted row still in the client's copy.
+    """
+    stats = queryset.order_by().aggregate(last_modified=Max('updated_at'), count=Count('id'))
+    return _list_etag(stats, request)
+
+
+async def alist_validators(queryset, request):
+    stats = await queryset.order_by().aaggregate(last_modified=Max('updated_at'), count=Count('id'))
+    return _list_etag(stats, request)
+
+
+def _list_etag(stats, request):
+    last_modified = stats['last_modified']
+    return make_etag(
+        'list', request.user.pk, last_modified.isoformat() if last_modified else '',
+        stats['count'], normalize_params(request.query_params), representation(request),
+    )
+
+
+def data_etag(name, data, request):
+    """
+    ETag of a computed response taken from its content, so every worker gives the same
+    data the same ETag, and any change to the data changes it.
+    """
+    return make_etag(name, representation(request), json.dumps(data, sort_keys=True, default=str))
+
+
+def expense_validators(expense, request, fields=None):
+    """
+    ETag and Last-Modified of an expense in the request's format. A sparse fieldset is a
+    different representation, so it gets its own ETag; If-Match on writes needs the ETag
+    of the full one.
+    """
+    parts = ['expense', expense.pk, expense.updated_at.isoformat(), representation(request)]
+    if fields is not None:
+        parts.append(','.join(fields))
+    return make_etag(*parts), int(expense.updated_at.timestamp())
+
+
+def check_preconditions(request, etag, last_modified):
+    """
+    Evaluate If-None-Match/If-Modified-Since (304) and If-Match/If-Unmodified-Since (412).
+    Returns the short-circuit response, or None when the request should proceed.
+    """
+    response = get_conditional_response(request, etag=quote_etag(etag), last_modified=last_modified)
+    if response is not None and response.status_code == 304:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified):
+    response['ETag'] = quote_etag(etag)
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
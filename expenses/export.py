@@ -0,0 +1,92 @@
+import csv
+import json
+
+from django.utils import timezone
+from rest_framework.renderers import BaseRenderer
+
+from .serializers import EXPENSE_COLUMNS, format_datetime
+
+EXPORT_FIELDS = ['id', 'user', 'amount', 'date', 'description', 'category', 'created_at', 'updated_at']
+
+
+def export_rows(queryset, chunk_size=2000):
+    """
+    Yield each expense as a tuple of API-formatted values, in EXPORT_FIELDS order.
+
+    Rows are read with values_list().iterator(), which on PostgreSQL streams through a
+    server-side cursor chunk_size rows at a time, so no model instances are built and
+    memory does not grow with the number of expenses.
+    """
+    tz = timezone.get_current_timezone()
+    for pk, user_id, amount, date, description, category, created_at, updated_at in (
+        queryset.values_list(*EXPENSE_COLUMNS).iterator(chunk_size=chunk_size)
+    ):
+        yield (
+            pk,
+            user_id,
+            f"{amount:.2f}",
+            date.isoformat(),
+            description,
+            category,
+            format_datetime(created_at, tz),
+            format_datetime(updated_at, tz),
+        )
+
+
+class Echo:
+    """
+    File-like object whose write() returns the written value, so csv.writer
+    can format a row without buffering it.
+    """
+    def write(self, value):
+        return value
+
+
+class CSVStreamRenderer(BaseRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+    filename = 'expenses.csv'
+
+    def stream(self, rows, batch_size=500):
+        writer = csv.writer(Echo())
+        yield writer.writerow(EXPORT_FIELDS)
+        batch = []
+        for row in rows:
+            batch.append(writer.writerow(row))
+            if len(batch) >= batch_size:
+                yield ''.join(batch)
+                batch = []
+        if batch:
+            yield ''.join(batch)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        #Only used for non-streamed responses such as errors.
+        if not isinstance(data, dict):
+            return b''
+        writer = csv.writer(Echo())
+        return (writer.writerow(data.keys()) + writer.writerow(data.values())).encode(self.charset)
+
+
+class NDJSONStreamRenderer(BaseRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+    filename = 'expenses.ndjson'
+
+    def stream(self, rows, batch_size=500):
+        dumps = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+        batch = []
+        for row in rows:
+            batch.append(dumps(dict(zip(EXPORT_FIELDS, row))) + '\n')
+            if len(batch) >= batch_size:
+                yield ''.join(batch)
+                batch = []
+        if batch:
+            yield ''.join(batch)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        #Only used for non-streamed responses such as errors.
+        if data is None:
+            return b''
+        return (json.dumps(data, ensure_ascii=False, separators=(',', ':')) + '\n').encode(self.charset)
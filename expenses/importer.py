@@ -0,0 +1,185 @@
+import csv
+import io
+import time
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .budgets import apply_budget_changes
+from .cache import invalidate_user
+from .models import Expense
+from .rollups import RollupDelta, upsert_rollups
+
+REQUIRED_COLUMNS = ['amount', 'date', 'category']
+MAX_AMOUNT = Decimal('100000000')  # max_digits=10, decimal_places=2
+
+
+def copy_from(cursor, sql, buffer):
+    """
+    Run COPY ... FROM STDIN with either psycopg2 or psycopg 3 underneath Django's cursor.
+    """
+    raw = cursor.cursor
+    if hasattr(raw, 'copy_expert'):
+        raw.copy_expert(sql, buffer)
+    else:
+        with raw.copy(sql) as copy:
+            copy.write(buffer.getvalue())
+
+
+class ExpenseImporter:
+    """
+    Load expenses for one user from a CSV stream with columns
+    amount, date, category and (optionally) description.
+
+    The CSV is parsed as a stream and validated in batches. On PostgreSQL each batch
+    of valid rows is sent with COPY FROM STDIN into a temporary staging table and
+    merged into expenses_expense with one INSERT ... SELECT at the end; elsewhere
+    the batches go through bulk_create. Either way the import is one transaction
+    and the summary rollups and budget spend are updated with it.
+    """
+    batch_size = 5000
+    max_reported_rejects = 1000
+
+    def __init__(self, user, batch_size=None):
+        self.user = user
+        if batch_size:
+            self.batch_size = batch_size
+        self.categories = {}
+        for code, label in Expense.CATEGORY_CHOICES:
+            self.categories[code.upper()] = code
+            self.categories[label.upper()] = code
+
+    def validate_row(self, row):
+        """
+        Return (amount, date, description, category) for a CSV row, or raise
+        ValueError with a {column: message} dict.
+        """
+        errors = {}
+        amount = date = category = None
+
+        try:
+            amount = Decimal((row.get('amount') or '').strip())
+            if not amount.is_finite():
+                raise InvalidOperation
+            if amount <= 0:
+                errors['amount'] = "The expense amount must be greater than zero."
+            elif amount.as_tuple().exponent < -2:
+                errors['amount'] = "Ensure that there are no more than 2 decimal places."
+            elif amount >= MAX_AMOUNT:
+                errors['amount'] = "Ensure that there are no more than 10 digits in total."
+        except InvalidOperation:
+            errors['amount'] = "A valid number is required."
+
+        try:
+            date = datetime.strptime((row.get('date') or '').strip(), '%Y-%m-%d').date()
+        except ValueError:
+            errors['date'] = "Invalid date format. Use YYYY-MM-DD."
+
+        category = self.categories.get((row.get('category') or '').strip().upper())
+        if category is None:
+            errors['category'] = f"Category must be one of the following: {', '.join(code for code, _ in Expense.CATEGORY_CHOICES)}."
+
+        if errors:
+            raise ValueError(errors)
+        description = (row.get('description') or '').strip() or None
+        return amount, date, description, category
+
+    def batches(self, reader, report):
+        batch = []
+        for row in reader:
+            try:
+                batch.append(self.validate_row(row))
+            except ValueError as e:
+                report['rejected_count'] += 1
+                if len(report['rejected']) < self.max_reported_rejects:
+                    report['rejected'].append({'line': reader.line_num, 'errors': e.args[0]})
+                continue
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def run(self, stream):
+        """
+        Import from a text stream and return a report with the number of imported
+        and rejected rows, the first rejected rows with their errors, and throughput.
+        """
+        started = time.perf_counter()
+        report = {'imported': 0, 'rejected_count': 0, 'rejected': []}
+
+        reader = csv.DictReader(stream)
+        columns = [name.strip().lower() for name in reader.fieldnames or []]
+        missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+        if missing:
+            raise ValueError(f"CSV is missing required column(s): {', '.join(missing)}.")
+        reader.fieldnames = columns
+
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                report['imported'] = self.load_with_copy(self.batches(reader, report))
+            else:
+                report['imported'] = self.load_with_bulk_create(self.batches(reader, report))
+            if report['imported']:
+                invalidate_user(self.user.pk)
+
+        report['seconds'] = round(time.perf_counter() - started, 3)
+        total = report['imported'] + report['rejected_count']
+        report['rows_per_second'] = round(total / report['seconds']) if report['seconds'] else total
+        return report
+
+    def load_with_copy(self, batches):
+        qn = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TEMPORARY TABLE expense_import_staging "
+                "(amount numeric(10, 2), date date, description text, category varchar(20)) "
+                "ON COMMIT DROP"
+            )
+            for batch in batches:
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(
+                    (amount, date.isoformat(), description, category)
+                    for amount, date, description, category in batch
+                )
+                buffer.seek(0)
+                copy_from(
+                    cursor,
+                    "COPY expense_import_staging (amount, date, description, category) FROM STDIN WITH (FORMAT csv)",
+                    buffer,
+                )
+
+            now = timezone.now()
+            cursor.execute(
+                f"INSERT INTO {qn(Expense._meta.db_table)} "
+                f"({qn('user_id')}, {qn('amount')}, {qn('date')}, {qn('description')}, {qn('category')}, "
+                f"{qn('created_at')}, {qn('updated_at')}) "
+                f"SELECT %s, amount, date, NULLIF(description, ''), category, %s, %s FROM expense_import_staging",
+                [self.user.pk, now, now],
+            )
+            imported = cursor.rowcount
+
+            cursor.execute(
+                "SELECT date, category, SUM(amount), COUNT(*) FROM expense_import_staging GROUP BY date, category"
+            )
+            changes = cursor.fetchall()
+            upsert_rollups(self.user.pk, changes)
+            apply_budget_changes(self.user.pk, changes)
+        return imported
+
+    def load_with_bulk_create(self, batches):
+        imported = 0
+        delta = RollupDelta(self.user.pk)
+        for batch in batches:
+            expenses = [
+                Expense(user=self.user, amount=amount, date=date, description=description, category=category)
+                for amount, date, description, category in batch
+            ]
+            Expense.objects.bulk_create(expenses, batch_size=1000)
+            for expense in expenses:
+                delta.add(expense)
+            imported += len(expenses)
+        delta.apply()
+        return imported
@@ -0,0 +1,97 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from expenses import partitions
+from expenses.models import Expense
+from expenses.views import ExpenseFilterMixin
+
+#The list filters whose partition pruning `status` reports.
+DATE_FILTERS = ['past_week', 'past_month', 'last_3_months']
+
+
+class Command(BaseCommand):
+    help = (
+        "Manage date-range partitioning of the expense table (PostgreSQL): convert the table, "
+        "create upcoming partitions and detach old ones, revert, or show the partitions and "
+        "which ones the date filters scan."
+    )
+
+    def add_arguments(self, parser):
+        subcommands = parser.add_subparsers(dest='action', required=True)
+
+        convert = subcommands.add_parser('convert', help="Rebuild the expense table as a partitioned table.")
+        convert.add_argument('--interval', choices=partitions.INTERVALS, default='month')
+        convert.add_argument(
+            '--ahead', type=int, default=3, help="Partitions to create past the current one (default: %(default)s).",
+        )
+        convert.add_argument(
+            '--since', type=date.fromisoformat,
+            help="First partition start (YYYY-MM-DD); older expenses go to the default partition. "
+                 "Defaults to the oldest expense.",
+        )
+
+        maintain = subcommands.add_parser('maintain', help="Create upcoming partitions and detach old ones.")
+        maintain.add_argument(
+            '--ahead', type=int, default=3, help="Keep this many partitions past the current one (default: %(default)s).",
+        )
+        maintain.add_argument(
+            '--retain', type=int,
+            help="Detach partitions ending more than this many intervals before the current one. "
+                 "Without it nothing is detached.",
+        )
+        maintain.add_argument(
+            '--drop', action='store_true', help="Drop detached partitions instead of keeping them as archive tables.",
+        )
+
+        subcommands.add_parser('revert', help="Turn the partitioned table back into a plain table.")
+        subcommands.add_parser('status', help="List the partitions and the ones each date filter scans.")
+
+    def handle(self, *args, **options):
+        try:
+            getattr(self, options['action'])(options)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+    def convert(self, options):
+        created = partitions.partition_expenses(options['interval'], options['ahead'], options['since'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Partitioned {partitions.TABLE} by {options['interval']} into {created} partition(s) and a default one."
+        ))
+
+    def maintain(self, options):
+        if not partitions.is_partitioned():
+            raise CommandError("The expense table is not partitioned. Run `expense_partitions convert` first.")
+        interval = partitions.detect_interval(partitions.list_partitions())
+        current = partitions.interval_start(timezone.now().date(), interval)
+
+        until = current
+        for _ in range(options['ahead']):
+            until = partitions.next_start(until, interval)
+        for name in partitions.create_partitions(until, interval):
+            self.stdout.write(f"Created {name}")
+
+        if options['retain'] is not None:
+            cutoff = current
+            for _ in range(options['retain']):
+                cutoff = partitions.interval_start(cutoff - timedelta(days=1), interval)
+            for name in partitions.detach_partitions(cutoff, drop=options['drop']):
+                self.stdout.write(f"{'Dropped' if options['drop'] else 'Detached'} {name}")
+        self.stdout.write(self.style.SUCCESS("Partitions are up to date."))
+
+    def revert(self, options):
+        partitions.unpartition_expenses()
+        self.stdout.write(self.style.SUCCESS(f"{partitions.TABLE} is a plain table again."))
+
+    def status(self, options):
+        if not partitions.is_partitioned():
+            self.stdout.write(f"{partitions.TABLE} is not partitioned.")
+            return
+        for partition in partitions.list_partitions():
+            bounds = f"{partition.start} .. {partition.end}" if partition.start else "DEFAULT"
+            self.stdout.write(f"{partition.name:<40} {bounds}")
+        filters = ExpenseFilterMixin()
+        for name in DATE_FILTERS:
+            scanned = partitions.scanned_partitions(filters.apply_filters(Expense.objects.all(), {'filter': name}))
+            self.stdout.write(f"filter={name}: scans {', '.join(scanned) or 'nothing'}")
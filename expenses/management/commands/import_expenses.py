@@ -0,0 +1,48 @@
+import io
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from expenses.importer import ExpenseImporter
+
+
+class Command(BaseCommand):
+    help = (
+        "Import expenses for a user from a CSV file with amount, date, category and "
+        "optional description columns. Uses COPY on PostgreSQL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV file to import, or - to read from stdin.")
+        parser.add_argument('--user', required=True, dest='username', help="Username that will own the expenses.")
+        parser.add_argument(
+            '--batch-size', type=int, default=ExpenseImporter.batch_size,
+            help="Rows validated and loaded per batch (default: %(default)s).",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(username=options['username'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"User '{options['username']}' does not exist.")
+
+        importer = ExpenseImporter(user, batch_size=options['batch_size'])
+        try:
+            if options['path'] == '-':
+                stream = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8-sig', newline='')
+                report = importer.run(stream)
+            else:
+                with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+                    report = importer.run(stream)
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        for reject in report['rejected']:
+            self.stdout.write(f"line {reject['line']}: {reject['errors']}")
+        if report['rejected_count'] > len(report['rejected']):
+            self.stdout.write(f"... {report['rejected_count'] - len(report['rejected'])} more rejected row(s)")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report['imported']} expense(s), rejected {report['rejected_count']} "
+            f"in {report['seconds']}s ({report['rows_per_second']} rows/s)."
+        ))
@@ -0,0 +1,40 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from expenses.rollups import find_rollup_drift, rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the expense summary rollups from the expense table, or check them for drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', action='append', dest='usernames', metavar='USERNAME',
+            help="Only rebuild/check this user (can be repeated). Defaults to every user.",
+        )
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Only compare rollups with the expense table; exit with an error if they differ.",
+        )
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options['usernames']:
+            users = get_user_model().objects.filter(username__in=options['usernames'])
+            user_ids = list(users.values_list('id', flat=True))
+            if len(user_ids) != len(set(options['usernames'])):
+                raise CommandError("One or more users do not exist.")
+
+        if options['check']:
+            drift = find_rollup_drift(user_ids)
+            for user_id, date, category, expected, stored in drift:
+                self.stdout.write(
+                    f"user={user_id} date={date} category={category} expected={expected} stored={stored}"
+                )
+            if drift:
+                raise CommandError(f"{len(drift)} rollup bucket(s) out of sync. Run without --check to rebuild.")
+            self.stdout.write(self.style.SUCCESS("Rollups are in sync."))
+            return
+
+        rows = rebuild_rollups(user_ids)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} rollup bucket(s)."))
@@ -0,0 +1,40 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from expenses.budgets import find_budget_drift, reconcile_budgets
+
+
+class Command(BaseCommand):
+    help = "Recompute the running spend of every budget from the expense table, or check it for drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', action='append', dest='usernames', metavar='USERNAME',
+            help="Only reconcile/check this user (can be repeated). Defaults to every user.",
+        )
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Only compare budgets with the expense table; exit with an error if they differ.",
+        )
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options['usernames']:
+            users = get_user_model().objects.filter(username__in=options['usernames'])
+            user_ids = list(users.values_list('id', flat=True))
+            if len(user_ids) != len(set(options['usernames'])):
+                raise CommandError("One or more users do not exist.")
+
+        if options['check']:
+            drift = find_budget_drift(user_ids)
+            for user_id, category, period, expected, stored in drift:
+                self.stdout.write(
+                    f"user={user_id} category={category} period={period} expected={expected} stored={stored}"
+                )
+            if drift:
+                raise CommandError(f"{len(drift)} budget(s) out of sync. Run without --check to reconcile.")
+            self.stdout.write(self.style.SUCCESS("Budgets are in sync."))
+            return
+
+        budgets = reconcile_budgets(user_ids)
+        self.stdout.write(self.style.SUCCESS(f"Reconciled {budgets} budget(s)."))
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.6 on 2026-10-17 06:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+from expenses.operations import AddIndexConcurrentlyOnPostgres
+
+
+class Migration(migrations.Migration):
+
+    #CREATE INDEX CONCURRENTLY can't run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ('expenses', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyOnPostgres(
+            model_name='expense',
+            index=models.Index(fields=['user', '-date', '-id'], name='expense_user_date_idx'),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='expense',
+            index=models.Index(fields=['user', 'category', '-date', '-id'], name='expense_user_cat_date_idx'),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='expense',
+            index=models.Index(fields=['user', 'amount', 'id'], name='expense_user_amount_idx'),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='expense',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='expense_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,124 @@
+# Generated by Django 5.1.6 on 2026-10-17 06:05
+
+import logging
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, transaction
+from django.db.utils import OperationalError, ProgrammingError
+
+from expenses.operations import AddIndexConcurrentlyOnPostgres
+
+logger = logging.getLogger(__name__)
+
+
+#The trigger keeps search_vector in sync for every write path, including
+#bulk_create, queryset.update() and raw COPY loads that bypass Model.save().
+CREATE_SEARCH_TRIGGER = """
+CREATE OR REPLACE FUNCTION expenses_expense_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := to_tsvector('english', coalesce(NEW.description, ''));
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER expenses_expense_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF description ON expenses_expense
+    FOR EACH ROW EXECUTE FUNCTION expenses_expense_search_vector_update();
+"""
+
+#Rows written before the trigger existed are filled in this many ids at a time, each batch
+#in its own transaction, so no single statement locks or rewrites the whole table.
+BACKFILL_BATCH_SIZE = 10000
+
+BACKFILL_SEARCH_VECTOR = """
+UPDATE expenses_expense SET search_vector = to_tsvector('english', coalesce(description, ''))
+WHERE id >= %s AND id < %s AND search_vector IS NULL
+"""
+
+DROP_SEARCH_TRIGGER = """
+DROP TRIGGER IF EXISTS expenses_expense_search_vector_trigger ON expenses_expense;
+DROP FUNCTION IF EXISTS expenses_expense_search_vector_update();
+"""
+
+
+def create_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(CREATE_SEARCH_TRIGGER)
+
+
+def drop_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(DROP_SEARCH_TRIGGER)
+
+
+def backfill_search_vector(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT min(id), max(id) FROM expenses_expense")
+        low, high = cursor.fetchone()
+    if low is None:
+        return
+    for start in range(low, high + 1, BACKFILL_BATCH_SIZE):
+        with transaction.atomic(using=connection.alias):
+            schema_editor.execute(BACKFILL_SEARCH_VECTOR, [start, start + BACKFILL_BATCH_SIZE])
+
+
+def create_trigram_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+    #pg_trgm is optional: it is not shipped by every Postgres build and creating it may need privileges.
+    #Without it only the trigram index is skipped; any other error fails the migration.
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            logger.warning("pg_trgm is not available: skipping the expense description trigram index.")
+            return
+    try:
+        with transaction.atomic(using=connection.alias):
+            schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    except (ProgrammingError, OperationalError) as e:
+        logger.warning("Could not create the pg_trgm extension, skipping the expense description trigram index: %s", e)
+        return
+    #Left out of the model state because it depends on the extension, so built here rather than
+    #by AddIndexConcurrentlyOnPostgres
+    schema_editor.execute(
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS expense_description_trgm_idx "
+        "ON expenses_expense USING gin (description gin_trgm_ops)"
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX CONCURRENTLY IF EXISTS expense_description_trgm_idx")
+
+
+class Migration(migrations.Migration):
+
+    #CREATE INDEX CONCURRENTLY can't run inside a transaction, and the backfill commits batch by batch.
+    atomic = False
+
+    dependencies = [
+        ('expenses', '0002_expense_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='expense',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_trigger, drop_search_trigger),
+        migrations.RunPython(backfill_search_vector, migrations.RunPython.noop),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='expense',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='expense_search_vector_idx'),
+        ),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.6 on 2026-10-17 06:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_rollups(apps, schema_editor):
+    Expense = apps.get_model('expenses', 'Expense')
+    ExpenseRollup = apps.get_model('expenses', 'ExpenseRollup')
+    qn = schema_editor.connection.ops.quote_name
+    schema_editor.execute(
+        f"INSERT INTO {qn(ExpenseRollup._meta.db_table)} "
+        f"({qn('user_id')}, {qn('date')}, {qn('category')}, {qn('total')}, {qn('count')}) "
+        f"SELECT {qn('user_id')}, {qn('date')}, {qn('category')}, SUM({qn('amount')}), COUNT(*) "
+        f"FROM {qn(Expense._meta.db_table)} "
+        f"GROUP BY {qn('user_id')}, {qn('date')}, {qn('category')}"
+    )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0003_expense_search_vector'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExpenseRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('category', models.CharField(choices=[('GROCERIES', 'Groceries'), ('LEISURE', 'Leisure'), ('ELECTRONICS', 'Electronics'), ('UTILITIES', 'Utilities'), ('CLOTHING', 'Clothing'), ('HEALTH', 'Health'), ('OTHERS', 'Others')], max_length=20)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='expense_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'date', 'category'), name='unique_expense_rollup')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
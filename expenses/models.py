@@ -1,4 +1,6 @@
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.conf import settings
 from django.utils import timezone
 
@@ -26,11 +28,82 @@ class Expense(models.Model):
     category = models.CharField(max_length=20, choices=CATEGORY_CHOICES)
     created_at = models.DateTimeField(auto_now_add=True) #auto now add: Sets the field value only when the model is first created
     updated_at = models.DateTimeField(auto_now=True) #auto_now: Updates the field value every time the model is saved. Field is always updated, even if you don't explicitly set it
+    #Full-text document for the description, maintained by a database trigger on PostgreSQL (see migration 0003).
+    #Stays NULL on other databases, where search falls back to a substring match.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        #Every list query filters by user first, then sorts on one of the ordering fields
+        #with id as the keyset tiebreaker, so each index leads with user_id.
+        indexes = [
+            models.Index(fields=['user', '-date', '-id'], name='expense_user_date_idx'),
+            models.Index(fields=['user', 'category', '-date', '-id'], name='expense_user_cat_date_idx'),
+            models.Index(fields=['user', 'amount', 'id'], name='expense_user_amount_idx'),
+            models.Index(fields=['user', 'created_at', 'id'], name='expense_user_created_idx'),
+            #Full-text search; only created on PostgreSQL
+            GinIndex(fields=['search_vector'], name='expense_search_vector_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.category} - {self.amount}"
 
 
+
+class ExpenseRollup(models.Model):
+    '''
+    Per-user, per-day, per-category totals of expenses.
+    Maintained incrementally on every expense write (see expenses/rollups.py) so summaries
+    never have to scan the expense table; rebuild_expense_rollups recomputes them from scratch.
+    '''
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='expense_rollups'
+    )
+    date = models.DateField()
+    category = models.CharField(max_length=20, choices=Expense.CATEGORY_CHOICES)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'date', 'category'], name='unique_expense_rollup'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.date} - {self.category} - {self.total}"
+
+
+class Budget(models.Model):
+    '''
+    A user's monthly spending limit for one category.
+    `spent` is a running total for the month starting at period_start, kept up to date in the
+    same transaction as every expense write (see expenses/budgets.py), so threshold checks
+    never sum expenses; reconcile_budgets recomputes it from the expense table.
+    '''
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='budgets'
+    )
+    category = models.CharField(max_length=20, choices=Expense.CATEGORY_CHOICES)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    threshold = models.PositiveSmallIntegerField(default=80) #Percent of amount at which to alert
+    period_start = models.DateField() #First day of the month `spent` covers
+    spent = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    alerted_period = models.DateField(null=True, blank=True) #period_start of the last alert, one per month
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'category'], name='unique_budget'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.category} - {self.spent}/{self.amount}"
+
+
 '''
 Use blank=True when you want to make a field optional in forms
 Use null=True when you want to allow NULL values in database
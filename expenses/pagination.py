@@ -0,0 +1,159 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+import json
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class ExpenseKeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination for the expense list.
+
+    Rows are ordered by one of the whitelisted ordering fields with `id` as a
+    tiebreaker, and each page starts strictly after the (value, id) pair of the
+    last row of the previous page. Every page is a single index range scan of
+    page_size + 1 rows, so page 5000 costs the same as page 1: no OFFSET and no
+    COUNT(*).
+
+    The cursor is an opaque urlsafe-base64 token; clients must only follow the
+    `next`/`previous` links and never build cursors themselves.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 50
+    max_page_size = 500
+    invalid_cursor_message = "Invalid cursor."
+
+    def is_requested(self, request):
+        #Pagination is opt-in so existing v1 clients keep receiving a plain list.
+        params = request.query_params
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def get_page_size(self, request):
+        value = request.query_params.get(self.page_size_query_param)
+        if value is None:
+            return self.page_size
+        try:
+            page_size = int(value)
+        except ValueError:
+            raise ValidationError("page_size must be a positive integer.")
+        if page_size <= 0:
+            raise ValidationError("page_size must be a positive integer.")
+        return min(page_size, self.max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None, ordering='-date', position=None):
+        """
+        `position` maps a result row to its (ordering value, id) pair. It defaults to
+        reading model attributes; pass one when paginating a values_list() queryset.
+        """
+        page_queryset = self.get_page_queryset(queryset, request, ordering, position)
+        return self.set_page(list(page_queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None, ordering='-date', position=None):
+        """
+        paginate_queryset() for async views, reading the page with async iteration.
+        """
+        page_queryset = self.get_page_queryset(queryset, request, ordering, position)
+        return self.set_page([row async for row in page_queryset])
+
+    def get_page_queryset(self, queryset, request, ordering, position):
+        self.request = request
+        self.ordering = ordering
+        self.page_size = self.get_page_size(request)
+
+        field_name = ordering.lstrip('-')
+        descending = ordering.startswith('-')
+        self.field = queryset.model._meta.get_field(field_name)
+        self.position = position or (lambda row: (getattr(row, field_name), row.pk))
+
+        self.cursor = self.decode_cursor(request)
+        self.reverse = self.cursor is not None and self.cursor['reverse']
+
+        #Walking backwards flips both the sort and the comparison.
+        if descending != self.reverse:
+            queryset = queryset.order_by(f'-{field_name}', '-id')
+            lookup = 'lt'
+        else:
+            queryset = queryset.order_by(field_name, 'id')
+            lookup = 'gt'
+
+        if self.cursor is not None:
+            queryset = queryset.filter(
+                Q(**{f'{field_name}__{lookup}': self.cursor['value']}) |
+                Q(**{field_name: self.cursor['value'], f'id__{lookup}': self.cursor['id']})
+            )
+
+        #Fetch one extra row to learn whether another page exists without counting.
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, results):
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if self.reverse:
+            results.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_data(self, data):
+        return {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.build_link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            #Stepped past the last row; the previous page is the first one.
+            url = self.request.build_absolute_uri()
+            return remove_query_param(url, self.cursor_query_param)
+        return self.build_link(self.page[0], reverse=True)
+
+    def build_link(self, row, reverse):
+        value, pk = self.position(row)
+        value = value.isoformat() if hasattr(value, 'isoformat') else str(value)
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(value, pk, reverse))
+
+    def encode_cursor(self, value, pk, reverse):
+        payload = {'o': self.ordering, 'v': value, 'i': pk, 'r': int(reverse)}
+        encoded = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        return urlsafe_b64encode(encoded).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            payload = json.loads(urlsafe_b64decode(padded.encode('ascii')))
+            if payload['o'] != self.ordering:
+                #A cursor only makes sense for the ordering it was issued for.
+                raise ValueError
+            return {
+                'value': self.field.to_python(payload['v']),
+                'id': int(payload['i']),
+                'reverse': bool(payload['r']),
+            }
+        except (TypeError, ValueError, KeyError, DjangoValidationError):
+            raise ValidationError(self.invalid_cursor_message)
@@ -0,0 +1,22 @@
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.settings import api_settings
+
+from .renderers import msgpack
+
+
+class MessagePackParser(BaseParser):
+    """
+    Request bodies encoded as MessagePack (Content-Type: application/msgpack).
+    """
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, msgpack.UnpackException) as exc:
+            raise ParseError(f"MessagePack parse error - {exc or type(exc).__name__}")
+
+
+#Request formats the expense endpoints accept: the defaults plus MessagePack when msgpack is installed.
+EXPENSE_PARSERS = [*api_settings.DEFAULT_PARSER_CLASSES] + ([MessagePackParser] if msgpack else [])
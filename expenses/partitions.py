@@ -0,0 +1,317 @@
+"""
+Optional PostgreSQL declarative partitioning of the expense table by date range.
+
+partition_expenses() rebuilds expenses_expense as a table PARTITIONED BY RANGE (date) with
+one partition per month or year plus a DEFAULT partition for dates outside them, and
+unpartition_expenses() turns it back into a plain table. Both copy the rows, indexes,
+foreign keys and triggers in one transaction that locks the table. The primary key
+becomes (id, date), since PostgreSQL requires it to contain the partition key; ids still
+come from a single sequence.
+
+create_partitions() and detach_partitions() are the routine maintenance, run by
+`manage.py expense_partitions maintain`.
+"""
+import json
+import re
+from collections import namedtuple
+from datetime import date, timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .cache import invalidate_user
+from .models import Expense, ExpenseRollup
+
+INTERVALS = ['month', 'year']
+TABLE = Expense._meta.db_table
+DEFAULT_PARTITION = f'{TABLE}_default'
+
+Partition = namedtuple('Partition', ['name', 'start', 'end'])
+
+_BOUNDS = re.compile(r"FROM \('(\d{4}-\d{2}-\d{2})'\) TO \('(\d{4}-\d{2}-\d{2})'\)")
+
+
+def interval_start(day, interval):
+    return day.replace(day=1) if interval == 'month' else day.replace(month=1, day=1)
+
+
+def next_start(start, interval):
+    if interval == 'month':
+        return (start.replace(day=1) + timedelta(days=32)).replace(day=1)
+    return start.replace(year=start.year + 1, month=1, day=1)
+
+
+def partition_name(start, interval):
+    return f"{TABLE}_p{start:%Y_%m}" if interval == 'month' else f"{TABLE}_p{start:%Y}"
+
+
+def qn(name):
+    return connection.ops.quote_name(name)
+
+
+def is_partitioned():
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [TABLE])
+        row = cursor.fetchone()
+    return row is not None and row[0] == 'p'
+
+
+def list_partitions():
+    """
+    The attached partitions ordered by start date; the DEFAULT partition comes last
+    with start and end None.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = to_regclass(%s)",
+            [TABLE],
+        )
+        rows = cursor.fetchall()
+    partitions, default = [], []
+    for name, bound in rows:
+        match = _BOUNDS.search(bound)
+        if match is None:
+            default.append(Partition(name, None, None))
+            continue
+        start, end = (date.fromisoformat(value) for value in match.groups())
+        partitions.append(Partition(name, start, end))
+    return sorted(partitions, key=lambda partition: partition.start) + default
+
+
+def detect_interval(partitions):
+    ranges = [partition for partition in partitions if partition.start is not None]
+    if not ranges:
+        return 'month'
+    return 'month' if (ranges[0].end - ranges[0].start).days <= 31 else 'year'
+
+
+def _table_objects(cursor, table):
+    """
+    Everything on `table` that a rebuild has to recreate: the primary key name, the last
+    id handed out, and the definitions of its other indexes, constraints and triggers.
+    """
+    cursor.execute(
+        "SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'p'", [table]
+    )
+    primary_key = cursor.fetchone()[0]
+    cursor.execute(
+        "SELECT indexdef FROM pg_indexes WHERE schemaname = current_schema() AND tablename = %s "
+        "AND indexname <> %s ORDER BY indexname",
+        [table, primary_key],
+    )
+    #Indexes of a partitioned table are listed as "ON ONLY <table>".
+    indexes = [definition.replace(' ON ONLY ', ' ON ', 1) for definition, in cursor.fetchall()]
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = %s::regclass AND contype IN ('f', 'c') ORDER BY conname",
+        [table],
+    )
+    constraints = cursor.fetchall()
+    cursor.execute(
+        "SELECT pg_get_triggerdef(oid) FROM pg_trigger WHERE tgrelid = %s::regclass AND NOT tgisinternal "
+        "ORDER BY tgname",
+        [table],
+    )
+    triggers = [definition for definition, in cursor.fetchall()]
+    cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [table])
+    sequence = cursor.fetchone()[0]
+    cursor.execute(f"SELECT last_value FROM {sequence}")
+    last_id = cursor.fetchone()[0]
+    return {
+        'primary_key': primary_key, 'indexes': indexes, 'constraints': constraints,
+        'triggers': triggers, 'last_id': last_id,
+    }
+
+
+def _rebuild(cursor, partition_clause, create_partitions, identity):
+    """
+    Replace the expense table with a copy created with `partition_clause`, keeping its
+    name, rows, indexes, constraints, triggers and id sequence.
+    """
+    table, new = qn(TABLE), qn(f'{TABLE}_rebuild')
+    # Deferred foreign key checks from earlier writes in this transaction would block the DROP
+    cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+    cursor.execute(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE")
+    objects = _table_objects(cursor, TABLE)
+
+    cursor.execute(f"CREATE TABLE {new} (LIKE {table} INCLUDING DEFAULTS) {partition_clause}")
+    #The id default would tie the new table to the old table's sequence, which is dropped with it.
+    cursor.execute(f"ALTER TABLE {new} ALTER COLUMN {qn('id')} DROP DEFAULT")
+    create_partitions(new)
+    cursor.execute(f"INSERT INTO {new} SELECT * FROM {table}")
+    cursor.execute(f"DROP TABLE {table}")
+    cursor.execute(f"ALTER TABLE {new} RENAME TO {table}")
+
+    key = f"{qn('id')}, {qn('date')}" if partition_clause else qn('id')
+    cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {qn(objects['primary_key'])} PRIMARY KEY ({key})")
+    if identity:
+        cursor.execute(f"ALTER TABLE {table} ALTER COLUMN {qn('id')} ADD GENERATED BY DEFAULT AS IDENTITY")
+    else:
+        #PostgreSQL before 17 does not allow identity columns on partitioned tables.
+        sequence = qn(f'{TABLE}_id_seq')
+        cursor.execute(f"CREATE SEQUENCE {sequence} OWNED BY {table}.{qn('id')}")
+        cursor.execute(f"ALTER TABLE {table} ALTER COLUMN {qn('id')} SET DEFAULT nextval('{sequence}')")
+    cursor.execute(
+        f"SELECT setval(pg_get_serial_sequence(%s, 'id'), GREATEST(%s, (SELECT MAX({qn('id')}) FROM {table}), 1))",
+        [TABLE, objects['last_id']],
+    )
+    for definition in objects['indexes']:
+        cursor.execute(definition)
+    for name, definition in objects['constraints']:
+        cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {qn(name)} {definition}")
+    for definition in objects['triggers']:
+        cursor.execute(definition)
+    cursor.execute(f"ANALYZE {table}")
+
+
+def partition_expenses(interval='month', ahead=3, since=None):
+    """
+    Convert the expense table to range partitions by date.
+
+    Partitions cover every `interval` from the oldest expense (or `since`) to `ahead`
+    intervals past the current one; older and later dates go to the DEFAULT partition.
+    Returns the number of range partitions created.
+    """
+    if interval not in INTERVALS:
+        raise ValueError(f"interval must be one of: {', '.join(INTERVALS)}.")
+    if connection.vendor != 'postgresql':
+        raise ValueError("Partitioning needs PostgreSQL.")
+    if is_partitioned():
+        raise ValueError("The expense table is already partitioned.")
+
+    today = timezone.now().date()
+    with transaction.atomic(), connection.cursor() as cursor:
+        if since is None:
+            cursor.execute(f"SELECT MIN({qn('date')}) FROM {qn(TABLE)}")
+            since = cursor.fetchone()[0] or today
+        starts = [interval_start(min(since, today), interval)]
+        last = interval_start(today, interval)
+        for _ in range(ahead):
+            last = next_start(last, interval)
+        while starts[-1] < last:
+            starts.append(next_start(starts[-1], interval))
+
+        def create(parent):
+            for start in starts:
+                cursor.execute(
+                    f"CREATE TABLE {qn(partition_name(start, interval))} PARTITION OF {parent} "
+                    f"FOR VALUES FROM (%s) TO (%s)",
+                    [start, next_start(start, interval)],
+                )
+            cursor.execute(f"CREATE TABLE {qn(DEFAULT_PARTITION)} PARTITION OF {parent} DEFAULT")
+
+        _rebuild(cursor, f"PARTITION BY RANGE ({qn('date')})", create, identity=False)
+    return len(starts)
+
+
+def unpartition_expenses():
+    """
+    Turn the partitioned expense table back into a plain table. Detached partitions are not included.
+    """
+    if not is_partitioned():
+        raise ValueError("The expense table is not partitioned.")
+    with transaction.atomic(), connection.cursor() as cursor:
+        _rebuild(cursor, '', lambda parent: None, identity=True)
+
+
+def create_partitions(until, interval=None):
+    """
+    Add the partitions that follow the newest one, up to the one containing `until`.
+    Rows already stored in the DEFAULT partition for those dates are moved into them.
+    Returns the names of the new partitions.
+    """
+    if not is_partitioned():
+        raise ValueError("The expense table is not partitioned.")
+    partitions = list_partitions()
+    interval = interval or detect_interval(partitions)
+    ranges = [partition for partition in partitions if partition.start is not None]
+    has_default = len(ranges) != len(partitions)
+    start = ranges[-1].end if ranges else interval_start(timezone.now().date(), interval)
+    table, default = qn(TABLE), qn(DEFAULT_PARTITION)
+
+    created = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        while start <= until:
+            end = next_start(start, interval)
+            name = qn(partition_name(start, interval))
+            moved = False
+            if has_default:
+                cursor.execute(
+                    f"SELECT EXISTS (SELECT 1 FROM {default} WHERE {qn('date')} >= %s AND {qn('date')} < %s)",
+                    [start, end],
+                )
+                moved = cursor.fetchone()[0]
+            if moved:
+                #A new partition cannot be attached while the DEFAULT partition holds rows in its range.
+                cursor.execute(f"ALTER TABLE {table} DETACH PARTITION {default}")
+            cursor.execute(
+                f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)", [start, end]
+            )
+            if moved:
+                cursor.execute(
+                    f"WITH moved AS (DELETE FROM {default} WHERE {qn('date')} >= %s AND {qn('date')} < %s "
+                    f"RETURNING *) INSERT INTO {table} SELECT * FROM moved",
+                    [start, end],
+                )
+                cursor.execute(f"ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT")
+            created.append(partition_name(start, interval))
+            start = end
+    return created
+
+
+def detach_partitions(before, drop=False):
+    """
+    Detach the partitions that end on or before `before`. They stay in the database as
+    standalone archive tables, or are dropped with drop=True. Their rows leave the API,
+    so the matching rollups are removed and the owners' cached responses invalidated.
+    Returns the names of the detached partitions.
+    """
+    if not is_partitioned():
+        raise ValueError("The expense table is not partitioned.")
+    old = [partition for partition in list_partitions() if partition.end is not None and partition.end <= before]
+    table = qn(TABLE)
+    user_ids = set()
+    with transaction.atomic(), connection.cursor() as cursor:
+        for partition in old:
+            name = qn(partition.name)
+            cursor.execute(f"SELECT DISTINCT {qn('user_id')} FROM {name}")
+            user_ids.update(user_id for user_id, in cursor.fetchall())
+            cursor.execute(f"ALTER TABLE {table} DETACH PARTITION {name}")
+            ExpenseRollup.objects.filter(date__gte=partition.start, date__lt=partition.end).delete()
+            if drop:
+                cursor.execute(f"DROP TABLE {name}")
+                continue
+            #An archive must not depend on the live id sequence or block deleting its users.
+            cursor.execute(f"ALTER TABLE {name} ALTER COLUMN {qn('id')} DROP DEFAULT")
+            cursor.execute(
+                "SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'f'",
+                [partition.name],
+            )
+            for constraint, in cursor.fetchall():
+                cursor.execute(f"ALTER TABLE {name} DROP CONSTRAINT {qn(constraint)}")
+        for user_id in user_ids:
+            invalidate_user(user_id)
+    return [partition.name for partition in old]
+
+
+def scanned_partitions(queryset):
+    """
+    The expense partitions PostgreSQL's plan for `queryset` reads, i.e. what is left
+    after partition pruning. Empty when the table is not partitioned.
+    """
+    plan = queryset.explain(format='json')
+    nodes = json.loads(plan) if isinstance(plan, str) else plan
+    found = set()
+    while nodes:
+        node = nodes.pop()
+        if isinstance(node, list):
+            nodes.extend(node)
+        elif isinstance(node, dict):
+            relation = node.get('Relation Name', '')
+            if relation.startswith(f'{TABLE}_'):
+                found.add(relation)
+            nodes.extend(value for value in node.values() if isinstance(value, (list, dict)))
+    return sorted(found)
@@ -0,0 +1,98 @@
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; without it this is the stock JSONRenderer
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional; without it the MessagePack format is not offered
+    msgpack = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that encodes with orjson when it is installed.
+
+    The output is byte-for-byte what JSONRenderer produces for the compact,
+    non-ASCII-escaping settings this project uses: values orjson does not
+    handle natively (Decimal, ErrorDetail and other str/dict/list subclasses,
+    datetimes) are passed to DRF's own encoder, and U+2028/U+2029 are escaped
+    the same way. Pretty-printed output (indent=..., the browsable API) and
+    anything orjson rejects go through the stock renderer.
+    """
+    if orjson is not None:
+        options = orjson.OPT_PASSTHROUGH_SUBCLASS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def default(self, obj):
+        if isinstance(obj, str):
+            return str(obj)
+        if isinstance(obj, dict):
+            return dict(obj)
+        if isinstance(obj, (list, tuple)):
+            return list(obj)
+        return self.encoder_class().default(obj)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.default, option=self.options)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+def to_columns(data):
+    """
+    A list of objects as one array per field, {"id": [...], "amount": [...], ...}, in the
+    field order of the objects. Paginated responses get their results converted; details
+    and errors are returned unchanged.
+    """
+    if isinstance(data, dict) and isinstance(data.get('results'), list):
+        return {**data, 'results': to_columns(data['results'])}
+    if isinstance(data, list) and (not data or isinstance(data[0], dict)):
+        return {field: [item[field] for item in data] for field in (data[0] if data else ())}
+    return data
+
+
+class ColumnarJSONRenderer(FastJSONRenderer):
+    """
+    Lists as one JSON array per field instead of one object per expense, so field names
+    are sent once rather than once per row. Request it with ?format=columnar or
+    Accept: application/vnd.expense-tracker.columnar+json.
+    """
+    media_type = 'application/vnd.expense-tracker.columnar+json'
+    format = 'columnar'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return super().render(to_columns(data), accepted_media_type, renderer_context)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    The JSON data encoded as MessagePack (?format=msgpack or Accept: application/msgpack).
+    Values MessagePack has no type for are encoded as JSONRenderer would format them.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def default(self, obj):
+        return encoders.JSONEncoder().default(obj)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=self.default)
+
+
+#Representations of the expense endpoints, JSON first as the default.
+EXPENSE_RENDERERS = [FastJSONRenderer, ColumnarJSONRenderer] + ([MessagePackRenderer] if msgpack else [])
@@ -0,0 +1,152 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+
+from .budgets import apply_budget_changes
+from .models import Expense, ExpenseRollup
+
+UPSERT_BATCH_SIZE = 100
+
+
+class RollupDelta:
+    """
+    Accumulates the change a write makes to a user's (date, category) rollup buckets,
+    then applies it in a single upsert so concurrent writers never lose an increment.
+    The same change is added to the user's budget spend (see expenses/budgets.py).
+
+        delta = RollupDelta(user_id)
+        delta.remove(old_expense)
+        delta.add(new_expense)
+        delta.apply()
+
+    apply() must run inside the same transaction as the expense write.
+    """
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.buckets = defaultdict(lambda: [Decimal('0'), 0])
+
+    def add_amount(self, date, category, amount, count=1):
+        bucket = self.buckets[(date, category)]
+        bucket[0] += Decimal(str(amount))
+        bucket[1] += count
+
+    def add(self, expense):
+        self.add_amount(expense.date, expense.category, expense.amount)
+
+    def remove(self, expense):
+        self.add_amount(expense.date, expense.category, -Decimal(str(expense.amount)), count=-1)
+
+    def changes(self):
+        """
+        Non-empty (date, category, total, count) changes; an update that touches
+        neither amount, date nor category cancels out to nothing.
+        """
+        return [
+            (date, category, total, count)
+            for (date, category), (total, count) in self.buckets.items()
+            if total or count
+        ]
+
+    def apply(self):
+        changes = self.changes()
+        if not changes:
+            return
+        upsert_rollups(self.user_id, changes)
+        apply_budget_changes(self.user_id, changes)
+        if any(count < 0 for _, _, _, count in changes):
+            #Drop buckets whose last expense was removed so summaries don't list empty groups.
+            ExpenseRollup.objects.filter(
+                user_id=self.user_id,
+                date__in={date for date, _, _, _ in changes},
+                count__lte=0,
+            ).delete()
+
+
+def upsert_rollups(user_id, changes):
+    """
+    Add (date, category, total, count) increments to the user's rollup rows with
+    INSERT ... ON CONFLICT DO UPDATE, which PostgreSQL and SQLite both support.
+    """
+    qn = connection.ops.quote_name
+    table = qn(ExpenseRollup._meta.db_table)
+    columns = ', '.join(qn(column) for column in ['user_id', 'date', 'category', 'total', 'count'])
+    for start in range(0, len(changes), UPSERT_BATCH_SIZE):
+        batch = changes[start:start + UPSERT_BATCH_SIZE]
+        values = ', '.join(['(%s, %s, %s, %s, %s)'] * len(batch))
+        params = []
+        for date, category, total, count in batch:
+            params.extend([user_id, date, category, total, count])
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} ({columns}) VALUES {values} "
+                f"ON CONFLICT ({qn('user_id')}, {qn('date')}, {qn('category')}) DO UPDATE SET "
+                f"{qn('total')} = {table}.{qn('total')} + EXCLUDED.{qn('total')}, "
+                f"{qn('count')} = {table}.{qn('count')} + EXCLUDED.{qn('count')}",
+                params,
+            )
+
+
+def rebuild_rollups(user_ids=None):
+    """
+    Recompute rollups from the expense table with one INSERT ... SELECT.
+    Returns the number of rollup rows written.
+    """
+    qn = connection.ops.quote_name
+    rollup_table = qn(ExpenseRollup._meta.db_table)
+    expense_table = qn(Expense._meta.db_table)
+    where, params = '', []
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        if not user_ids:
+            return 0
+        where = f"WHERE {qn('user_id')} IN ({', '.join(['%s'] * len(user_ids))})"
+        params = user_ids
+
+    with transaction.atomic():
+        rollups = ExpenseRollup.objects.all()
+        if user_ids is not None:
+            rollups = rollups.filter(user_id__in=user_ids)
+        rollups.delete()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {rollup_table} "
+                f"({qn('user_id')}, {qn('date')}, {qn('category')}, {qn('total')}, {qn('count')}) "
+                f"SELECT {qn('user_id')}, {qn('date')}, {qn('category')}, SUM({qn('amount')}), COUNT(*) "
+                f"FROM {expense_table} {where} "
+                f"GROUP BY {qn('user_id')}, {qn('date')}, {qn('category')}",
+                params,
+            )
+            return cursor.rowcount
+
+
+def find_rollup_drift(user_ids=None):
+    """
+    Compare stored rollups against totals computed from the expense table.
+    Returns a list of (user_id, date, category, expected, stored) tuples where
+    expected/stored are (total, count) pairs, or None for a missing bucket.
+    """
+    expenses = Expense.objects.all()
+    rollups = ExpenseRollup.objects.filter(count__gt=0)
+    if user_ids is not None:
+        expenses = expenses.filter(user_id__in=user_ids)
+        rollups = rollups.filter(user_id__in=user_ids)
+
+    expected = {
+        (row['user_id'], row['date'], row['category']): (row['total'], row['count'])
+        for row in expenses.values('user_id', 'date', 'category').annotate(
+            total=Sum('amount'), count=Count('id')
+        ).order_by()
+    }
+    stored = {
+        (row['user_id'], row['date'], row['category']): (row['total'], row['count'])
+        for row in rollups.values('user_id', 'date', 'category', 'total', 'count')
+    }
+
+    drift = []
+    for key in sorted(expected.keys() | stored.keys(), key=lambda k: (k[0], k[1], k[2])):
+        if expected.get(key) != stored.get(key):
+            drift.append((*key, expected.get(key), stored.get(key)))
+    return drift
@@ -0,0 +1,65 @@
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    TrigramWordSimilarity,
+)
+from django.db import connections
+from django.db.models import Case, F, FloatField, Q, Value, When
+
+from .models import Expense
+
+SEARCH_CONFIG = 'english'
+
+_trigram_available = {}
+
+
+def has_trigram_support(alias):
+    """
+    Whether the pg_trgm extension is installed on the given database.
+    The migration only creates it where the server offers it, so check once per alias.
+    """
+    if alias not in _trigram_available:
+        with connections[alias].cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            _trigram_available[alias] = cursor.fetchone() is not None
+    return _trigram_available[alias]
+
+
+def matching_categories(term):
+    """
+    Categories are a fixed set of codes, so match them in Python and hand the
+    database an indexable `category IN (...)` instead of `category ILIKE '%term%'`.
+    """
+    term = term.upper()
+    return [code for code, _ in Expense.CATEGORY_CHOICES if term in code]
+
+
+def search_expenses(queryset, term):
+    """
+    Filter the queryset to expenses matching `term` and annotate each row
+    with a `search_rank` (higher is more relevant).
+
+    On PostgreSQL the description is matched through the GIN-indexed
+    `search_vector` column (kept in sync by a trigger) and, when pg_trgm is
+    installed, a trigram word-similarity match for partial or misspelled
+    words. Other databases fall back to a case-insensitive substring match.
+    """
+    categories = Q(category__in=matching_categories(term))
+    connection = connections[queryset.db]
+
+    if connection.vendor != 'postgresql':
+        rank = Case(
+            When(description__istartswith=term, then=Value(2.0)),
+            When(description__icontains=term, then=Value(1.0)),
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+        return queryset.filter(Q(description__icontains=term) | categories).annotate(search_rank=rank)
+
+    query = SearchQuery(term, config=SEARCH_CONFIG, search_type='websearch')
+    matches = Q(search_vector=query) | categories
+    rank = SearchRank(F('search_vector'), query)
+    if has_trigram_support(queryset.db):
+        matches |= Q(description__trigram_word_similar=term)
+        rank = rank + TrigramWordSimilarity(term, 'description')
+    return queryset.filter(matches).annotate(search_rank=rank)
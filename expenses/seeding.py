@@ -0,0 +1,193 @@
+import csv
+import io
+import multiprocessing
+import random
+from datetime import datetime, time as datetime_time, timedelta, timezone as dt_timezone
+from collections import Counter
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.db import connection, connections, transaction
+from django.utils import timezone
+
+from .cache import invalidate_user
+from .importer import copy_from
+from .models import Expense
+from .budgets import reconcile_budgets
+from .rollups import rebuild_rollups
+
+#Share of expenses, median amount and description vocabulary per category.
+CATEGORY_PROFILES = {
+    'GROCERIES': (0.34, 35, ['Supermarket', 'Farmers market', 'Bakery', 'Butcher', 'Corner shop'],
+                  ['weekly shop', 'fruit and vegetables', 'bread', 'milk and eggs', 'snacks']),
+    'LEISURE': (0.20, 25, ['Cinema', 'Cafe', 'Restaurant', 'Concert hall', 'Bookstore'],
+                ['tickets', 'coffee', 'dinner with friends', 'lunch', 'novel']),
+    'UTILITIES': (0.12, 80, ['Electric company', 'Water board', 'Internet provider', 'Phone carrier'],
+                  ['monthly bill', 'top-up', 'service fee', 'installation']),
+    'CLOTHING': (0.10, 45, ['Outlet', 'Department store', 'Shoe shop', 'Online store'],
+                 ['jacket', 'shoes', 't-shirts', 'jeans', 'winter coat']),
+    'HEALTH': (0.09, 30, ['Pharmacy', 'Dentist', 'Clinic', 'Gym', 'Optician'],
+               ['prescription', 'check-up', 'membership', 'vitamins', 'glasses']),
+    'ELECTRONICS': (0.05, 150, ['Electronics store', 'Online store', 'Repair shop'],
+                    ['headphones', 'charger', 'laptop', 'phone case', 'monitor']),
+    'OTHERS': (0.10, 20, ['Post office', 'Taxi', 'Train station', 'Gift shop', 'Parking'],
+               ['parcel', 'ride', 'ticket', 'birthday gift', 'parking fee']),
+}
+SEARCH_TERMS = sorted({
+    word.lower() for profile in CATEGORY_PROFILES.values() for phrase in profile[3] for word in phrase.split()
+})
+#Distinct amounts drawn up front per category; rows sample from them instead of drawing their own.
+AMOUNT_POOL_SIZE = 4096
+COLUMNS = ['user_id', 'amount', 'date', 'description', 'category', 'created_at', 'updated_at']
+
+
+def create_users(count, prefix='seed', password='SeedPass123!'):
+    """
+    Return `count` users named <prefix>0..<prefix>N-1, creating the missing ones with
+    one bulk insert (the password is hashed once and shared).
+    """
+    User = get_user_model()
+    usernames = [f'{prefix}{i}' for i in range(count)]
+    existing = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+    template = User(username=prefix)
+    template.set_password(password)
+    User.objects.bulk_create(
+        User(username=username, password=template.password, email=f'{username}@example.com')
+        for username in usernames if username not in existing
+    )
+    return list(User.objects.filter(username__in=usernames).order_by('pk'))
+
+
+class ExpenseGenerator:
+    """
+    Deterministic synthetic expenses: each chunk gets its own RNG derived from the seed,
+    so the data is identical whatever the number of worker processes.
+
+    Categories follow CATEGORY_PROFILES, amounts are log-normal around the category's
+    median, and dates cover `days` days back from `today`, weighted towards recent ones.
+    Amounts and descriptions are sampled from pools built once per generator, so a chunk
+    draws each column with a few rng.choices() calls rather than several calls per row.
+    """
+    def __init__(self, seed=0, days=730, today=None):
+        self.seed = seed
+        self.days = days
+        self.today = today or timezone.now().date()
+        self.categories = list(CATEGORY_PROFILES)
+        self.category_weights = list(accumulate(profile[0] for profile in CATEGORY_PROFILES.values()))
+        #Activity grows towards the present: weight 1 for the oldest day, 3 for today.
+        self.day_weights = list(accumulate(1 + 2 * (days - offset) / days for offset in range(days)))
+        self.dates = [self.today - timedelta(days=offset) for offset in range(days)]
+        self.midnights = [datetime.combine(day, datetime_time(), tzinfo=dt_timezone.utc) for day in self.dates]
+        rng = random.Random(seed)
+        self.amounts = {
+            category: [
+                f"{min(median * rng.lognormvariate(0, 0.8), 99_999_999) + 0.01:.2f}"
+                for _ in range(AMOUNT_POOL_SIZE)
+            ]
+            for category, (_, median, _, _) in CATEGORY_PROFILES.items()
+        }
+        self.descriptions = {
+            category: [f"{merchant} - {item}" for merchant in merchants for item in items]
+            for category, (_, _, merchants, items) in CATEGORY_PROFILES.items()
+        }
+
+    def rows(self, chunk, size, user_ids, offset):
+        """
+        Yield `size` rows as tuples in COLUMNS order; row n belongs to user_ids[(offset + n) % len].
+        """
+        rng = random.Random(self.seed * 1_000_003 + chunk)
+        categories = rng.choices(self.categories, cum_weights=self.category_weights, k=size)
+        day_offsets = rng.choices(range(self.days), cum_weights=self.day_weights, k=size)
+        seconds = rng.choices(range(86400), k=size)
+        amounts, descriptions = {}, {}
+        for category, count in Counter(categories).items():
+            amounts[category] = iter(rng.choices(self.amounts[category], k=count))
+            descriptions[category] = iter(rng.choices(self.descriptions[category], k=count))
+        users = len(user_ids)
+        for n, (category, day_offset, second) in enumerate(zip(categories, day_offsets, seconds)):
+            created_at = self.midnights[day_offset] + timedelta(seconds=second)
+            yield (
+                user_ids[(offset + n) % users],
+                next(amounts[category]),
+                self.dates[day_offset],
+                next(descriptions[category]),
+                category,
+                created_at,
+                created_at,
+            )
+
+
+def load_chunk(generator, chunk, size, user_ids, offset):
+    """
+    Insert one chunk in its own transaction: COPY on PostgreSQL, bulk_create elsewhere.
+    """
+    rows = generator.rows(chunk, size, user_ids, offset)
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            qn = connection.ops.quote_name
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(
+                (user_id, amount, day.isoformat(), description, category, created.isoformat(), updated.isoformat())
+                for user_id, amount, day, description, category, created, updated in rows
+            )
+            buffer.seek(0)
+            with connection.cursor() as cursor:
+                copy_from(
+                    cursor,
+                    f"COPY {qn(Expense._meta.db_table)} ({', '.join(qn(column) for column in COLUMNS)}) "
+                    f"FROM STDIN WITH (FORMAT csv)",
+                    buffer,
+                )
+        else:
+            #auto_now/auto_now_add stamp created_at/updated_at with the load time here.
+            Expense.objects.bulk_create(
+                (Expense(**dict(zip(COLUMNS, row))) for row in rows),
+                batch_size=2000,
+            )
+    return size
+
+
+def _load_chunk_in_worker(job):
+    try:
+        return load_chunk(*job)
+    finally:
+        connections.close_all()
+
+
+def seed_expenses(user_ids, count, seed=0, days=730, batch_size=50_000, workers=1, progress=None):
+    """
+    Generate `count` expenses spread round-robin over `user_ids`, then rebuild their
+    rollups, reconcile their budgets and invalidate their cached responses. Returns the number of rows inserted.
+
+    With workers > 1 (PostgreSQL only, where each worker COPYs its own chunks) the chunks
+    are loaded by a pool of forked processes.
+    """
+    generator = ExpenseGenerator(seed=seed, days=days)
+    jobs = [
+        (generator, chunk, min(batch_size, count - offset), user_ids, offset)
+        for chunk, offset in enumerate(range(0, count, batch_size))
+    ]
+    inserted = 0
+    if workers > 1 and connection.vendor == 'postgresql' and len(jobs) > 1:
+        #Children must not share the parent's database connection.
+        connections.close_all()
+        with multiprocessing.get_context('fork').Pool(workers) as pool:
+            for size in pool.imap_unordered(_load_chunk_in_worker, jobs):
+                inserted += size
+                if progress:
+                    progress(inserted)
+    else:
+        for job in jobs:
+            inserted += load_chunk(*job)
+            if progress:
+                progress(inserted)
+
+    #COPY and bulk_create bypass the per-write rollup and budget updates
+    rebuild_rollups(user_ids)
+    reconcile_budgets(user_ids)
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {connection.ops.quote_name(Expense._meta.db_table)}")
+    for user_id in user_ids:
+        invalidate_user(user_id)
+    return inserted
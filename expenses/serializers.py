@@ -1,5 +1,9 @@
 from rest_framework import serializers
-from .models import Expense
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from .models import Budget, Expense
+from .budgets import check_thresholds, current_period, period_spend
+from .rollups import RollupDelta
 
 class ExpenseSerializer(serializers.ModelSerializer):
     _valid_categories = None #Cache the valid categories
@@ -9,6 +13,15 @@ class ExpenseSerializer(serializers.ModelSerializer):
         fields = ['id', 'user', 'amount', 'date', 'description', 'category', 'created_at', 'updated_at']
         read_only_fields = ['id', 'user', 'created_at', 'updated_at']
 
+    def __init__(self, *args, fields=None, **kwargs):
+        """
+        `fields` limits the output to those fields (a sparse fieldset); None keeps them all.
+        """
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
     def validate_amount(self, value):
         if value <= 0:
             raise serializers.ValidationError("The expense amount must be greater than zero.")
@@ -32,4 +45,173 @@ class ExpenseSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         if request and hasattr(request, 'user'):
             validated_data['user'] = request.user
-        return super().create(validated_data)
+        with transaction.atomic():
+            expense = super().create(validated_data)
+            delta = RollupDelta(expense.user_id)
+            delta.add(expense)
+            delta.apply()
+        return expense
+
+    def update(self, instance, validated_data):
+        """
+        Move the expense's old amount/date/category out of the rollups and the new ones in,
+        in the same transaction as the row update.
+        """
+        delta = RollupDelta(instance.user_id)
+        delta.remove(instance)
+        with transaction.atomic():
+            expense = super().update(instance, validated_data)
+            delta.add(expense)
+            delta.apply()
+        return expense
+
+
+#Columns read by the fast list path, in ExpenseSerializer.Meta.fields order.
+EXPENSE_FIELDS = ExpenseSerializer.Meta.fields
+EXPENSE_COLUMNS = ['id', 'user_id', 'amount', 'date', 'description', 'category', 'created_at', 'updated_at']
+FIELD_COLUMNS = dict(zip(EXPENSE_FIELDS, EXPENSE_COLUMNS))
+
+
+def expense_columns(fields=None):
+    """
+    The columns behind `fields` (a subset of EXPENSE_FIELDS, in that order), or all of them.
+    """
+    return EXPENSE_COLUMNS if fields is None else [FIELD_COLUMNS[name] for name in fields]
+
+
+def format_datetime(value, tz):
+    """
+    Same text as the API's DateTimeField output.
+    """
+    value = value.astimezone(tz).isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def serialize_expense_rows(rows, fields=None):
+    """
+    Read-optimised equivalent of ExpenseSerializer(queryset, many=True, fields=fields).data.
+
+    Takes tuples from queryset.values_list(*expense_columns(fields)) and formats them
+    directly, skipping model instantiation and per-field to_representation().
+    The result renders to exactly the same JSON as the serializer output. Columns
+    after those of `fields` (e.g. read for a pagination cursor) are ignored.
+    """
+    tz = timezone.get_current_timezone()
+    if fields is not None and fields != EXPENSE_FIELDS:
+        return serialize_sparse_rows(rows, fields, tz)
+    return [
+        {
+            'id': pk,
+            'user': user_id,
+            'amount': f"{amount:.2f}",
+            'date': date.isoformat(),
+            'description': description,
+            'category': category,
+            'created_at': format_datetime(created_at, tz),
+            'updated_at': format_datetime(updated_at, tz),
+        }
+        for pk, user_id, amount, date, description, category, created_at, updated_at in rows
+    ]
+
+
+def serialize_sparse_rows(rows, fields, tz):
+    formatters = {
+        'amount': lambda value: f"{value:.2f}",
+        'date': lambda value: value.isoformat(),
+        'created_at': lambda value: format_datetime(value, tz),
+        'updated_at': lambda value: format_datetime(value, tz),
+    }
+    columns = [(name, formatters.get(name)) for name in fields]
+    return [
+        {name: value if formatter is None else formatter(value) for (name, formatter), value in zip(columns, row)}
+        for row in rows
+    ]
+
+
+class BudgetSerializer(serializers.ModelSerializer):
+    remaining = serializers.SerializerMethodField()
+    percent_used = serializers.SerializerMethodField()
+    status = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Budget
+        fields = [
+            'id', 'category', 'amount', 'threshold', 'period_start', 'spent',
+            'remaining', 'percent_used', 'status', 'created_at', 'updated_at',
+        ]
+        read_only_fields = ['id', 'period_start', 'spent', 'created_at', 'updated_at']
+
+    def validate_amount(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("The budget amount must be greater than zero.")
+        return value
+
+    def validate_threshold(self, value):
+        if not 1 <= value <= 100:
+            raise serializers.ValidationError("The threshold must be a percentage between 1 and 100.")
+        return value
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.instance is not None:
+            # A budget is addressed by its category, so it can't change
+            fields['category'].read_only = True
+        return fields
+
+    def get_remaining(self, budget):
+        return f"{budget.amount - budget.spent:.2f}"
+
+    def get_percent_used(self, budget):
+        return round(float(budget.spent * 100 / budget.amount), 1)
+
+    def get_status(self, budget):
+        if budget.spent > budget.amount:
+            return 'exceeded'
+        if budget.spent * 100 >= budget.amount * budget.threshold:
+            return 'warning'
+        return 'ok'
+
+    def create(self, validated_data):
+        """
+        Start the budget at the current month's spend in its category, computed once here;
+        from then on expense writes keep it up to date.
+
+        The spend is computed after the insert, in its transaction, with the user's row
+        locked: adding an expense takes a key-share lock on it, so inserts in progress commit
+        first and later ones wait, then find the new budget and add themselves to it.
+        """
+        request = self.context.get('request')
+        if request and hasattr(request, 'user'):
+            validated_data['user'] = request.user
+        user = validated_data['user']
+        period = current_period()
+        validated_data['period_start'] = period
+        try:
+            with transaction.atomic():
+                list(type(user).objects.select_for_update().filter(pk=user.pk).values_list('pk', flat=True))
+                budget = super().create(validated_data)
+                Budget.objects.filter(pk=budget.pk).update(spent=period_spend(period))
+                budget.refresh_from_db(fields=['spent'])
+                check_thresholds(budget.user_id, [budget.category], period)
+        except IntegrityError:
+            raise serializers.ValidationError({'category': ["A budget for this category already exists."]})
+        return budget
+
+    def update(self, instance, validated_data):
+        """
+        A new amount or threshold may be crossed already, so it is checked, and alerts
+        again, right away.
+        """
+        changed = any(
+            name in validated_data and validated_data[name] != getattr(instance, name)
+            for name in ('amount', 'threshold')
+        )
+        if changed:
+            validated_data['alerted_period'] = None
+        with transaction.atomic():
+            budget = super().update(instance, validated_data)
+            if changed:
+                check_thresholds(budget.user_id, [budget.category], budget.period_start)
+        return budget
@@ -0,0 +1,20 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .cache import invalidate_user
+from .models import Expense
+
+
+@receiver(post_save, sender=Expense)
+def invalidate_expense_cache(sender, instance, **kwargs):
+    #Deletes and set-based writes (bulk_create, queryset update/delete) call invalidate_user
+    #themselves: a post_delete receiver would stop Django from fast-deleting querysets.
+    invalidate_user(instance.user_id)
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_new_user_cache(sender, instance, created, **kwargs):
+    #A reused primary key (e.g. after a rollback) must not inherit cached responses.
+    if created:
+        invalidate_user(instance.pk)
@@ -2,9 +2,43 @@ from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.utils import timezone
+from django.utils.http import http_date
 from datetime import timedelta, datetime
 from django.contrib.auth import get_user_model
-from .models import Expense
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, connections
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.http import QueryDict
+from decimal import Decimal
+from asgiref.sync import sync_to_async
+from io import BytesIO, StringIO
+from tempfile import NamedTemporaryFile, TemporaryDirectory
+import os
+import csv
+import gzip
+import json
+import logging
+import time
+from importlib.util import find_spec
+from unittest import skipUnless
+from rest_framework.exceptions import ErrorDetail
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.tokens import RefreshToken
+from .models import Budget, Expense, ExpenseRollup
+from .renderers import FastJSONRenderer
+from .serializers import ExpenseSerializer, EXPENSE_COLUMNS, serialize_expense_rows
+from .rollups import find_rollup_drift, rebuild_rollups
+from .budgets import current_period, find_budget_drift, period_of
+from .seeding import ExpenseGenerator
+from .views import ExpenseView, ExpenseBulkView, ExpenseFilterMixin
+from .async_views import AsyncExpenseView
+from .cache import get_cache, list_cache
+from . import partitions
+from . import urls as expense_urls
+from expense_tracker.testing import QueryBudgetMixin
+from expense_tracker import checks, db_router, log, metrics
 
 User = get_user_model()
 
@@ -187,3 +221,2107 @@ class ExpenseCRUDTests(APITestCase):
         response = self.client.get(expense_detail_url, format='json')
         # Should return 404 Not Found since self.user does not own this expense.
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ExpensePaginationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="pageuser", password="PagePass123!",
+            email="pageuser@example.com", first_name="Page", last_name="User"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('expense-list-create')
+        today = timezone.now().date()
+        # Seven expenses with repeated dates and amounts so the id tiebreaker matters
+        self.expenses = [
+            Expense.objects.create(
+                user=self.user, amount=10 * (i % 3 + 1),
+                date=today - timedelta(days=i // 2),
+                description=f"Page {i}", category="OTHERS"
+            )
+            for i in range(7)
+        ]
+
+    def collect(self, url):
+        """
+        Follow `next` links from the given url and return the ids in page order.
+        """
+        ids = []
+        while url:
+            response = self.client.get(url, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(expense['id'] for expense in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_unpaginated_list_is_unchanged(self):
+        """
+        Without cursor or page_size the endpoint still returns a plain list.
+        """
+        response = self.client.get(self.url, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsInstance(response.data, list)
+        self.assertEqual(len(response.data), 7)
+
+    def test_pages_cover_every_row_once(self):
+        """
+        Walking the `next` links visits every expense exactly once, in order,
+        for each ordering choice.
+        """
+        for ordering in ['-date', 'date', 'amount', '-amount', 'created_at', '-created_at']:
+            field = ordering.lstrip('-')
+            expected = sorted(
+                self.expenses,
+                key=lambda e: (getattr(e, field), e.id),
+                reverse=ordering.startswith('-')
+            )
+            ids = self.collect(f"{self.url}?page_size=2&ordering={ordering}")
+            self.assertEqual(ids, [e.id for e in expected], ordering)
+
+    def test_previous_link_returns_prior_page(self):
+        """
+        The `previous` link of the second page yields the first page again.
+        """
+        first = self.client.get(f"{self.url}?page_size=3&ordering=amount", format='json')
+        self.assertIsNone(first.data['previous'])
+        second = self.client.get(first.data['next'], format='json')
+        back = self.client.get(second.data['previous'], format='json')
+        self.assertEqual(back.data['results'], first.data['results'])
+        self.assertIsNotNone(back.data['next'])
+
+    def test_pagination_respects_filters(self):
+        """
+        Filters from apply_filters apply to every page.
+        """
+        Expense.objects.create(
+            user=self.user, amount=99, date=timezone.now().date(),
+            description="Groceries run", category="GROCERIES"
+        )
+        response = self.client.get(f"{self.url}?page_size=5&category=GROCERIES", format='json')
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNone(response.data['next'])
+
+    def test_page_size_is_capped(self):
+        """
+        page_size above the maximum is clamped instead of rejected.
+        """
+        response = self.client.get(f"{self.url}?page_size=100000", format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 7)
+
+    def test_invalid_cursor(self):
+        """
+        A tampered cursor or one issued for another ordering is rejected.
+        """
+        response = self.client.get(f"{self.url}?cursor=not-a-cursor", format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        first = self.client.get(f"{self.url}?page_size=2&ordering=amount", format='json')
+        cursor = first.data['next'].split('cursor=')[1].split('&')[0]
+        response = self.client.get(f"{self.url}?cursor={cursor}&ordering=date", format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@skipUnless(connection.vendor == 'postgresql', "EXPLAIN plans are only checked on PostgreSQL.")
+class ExpenseQueryPlanTests(APITestCase):
+    """
+    Every filter/ordering combination the list endpoint can produce must be
+    answerable by an index scan on one of the composite (user, ...) indexes,
+    without a sequential scan or an in-memory sort.
+    """
+    filters = [
+        {},
+        {'filter': 'past_month'},
+        {'filter': 'custom', 'start_date': '2024-01-01', 'end_date': '2024-12-31'},
+        {'category': 'GROCERIES'},
+        {'min_amount': '10', 'max_amount': '100'},
+    ]
+    orderings = ['-date', 'date', 'amount', '-amount', 'created_at', '-created_at']
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="planuser", password="PlanPass123!")
+        Expense.objects.bulk_create(
+            Expense(
+                user=self.user, amount=i % 50 + 1,
+                date=timezone.now().date() - timedelta(days=i % 400),
+                description=f"Plan {i}", category=Expense.CATEGORY_CHOICES[i % 7][0]
+            )
+            for i in range(500)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE expenses_expense")
+            #Make any plan that needs a seq scan or a sort prohibitively expensive, so
+            #the planner only avoids them when a matching index really exists.
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("SET LOCAL enable_sort = off")
+
+    def assertIndexPlan(self, queryset, label):
+        plan = queryset.explain()
+        self.assertIn("Index", plan, f"{label}:\n{plan}")
+        self.assertNotIn("Seq Scan", plan, f"{label}:\n{plan}")
+        self.assertNotIn("Sort", plan, f"{label}:\n{plan}")
+
+    def test_list_queries_use_index_scans(self):
+        view = ExpenseView()
+        for params in self.filters:
+            query = QueryDict(mutable=True)
+            query.update(params)
+            for ordering in self.orderings:
+                queryset = view.apply_filters(Expense.objects.filter(user=self.user), query)
+                direction = '-' if ordering.startswith('-') else ''
+                label = f"{params} ordering={ordering}"
+                # Plain list ordering and the keyset pagination ordering with the id tiebreaker
+                self.assertIndexPlan(queryset.order_by(ordering), label)
+                self.assertIndexPlan(queryset.order_by(ordering, f'{direction}id')[:51], label + " (keyset)")
+
+
+class ExpenseSearchTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="searchuser", password="SearchPass123!",
+            email="searchuser@example.com", first_name="Search", last_name="User"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('expense-list-create')
+        today = timezone.now().date()
+        self.coffee = Expense.objects.create(
+            user=self.user, amount=4, date=today,
+            description="Coffee with the team", category="LEISURE"
+        )
+        self.coffee_beans = Expense.objects.create(
+            user=self.user, amount=12, date=today - timedelta(days=1),
+            description="Coffee beans and coffee filters", category="GROCERIES"
+        )
+        self.laptop = Expense.objects.create(
+            user=self.user, amount=900, date=today - timedelta(days=2),
+            description="Laptop", category="ELECTRONICS"
+        )
+        self.no_description = Expense.objects.create(
+            user=self.user, amount=30, date=today - timedelta(days=3),
+            description=None, category="HEALTH"
+        )
+
+    def search(self, term, extra=''):
+        response = self.client.get(f"{self.url}?search={term}{extra}", format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [expense['id'] for expense in response.data]
+
+    def test_search_description(self):
+        """
+        Words in the description match, and updated descriptions are searchable.
+        """
+        self.assertCountEqual(self.search("coffee"), [self.coffee.id, self.coffee_beans.id])
+        self.assertEqual(self.search("laptop"), [self.laptop.id])
+
+        self.laptop.description = "Notebook computer"
+        self.laptop.save()
+        self.assertEqual(self.search("notebook"), [self.laptop.id])
+
+    def test_search_category(self):
+        """
+        The search term also matches category codes.
+        """
+        self.assertEqual(self.search("health"), [self.no_description.id])
+        self.assertEqual(self.search("electro"), [self.laptop.id])
+
+    @skipUnless(connection.vendor == 'postgresql', "Full-text ranking is PostgreSQL-only.")
+    def test_search_is_ranked_by_relevance(self):
+        """
+        Without an explicit ordering, the better match comes first.
+        """
+        self.assertEqual(self.search("coffee")[0], self.coffee_beans.id)
+
+    def test_search_with_explicit_ordering(self):
+        """
+        An explicit ordering overrides relevance ranking.
+        """
+        self.assertEqual(self.search("coffee", "&ordering=amount"), [self.coffee.id, self.coffee_beans.id])
+
+    def test_search_is_scoped_to_user(self):
+        other = User.objects.create_user(username="searchother", password="SearchPass123!")
+        Expense.objects.create(
+            user=other, amount=5, date=timezone.now().date(),
+            description="Coffee", category="LEISURE"
+        )
+        self.assertCountEqual(self.search("coffee"), [self.coffee.id, self.coffee_beans.id])
+
+
+class ExpenseSummaryTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="summaryuser", password="SummaryPass123!",
+            email="summaryuser@example.com", first_name="Summary", last_name="User"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.list_url = reverse('expense-list-create')
+        self.summary_url = reverse('expense-summary')
+        self.today = timezone.now().date()
+        for amount, days_ago, category in [
+            ("10.00", 1, "GROCERIES"),
+            ("15.50", 2, "GROCERIES"),
+            ("40.00", 3, "LEISURE"),
+            ("99.99", 60, "GROCERIES"),
+        ]:
+            response = self.client.post(self.list_url, {
+                "amount": amount,
+                "date": (self.today - timedelta(days=days_ago)).strftime("%Y-%m-%d"),
+                "description": f"{category} {amount}",
+                "category": category,
+            }, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def summary(self, query=''):
+        response = self.client.get(f"{self.summary_url}{query}", format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def assertRollupsInSync(self):
+        self.assertEqual(find_rollup_drift([self.user.id]), [])
+
+    def test_summary_by_category(self):
+        data = self.summary()
+        self.assertEqual(data['total'], "165.49")
+        self.assertEqual(data['count'], 4)
+        self.assertEqual(data['results'], [
+            {'category': 'GROCERIES', 'total': '125.49', 'count': 3},
+            {'category': 'LEISURE', 'total': '40.00', 'count': 1},
+        ])
+
+    def test_summary_by_month_and_both(self):
+        months = {row['month'] for row in self.summary('?group_by=month')['results']}
+        self.assertIn((self.today - timedelta(days=60)).strftime('%Y-%m'), months)
+        both = self.summary('?group_by=both')['results']
+        self.assertEqual(sum(row['count'] for row in both), 4)
+        self.assertTrue(all({'month', 'category', 'total', 'count'} == set(row) for row in both))
+
+    def test_summary_honours_filters(self):
+        data = self.summary('?filter=past_week')
+        self.assertEqual(data['total'], "65.50")
+        data = self.summary('?filter=past_week&category=LEISURE')
+        self.assertEqual(data['results'], [{'category': 'LEISURE', 'total': '40.00', 'count': 1}])
+        # Amount ranges are answered from the expense table instead of the rollups
+        data = self.summary('?min_amount=15&max_amount=50')
+        self.assertEqual(data['total'], "55.50")
+        self.assertEqual(data['count'], 2)
+        data = self.summary('?search=leisure&group_by=both')
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(len(data['results']), 1)
+
+    def test_summary_rejects_bad_parameters(self):
+        response = self.client.get(f"{self.summary_url}?group_by=year", format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(f"{self.summary_url}?filter=custom&start_date=bad&end_date=bad", format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rollups_follow_updates_and_deletes(self):
+        expense = Expense.objects.filter(user=self.user, category="LEISURE").get()
+        detail_url = reverse('expense-detail', kwargs={'pk': expense.pk})
+
+        self.client.patch(detail_url, {"category": "HEALTH", "amount": "41.00"}, format='json')
+        self.assertRollupsInSync()
+        self.assertEqual(self.summary('?category=HEALTH')['total'], "41.00")
+
+        self.client.put(detail_url, {
+            "amount": "5.00", "date": (self.today - timedelta(days=90)).strftime("%Y-%m-%d"),
+            "description": "moved", "category": "OTHERS",
+        }, format='json')
+        self.assertRollupsInSync()
+
+        self.client.delete(detail_url, format='json')
+        self.assertRollupsInSync()
+        self.assertEqual(self.summary()['count'], 3)
+        self.assertFalse(ExpenseRollup.objects.filter(user=self.user, count__lte=0).exists())
+
+    def test_rebuild_command(self):
+        ExpenseRollup.objects.filter(user=self.user).update(total=0)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_expense_rollups', '--check', stdout=StringIO())
+        call_command('rebuild_expense_rollups', stdout=StringIO())
+        self.assertRollupsInSync()
+        call_command('rebuild_expense_rollups', '--check', '--user', 'summaryuser', stdout=StringIO())
+
+
+class ExpenseTimeSeriesTests(APITestCase):
+    """
+    Spend per day, week or month, bucketed in the database with every empty bucket filled in.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="seriesuser", password="SeriesPass123!",
+            email="seriesuser@example.com", first_name="Series", last_name="User"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('expense-timeseries')
+        for amount, day, category in [
+            ("10.00", "2024-01-01", "GROCERIES"),
+            ("15.50", "2024-01-03", "GROCERIES"),
+            ("40.00", "2024-01-03", "LEISURE"),
+            ("99.99", "2024-02-15", "GROCERIES"),
+        ]:
+            Expense.objects.create(
+                user=self.user, amount=amount, date=day, description=f"{category} {amount}", category=category
+            )
+        rebuild_rollups([self.user.id])
+
+    def series(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return response.data
+
+    def test_daily_buckets_are_gap_filled(self):
+        data = self.series(start_date='2024-01-01', end_date='2024-01-05')
+        self.assertEqual(data['total'], "65.50")
+        self.assertEqual(data['count'], 3)
+        self.assertEqual(data['results'], [
+            {'period': '2024-01-01', 'total': '10.00', 'count': 1},
+            {'period': '2024-01-02', 'total': '0.00', 'count': 0},
+            {'period': '2024-01-03', 'total': '55.50', 'count': 2},
+            {'period': '2024-01-04', 'total': '0.00', 'count': 0},
+            {'period': '2024-01-05', 'total': '0.00', 'count': 0},
+        ])
+
+    def test_weekly_and_monthly_buckets(self):
+        # Buckets start on Monday; expenses before start_date are not counted in the first one
+        data = self.series(interval='week', start_date='2024-01-02', end_date='2024-01-20')
+        self.assertEqual(
+            [(row['period'], row['total']) for row in data['results']],
+            [('2024-01-01', '55.50'), ('2024-01-08', '0.00'), ('2024-01-15', '0.00')],
+        )
+        data = self.series(interval='month', start_date='2023-12-15', end_date='2024-03-01')
+        self.assertEqual(
+            [(row['period'], row['count']) for row in data['results']],
+            [('2023-12', 0), ('2024-01', 3), ('2024-02', 1), ('2024-03', 0)],
+        )
+
+    def test_split_by_category_and_filters(self):
+        data = self.series(interval='month', start_date='2024-01-01', end_date='2024-02-29', group_by='category')
+        january = data['results'][0]
+        self.assertEqual(set(january['categories']), {code for code, _ in Expense.CATEGORY_CHOICES})
+        self.assertEqual(january['categories']['GROCERIES'], {'total': '25.50', 'count': 2})
+        self.assertEqual(january['categories']['HEALTH'], {'total': '0.00', 'count': 0})
+        self.assertEqual(january['total'], "65.50")
+
+        data = self.series(interval='month', start_date='2024-01-01', end_date='2024-02-29',
+                           group_by='category', category='LEISURE')
+        self.assertEqual(data['results'][0]['categories'], {'LEISURE': {'total': '40.00', 'count': 1}})
+        # Amount ranges are answered from the expense table instead of the rollups
+        data = self.series(interval='month', start_date='2024-01-01', end_date='2024-02-29', min_amount=15)
+        self.assertEqual([row['count'] for row in data['results']], [2, 1])
+
+    def test_default_range(self):
+        data = self.series(interval='week')
+        this_week = timezone.now().date() - timedelta(days=timezone.now().date().weekday())
+        self.assertEqual(len(data['results']), 12)
+        self.assertEqual(data['results'][-1]['period'], this_week.isoformat())
+
+    @override_settings(EXPENSE_CACHE_ENABLED=True)
+    def test_cached_until_next_write(self):
+        params = {'interval': 'month', 'start_date': '2024-01-01', 'end_date': '2024-02-29'}
+        response = self.client.get(self.url, params)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url, params).data, response.data)
+            not_modified = self.client.get(self.url, params, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.client.post(reverse('expense-list-create'), {
+            "amount": "1.00", "date": "2024-02-01", "category": "OTHERS",
+        }, format='json')
+        response = self.client.get(self.url, params, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][1]['count'], 2)
+
+    @override_settings(EXPENSE_CACHE_ENABLED=True)
+    def test_etag_comes_from_the_data(self):
+        params = {'interval': 'month', 'start_date': '2024-01-01', 'end_date': '2024-02-29'}
+        etag = self.client.get(self.url, params)['ETag']
+        # A worker without the cached entry computes the same ETag for the same data
+        get_cache().clear()
+        response = self.client.get(self.url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        # A write outside the range leaves the series, and so its ETag, unchanged
+        self.client.post(reverse('expense-list-create'), {
+            "amount": "1.00", "date": "2023-06-01", "category": "OTHERS",
+        }, format='json')
+        response = self.client.get(self.url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_rejects_bad_parameters(self):
+        for params in [
+            {'interval': 'year'},
+            {'group_by': 'month'},
+            {'start_date': '2024-01-01'},
+            {'start_date': '2024-02-01', 'end_date': '2024-01-01'},
+            {'start_date': '2024-01-01', 'end_date': '2999-01-01', 'interval': 'month'},
+            {'start_date': '1990-01-01', 'end_date': '2024-01-01'},
+        ]:
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+
+class BudgetTests(APITestCase):
+    """
+    Budgets keep their month's spend as a running total that every expense write updates
+    in its own transaction, so threshold checks never sum expenses.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="budgetowner", password="BudgetOwner123!",
+            email="budgetowner@example.com", first_name="Budget", last_name="Owner"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.today = timezone.now().date()
+        self.last_month = current_period() - timedelta(days=1)
+        self.list_url = reverse('budget-list-create')
+        self.detail_url = reverse('budget-detail', kwargs={'category': 'GROCERIES'})
+        self.expenses_url = reverse('expense-list-create')
+        Expense.objects.create(user=self.user, amount="20.00", date=self.today, category="GROCERIES")
+        Expense.objects.create(user=self.user, amount="500.00", date=self.last_month, category="GROCERIES")
+        response = self.client.post(self.list_url, {"category": "GROCERIES", "amount": "100.00"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+
+    def add_expense(self, amount, category="GROCERIES", date=None):
+        response = self.client.post(self.expenses_url, {
+            "amount": amount, "date": str(date or self.today), "category": category,
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data['id']
+
+    def spent(self):
+        return Budget.objects.get(user=self.user, category="GROCERIES").spent
+
+    def assertBudgetsInSync(self):
+        self.assertEqual(find_budget_drift([self.user.id]), [])
+
+    def test_create_and_validation(self):
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response.data['spent'], "20.00")
+        self.assertEqual(response.data['remaining'], "80.00")
+        self.assertEqual(response.data['threshold'], 80)
+        self.assertEqual(response.data['status'], 'ok')
+        self.assertEqual(response.data['period_start'], str(current_period()))
+
+        for body in [
+            {"category": "GROCERIES", "amount": "50.00"},
+            {"category": "LEISURE", "amount": "0"},
+            {"category": "LEISURE", "amount": "10.00", "threshold": 150},
+            {"category": "TRAVEL", "amount": "10.00"},
+        ]:
+            response = self.client.post(self.list_url, body, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, body)
+        # The category addresses the budget and can't change
+        response = self.client.patch(self.detail_url, {"category": "LEISURE", "threshold": 90}, format='json')
+        self.assertEqual((response.data['category'], response.data['threshold']), ("GROCERIES", 90))
+        self.assertEqual(len(self.client.get(self.list_url).data), 1)
+
+    def test_create_counts_spend_after_the_insert(self):
+        Expense.objects.create(user=self.user, amount="7.00", date=self.today, category="LEISURE")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.list_url, {"category": "LEISURE", "amount": "10.00"}, format='json')
+        self.assertEqual(response.data['spent'], "7.00")
+        # An expense added while the budget is created is either counted by this UPDATE or
+        # adds itself to the committed budget: never neither
+        statements = [query['sql'] for query in queries.captured_queries]
+        insert = next(i for i, sql in enumerate(statements) if sql.startswith('INSERT INTO "expenses_budget"'))
+        self.assertFalse(any('SUM(' in sql for sql in statements[:insert]))
+        self.assertTrue(any(sql.startswith('UPDATE "expenses_budget"') and 'SUM(' in sql for sql in statements[insert:]))
+        if connection.features.has_select_for_update:
+            self.assertTrue(any('FOR UPDATE' in sql for sql in statements[:insert]))
+
+    def test_running_total_follows_every_write_path(self):
+        expense_id = self.add_expense("10.00")
+        self.add_expense("99.00", date=self.last_month)
+        self.add_expense("5.00", category="LEISURE")
+        self.assertEqual(self.spent(), Decimal("30.00"))
+
+        detail = reverse('expense-detail', kwargs={'pk': expense_id})
+        self.client.patch(detail, {"amount": "15.00"}, format='json')
+        self.assertEqual(self.spent(), Decimal("35.00"))
+        self.client.patch(detail, {"category": "LEISURE"}, format='json')
+        self.assertEqual(self.spent(), Decimal("20.00"))
+        self.client.patch(detail, {"category": "GROCERIES", "date": str(self.last_month)}, format='json')
+        self.assertEqual(self.spent(), Decimal("20.00"))
+        self.client.patch(detail, {"date": str(self.today)}, format='json')
+        self.client.delete(detail)
+        self.assertEqual(self.spent(), Decimal("20.00"))
+        self.assertBudgetsInSync()
+
+        bulk_url = reverse('expense-bulk')
+        response = self.client.post(bulk_url, [
+            {"amount": "1.00", "date": str(self.today), "category": "GROCERIES"},
+            {"amount": "2.00", "date": str(self.today), "category": "GROCERIES"},
+        ], format='json')
+        self.assertEqual(self.spent(), Decimal("23.00"))
+        self.client.patch(bulk_url, {"ids": response.data['ids'], "changes": {"amount": "4.00"}}, format='json')
+        self.assertEqual(self.spent(), Decimal("28.00"))
+        self.client.delete(bulk_url, {"ids": response.data['ids']}, format='json')
+        self.assertEqual(self.spent(), Decimal("20.00"))
+
+        upload = BytesIO(f"amount,date,category\n7.50,{self.today},groceries\n".encode())
+        upload.name = 'expenses.csv'
+        self.client.post(reverse('expense-import'), {'file': upload}, format='multipart')
+        self.assertEqual(self.spent(), Decimal("27.50"))
+        self.assertBudgetsInSync()
+
+    def test_writes_do_not_sum_expenses(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.add_expense("10.00")
+        statements = [query['sql'] for query in queries]
+        # The counter UPDATE, which only sums expenses for a budget still on last month,
+        # and the threshold check, which reads the budget row
+        self.assertEqual(len([sql for sql in statements if 'expenses_budget' in sql]), 2)
+        self.assertFalse([sql for sql in statements if sql.startswith('SELECT') and 'SUM(' in sql.upper()])
+
+    def test_threshold_alerts_once_per_month(self):
+        with self.assertNoLogs('expenses.budgets', level='WARNING'):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.add_expense("50.00")
+        with self.assertLogs('expenses.budgets', level='WARNING') as logs:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.add_expense("10.00")
+        self.assertIn("Budget alert", logs.output[0])
+        self.assertEqual(self.client.get(self.detail_url).data['status'], 'warning')
+
+        with self.assertNoLogs('expenses.budgets', level='WARNING'):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.add_expense("30.00")
+        self.assertEqual(self.client.get(self.detail_url).data['status'], 'exceeded')
+
+        # Raising the limit re-arms the alert, and a threshold already crossed alerts right away
+        self.client.patch(self.detail_url, {"amount": "1000.00"}, format='json')
+        with self.assertLogs('expenses.budgets', level='WARNING'):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.put(self.detail_url, {"amount": "100.00", "threshold": 50}, format='json')
+
+    def test_new_month_recomputes_spend(self):
+        Budget.objects.filter(user=self.user).update(period_start=period_of(self.last_month), spent="999.00")
+        self.add_expense("5.00")
+        self.assertEqual(self.spent(), Decimal("25.00"))
+
+        Budget.objects.filter(user=self.user).update(period_start=period_of(self.last_month), spent="999.00")
+        response = self.client.get(self.list_url)
+        self.assertEqual(response.data[0]['spent'], "25.00")
+        self.assertEqual(response.data[0]['period_start'], str(current_period()))
+
+    def test_reconcile_command(self):
+        Budget.objects.filter(user=self.user).update(spent="1.00")
+        with self.assertRaises(CommandError):
+            call_command('reconcile_budgets', '--check', stdout=StringIO())
+        call_command('reconcile_budgets', '--user', 'budgetowner', stdout=StringIO())
+        self.assertEqual(self.spent(), Decimal("20.00"))
+        call_command('reconcile_budgets', '--check', stdout=StringIO())
+
+    def test_other_users_budgets(self):
+        other = User.objects.create_user(
+            username="budgetother", password="BudgetOther123!",
+            email="budgetother@example.com", first_name="Budget", last_name="Other"
+        )
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.client.get(self.list_url).data, [])
+        self.assertEqual(self.client.get(self.detail_url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.delete(self.detail_url).status_code, status.HTTP_404_NOT_FOUND)
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.client.delete(self.detail_url).status_code, status.HTTP_204_NO_CONTENT)
+
+
+class ExpenseBulkCreateTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="bulkuser", password="BulkPass123!",
+            email="bulkuser@example.com", first_name="Bulk", last_name="User"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('expense-bulk')
+        self.today = timezone.now().date().strftime("%Y-%m-%d")
+
+    def item(self, amount="12.50", category="GROCERIES", **extra):
+        return {"amount": amount, "date": self.today, "description": "Synced", "category": category, **extra}
+
+    def test_bulk_create(self):
+        items = [self.item(amount=f"{i + 1}.00") for i in range(250)]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, items, format='json')
+        # A few batched INSERTs and one rollup upsert, not one round trip per expense
+        self.assertLess(len(queries), 10)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 250)
+        self.assertEqual(len(response.data['ids']), 250)
+        self.assertEqual(Expense.objects.filter(user=self.user).count(), 250)
+        self.assertEqual(find_rollup_drift([self.user.id]), [])
+
+    def test_client_cannot_set_owner(self):
+        other = User.objects.create_user(username="bulkother", password="BulkPass123!")
+        response = self.client.post(self.url, [self.item(user=other.pk)], format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Expense.objects.get(pk=response.data['ids'][0]).user, self.user)
+
+    def test_atomic_mode_rejects_whole_batch(self):
+        items = [self.item(), self.item(amount="-1"), self.item(category="TRAVEL")]
+        response = self.client.post(self.url, items, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 2])
+        self.assertIn('amount', response.data['errors'][0]['errors'])
+        self.assertIn('category', response.data['errors'][1]['errors'])
+        self.assertFalse(Expense.objects.filter(user=self.user).exists())
+
+    def test_partial_mode_saves_valid_items(self):
+        items = [self.item(), self.item(amount="0"), self.item(category="LEISURE")]
+        response = self.client.post(f"{self.url}?mode=partial", items, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1])
+        self.assertEqual(Expense.objects.filter(user=self.user).count(), 2)
+
+    def test_invalid_payloads(self):
+        for payload in [{}, [], [self.item()] * (ExpenseBulkView.max_batch_size + 1)]:
+            response = self.client.post(self.url, payload, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(f"{self.url}?mode=sometimes", [self.item()], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_requires_authentication(self):
+        self.client.force_authenticate(user=None)
+        response = self.client.post(self.url, [self.item()], format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class ExpenseBulkChangeTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="bulkchange", password="BulkPass123!",
+            email="bulkchange@example.com", first_name="Bulk", last_name="Change"
+        )
+        self.other = User.objects.create_user(username="bulkchangeother", password="BulkPass123!")
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('expense-bulk')
+        today = timezone.now().date()
+        self.expenses = [
+            Expense.objects.create(
+                user=self.user, amount=10 + i, date=today - timedelta(days=i * 5),
+                description=f"Bulk {i}", category="GROCERIES" if i % 2 else "LEISURE"
+            )
+            for i in range(6)
+        ]
+        self.foreign = Expense.objects.create(
+            user=self.other, amount=99, date=today, description="Not mine", category="GROCERIES"
+        )
+        rebuild_rollups()
+
+    def assertRollupsInSync(self):
+        self.assertEqual(find_rollup_drift([self.user.id, self.other.id]), [])
+
+    def test_bulk_update_by_ids(self):
+        ids = [self.expenses[0].pk, self.expenses[1].pk, self.foreign.pk]
+        response = self.client.patch(self.url, {"ids": ids, "changes": {"category": "HEALTH"}}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['updated'], 2)
+        self.assertEqual(Expense.objects.filter(category="HEALTH").count(), 2)
+        self.foreign.refresh_from_db()
+        self.assertEqual(self.foreign.category, "GROCERIES")
+        self.assertRollupsInSync()
+
+    def test_bulk_update_by_filter(self):
+        response = self.client.patch(
+            f"{self.url}?category=GROCERIES&filter=past_month",
+            {"changes": {"amount": "7.25", "date": timezone.now().date().strftime("%Y-%m-%d")}},
+            format='json'
+        )
+        self.assertEqual(response.data['updated'], 3)
+        self.assertEqual(
+            list(Expense.objects.filter(user=self.user, amount="7.25").values_list('category', flat=True).distinct()),
+            ["GROCERIES"]
+        )
+        self.assertRollupsInSync()
+
+    def test_bulk_update_validates_changes(self):
+        ids = [self.expenses[0].pk]
+        for changes in [{"amount": "-3"}, {"category": "TRAVEL"}, {}, {"id": 5}]:
+            response = self.client.patch(self.url, {"ids": ids, "changes": changes}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, changes)
+
+    def test_bulk_delete_by_ids(self):
+        ids = [self.expenses[2].pk, self.foreign.pk]
+        response = self.client.delete(self.url, {"ids": ids}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['deleted'], 1)
+        self.assertTrue(Expense.objects.filter(pk=self.foreign.pk).exists())
+        self.assertRollupsInSync()
+
+    def test_bulk_delete_by_filter(self):
+        response = self.client.delete(f"{self.url}?category=LEISURE", format='json')
+        self.assertEqual(response.data['deleted'], 3)
+        self.assertFalse(Expense.objects.filter(user=self.user, category="LEISURE").exists())
+        self.assertRollupsInSync()
+
+    def test_selection_is_required(self):
+        response = self.client.delete(self.url, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.delete(self.url, {"ids": ["1"]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Expense.objects.count(), 7)
+
+
+class ExpenseExportTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="exportuser", password="ExportPass123!",
+            email="exportuser@example.com", first_name="Export", last_name="User"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('expense-export')
+        today = timezone.now().date()
+        Expense.objects.bulk_create(
+            Expense(
+                user=self.user, amount=f"{i}.5", date=today - timedelta(days=i),
+                description=f"Line {i}, with \"quotes\"" if i % 2 else None,
+                category="GROCERIES" if i % 3 else "HEALTH"
+            )
+            for i in range(1, 1201)
+        )
+        other = User.objects.create_user(username="exportother", password="ExportPass123!")
+        Expense.objects.create(user=other, amount=1, date=today, description="Other", category="OTHERS")
+
+    def read(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def list_data(self, query=''):
+        return self.client.get(f"{reverse('expense-list-create')}{query}", format='json').json()
+
+    def test_csv_export_matches_list_output(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+        self.assertIn('attachment', response['Content-Disposition'])
+        rows = list(csv.DictReader(StringIO(self.read(response))))
+        self.assertEqual(len(rows), 1200)
+        expected = self.list_data()
+        for row, item in zip(rows, expected):
+            self.assertEqual(row, {key: '' if value is None else str(value) for key, value in item.items()})
+
+    def test_ndjson_export_matches_list_output(self):
+        response = self.client.get(f"{self.url}?format=ndjson&ordering=amount")
+        self.assertTrue(response['Content-Type'].startswith('application/x-ndjson'))
+        lines = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual(lines, self.list_data('?ordering=amount'))
+
+    def test_export_honours_filters(self):
+        response = self.client.get(f"{self.url}?format=ndjson&filter=past_month&category=HEALTH")
+        lines = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual(len(lines), 10)
+        self.assertTrue(all(line['category'] == 'HEALTH' for line in lines))
+
+    def test_export_errors(self):
+        response = self.client.get(f"{self.url}?format=ndjson&filter=custom&start_date=bad&end_date=bad")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('detail', json.loads(response.content))
+        self.client.force_authenticate(user=None)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class ExpenseImportTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="importuser", password="ImportPass123!",
+            email="importuser@example.com", first_name="Import", last_name="User"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('expense-import')
+
+    def csv_file(self, rows, header="date,amount,category,description"):
+        content = "\n".join([header, *rows]) + "\n"
+        upload = BytesIO(content.encode('utf-8'))
+        upload.name = "expenses.csv"
+        return upload
+
+    def test_import_endpoint(self):
+        rows = [f"2024-0{i % 9 + 1}-1{i % 9},{i + 1}.25,{'Groceries' if i % 2 else 'HEALTH'},\"Row {i}, imported\"" for i in range(30)]
+        rows += ["2024-13-01,5,GROCERIES,bad date", "2024-01-01,-5,GROCERIES,", "2024-01-01,5.123,TRAVEL,"]
+        response = self.client.post(self.url, {"file": self.csv_file(rows)}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['imported'], 30)
+        self.assertEqual(response.data['rejected_count'], 3)
+        self.assertEqual([reject['line'] for reject in response.data['rejected']], [32, 33, 34])
+        self.assertIn('date', response.data['rejected'][0]['errors'])
+        self.assertEqual(set(response.data['rejected'][2]['errors']), {'amount', 'category'})
+        self.assertIn('rows_per_second', response.data)
+
+        imported = Expense.objects.filter(user=self.user)
+        self.assertEqual(imported.count(), 30)
+        self.assertEqual(imported.filter(category="GROCERIES").count(), 15)
+        self.assertTrue(imported.filter(description="Row 3, imported").exists())
+        self.assertEqual(find_rollup_drift([self.user.id]), [])
+
+    def test_import_requires_columns(self):
+        response = self.client.post(self.url, {"file": self.csv_file([], header="date,price")}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(self.url, {}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_import_command(self):
+        with NamedTemporaryFile('w', suffix='.csv', delete=False) as handle:
+            handle.write("amount,date,category\n")
+            for i in range(120):
+                handle.write(f"{i + 1},2024-05-{i % 28 + 1:02d},OTHERS\n")
+            handle.write("abc,2024-05-01,OTHERS\n")
+        self.addCleanup(os.remove, handle.name)
+
+        out = StringIO()
+        call_command('import_expenses', handle.name, '--user', 'importuser', '--batch-size', '50', stdout=out)
+        self.assertIn("Imported 120 expense(s), rejected 1", out.getvalue())
+        self.assertEqual(Expense.objects.filter(user=self.user, description__isnull=True).count(), 120)
+        self.assertEqual(find_rollup_drift([self.user.id]), [])
+
+        with self.assertRaises(CommandError):
+            call_command('import_expenses', handle.name, '--user', 'nobody', stdout=StringIO())
+
+
+class ExpenseFastListTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="fastuser", password="FastPass123!",
+            email="fastuser@example.com", first_name="Fast", last_name="User"
+        )
+        self.client.force_authenticate(user=self.user)
+        today = timezone.now().date()
+        descriptions = [None, "", "Plain", "Ünïcödé – ☕", "line\nbreak\ttab \"quoted\" \\ slash",
+                        "js \u2028 separators \u2029", "control \x01 char"]
+        for i, description in enumerate(descriptions * 3):
+            Expense.objects.create(
+                user=self.user, amount=["0.01", "10", "12345678.90", "7.5"][i % 4],
+                date=today - timedelta(days=i), description=description,
+                category=Expense.CATEGORY_CHOICES[i % 7][0]
+            )
+
+    def test_fast_path_is_byte_compatible(self):
+        """
+        The values_list() path renders exactly the bytes ExpenseSerializer + JSONRenderer did.
+        """
+        queryset = Expense.objects.filter(user=self.user).order_by('-date')
+        expected = JSONRenderer().render(ExpenseSerializer(queryset, many=True).data)
+        fast = serialize_expense_rows(queryset.values_list(*EXPENSE_COLUMNS))
+        self.assertEqual(FastJSONRenderer().render(fast), expected)
+        self.assertEqual(JSONRenderer().render(fast), expected)
+
+        response = self.client.get(reverse('expense-list-create'), HTTP_ACCEPT='application/json')
+        self.assertEqual(response.content, expected)
+
+    def test_paginated_fast_path_matches_serializer(self):
+        response = self.client.get(f"{reverse('expense-list-create')}?page_size=5&ordering=amount")
+        ids = [row['id'] for row in response.data['results']]
+        queryset = Expense.objects.filter(pk__in=ids).order_by('amount', 'id')
+        self.assertEqual(
+            JSONRenderer().render(response.data['results']),
+            JSONRenderer().render(ExpenseSerializer(queryset, many=True).data)
+        )
+
+    def test_renderer_falls_back_for_other_payloads(self):
+        renderer = FastJSONRenderer()
+        data = {"detail": ErrorDetail("Bad \u2028 input", code='invalid'), "amount": Decimal("1.50"), "n": [1, 2]}
+        self.assertEqual(renderer.render(data), JSONRenderer().render(data))
+        self.assertEqual(
+            renderer.render(data, 'application/json; indent=4'),
+            JSONRenderer().render(data, 'application/json; indent=4')
+        )
+
+
+class ExpenseConditionalRequestTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="etaguser", password="EtagPass123!",
+            email="etaguser@example.com", first_name="Etag", last_name="User"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.list_url = reverse('expense-list-create')
+        today = timezone.now().date()
+        self.expenses = [
+            Expense.objects.create(
+                user=self.user, amount=5 + i, date=today - timedelta(days=i),
+                description=f"Etag {i}", category="OTHERS"
+            )
+            for i in range(3)
+        ]
+        self.detail_url = reverse('expense-detail', kwargs={'pk': self.expenses[0].pk})
+
+    @override_settings(EXPENSE_CACHE_ENABLED=True)
+    def test_list_not_modified(self):
+        response = self.client.get(f"{self.list_url}?filter=past_month&ordering=amount")
+        etag = response['ETag']
+        self.assertNotIn('Last-Modified', response)
+
+        # Parameter order does not change the ETag; a 304 skips the body entirely
+        with self.assertNumQueries(0):
+            response = self.client.get(f"{self.list_url}?ordering=amount&filter=past_month", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+        # Without a cached response only the validators aggregate runs
+        get_cache().clear()
+        with self.assertNumQueries(1):
+            response = self.client.get(f"{self.list_url}?ordering=amount&filter=past_month", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Different filters are a different representation
+        response = self.client.get(f"{self.list_url}?ordering=-amount", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_list_etag_changes_on_writes(self):
+        etag = self.client.get(self.list_url)['ETag']
+        self.client.patch(self.detail_url, {"description": "changed"}, format='json')
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        etag = response['ETag']
+        self.client.delete(reverse('expense-detail', kwargs={'pk': self.expenses[2].pk}))
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 2)
+
+    def test_list_ignores_if_modified_since(self):
+        # A delete doesn't move max(updated_at): a date validator would keep the deleted row alive
+        self.client.get(self.list_url)
+        self.client.delete(reverse('expense-detail', kwargs={'pk': self.expenses[2].pk}))
+        response = self.client.get(self.list_url, HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 2)
+        # Details keep Last-Modified
+        last_modified = self.client.get(self.detail_url)['Last-Modified']
+        response = self.client.get(self.detail_url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_not_modified(self):
+        etag = self.client.get(self.detail_url)['ETag']
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        other_url = reverse('expense-detail', kwargs={'pk': self.expenses[1].pk})
+        self.assertEqual(self.client.get(other_url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    def test_if_match_optimistic_concurrency(self):
+        etag = self.client.get(self.detail_url)['ETag']
+
+        response = self.client.patch(self.detail_url, {"amount": "11.00"}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+        # A second writer still holding the old ETag is rejected and nothing changes
+        response = self.client.put(self.detail_url, {
+            "amount": "99.00", "date": self.expenses[0].date.strftime("%Y-%m-%d"), "category": "OTHERS",
+        }, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.expenses[0].refresh_from_db()
+        self.assertEqual(str(self.expenses[0].amount), "11.00")
+
+
+class ExpenseSparseFieldsetTests(APITestCase):
+    """
+    ?fields= and ?exclude= trim list and detail responses, and the columns left out are
+    not read from the database.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="sparseuser", password="SparsePass123!",
+            email="sparseuser@example.com", first_name="Sparse", last_name="User"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.list_url = reverse('expense-list-create')
+        today = timezone.now().date()
+        self.expenses = [
+            Expense.objects.create(
+                user=self.user, amount=5 + i, date=today - timedelta(days=i),
+                description=f"Sparse {i} " * 50, category="OTHERS"
+            )
+            for i in range(5)
+        ]
+        self.detail_url = reverse('expense-detail', kwargs={'pk': self.expenses[0].pk})
+
+    def select_sql(self, queries):
+        return [query['sql'] for query in queries if query['sql'].startswith('SELECT') and 'expenses_expense' in query['sql']]
+
+    def test_list_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.list_url, {'fields': 'id,amount,date,category'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        queryset = Expense.objects.filter(user=self.user).order_by('-date')
+        expected = ExpenseSerializer(queryset, many=True, fields=['id', 'amount', 'date', 'category']).data
+        self.assertEqual(response.content, JSONRenderer().render(expected))
+        self.assertEqual(list(response.data[0]), ['id', 'amount', 'date', 'category'])
+        self.assertFalse(any('"description"' in sql for sql in self.select_sql(queries)))
+
+        # exclude= alone, and combined with fields=; the order asked for doesn't matter
+        response = self.client.get(self.list_url, {'exclude': 'description,user'})
+        self.assertEqual(list(response.data[0]), ['id', 'amount', 'date', 'category', 'created_at', 'updated_at'])
+        response = self.client.get(f"{self.list_url}?fields=date&fields=amount&exclude=date")
+        self.assertEqual(response.data[0], {'amount': '5.00'})
+
+    def test_paginated_fields(self):
+        """
+        The cursor is built from the ordering column and id even when neither is returned.
+        """
+        response = self.client.get(self.list_url, {'fields': 'amount', 'ordering': 'date', 'page_size': 2})
+        self.assertEqual(response.data['results'], [{'amount': '9.00'}, {'amount': '8.00'}])
+        response = self.client.get(response.data['next'])
+        self.assertEqual(response.data['results'], [{'amount': '7.00'}, {'amount': '6.00'}])
+
+    def test_detail_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.detail_url, {'fields': 'amount,category'})
+        self.assertEqual(response.data, {'amount': '5.00', 'category': 'OTHERS'})
+        self.assertFalse(any('"description"' in sql for sql in self.select_sql(queries)))
+
+        # A sparse representation has its own ETag
+        full_etag = self.client.get(self.detail_url)['ETag']
+        self.assertNotEqual(response['ETag'], full_etag)
+        response = self.client.get(self.detail_url, {'fields': 'amount,category'}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get(self.detail_url, {'fields': 'amount'}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(EXPENSE_CACHE_ENABLED=True)
+    def test_cached_per_fieldset(self):
+        full = self.client.get(self.list_url).data
+        sparse = self.client.get(self.list_url, {'fields': 'id'}).data
+        self.assertEqual(sparse, [{'id': item['id']} for item in full])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.list_url, {'fields': 'id'}).data, sparse)
+
+    def test_invalid_fields(self):
+        response = self.client.get(self.list_url, {'fields': 'id,secret'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("Unknown field(s): secret", response.data['detail'])
+        response = self.client.get(self.detail_url, {'fields': 'id', 'exclude': 'id'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ExpenseResponseFormatTests(APITestCase):
+    """
+    The expense endpoints speak columnar JSON and MessagePack besides JSON, chosen by the
+    Accept header or ?format=, with the same data in every format.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="formatuser", password="FormatPass123!",
+            email="formatuser@example.com", first_name="Format", last_name="User"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.list_url = reverse('expense-list-create')
+        today = timezone.now().date()
+        for i in range(3):
+            Expense.objects.create(
+                user=self.user, amount=5 + i, date=today - timedelta(days=i),
+                description=f"Format {i}", category="OTHERS"
+            )
+        self.expected = self.client.get(self.list_url).json()
+
+    def test_columnar_list(self):
+        response = self.client.get(self.list_url, {'format': 'columnar'})
+        self.assertEqual(response['Content-Type'], 'application/vnd.expense-tracker.columnar+json')
+        columns = response.json()
+        self.assertEqual(list(columns), list(self.expected[0]))
+        self.assertEqual(columns['id'], [item['id'] for item in self.expected])
+        self.assertEqual(columns['amount'], ['5.00', '6.00', '7.00'])
+
+        page = self.client.get(
+            self.list_url, {'page_size': 2}, HTTP_ACCEPT='application/vnd.expense-tracker.columnar+json'
+        ).json()
+        self.assertEqual(page['results']['id'], columns['id'][:2])
+        self.assertIsNotNone(page['next'])
+
+        # Details and errors keep their usual shape
+        detail = self.client.get(reverse('expense-detail', args=[columns['id'][0]]), {'format': 'columnar'}).json()
+        self.assertEqual(detail, self.expected[0])
+        self.assertEqual(
+            self.client.get(self.list_url, {'format': 'columnar', 'filter': 'custom'}).json(),
+            {'detail': "[ErrorDetail(string='Both start_date and end_date are required for custom date filtering.', code='invalid')]"},
+        )
+
+    def test_etags_differ_per_format(self):
+        """
+        An ETag from one format must not make another format's request a 304, or the client
+        would decode its cached body with the wrong format.
+        """
+        detail_url = reverse('expense-detail', args=[self.expected[0]['id']])
+        for url in [self.list_url, detail_url]:
+            etag = self.client.get(url)['ETag']
+            response = self.client.get(url, {'format': 'columnar'}, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK, url)
+            self.assertNotEqual(response['ETag'], etag)
+            response = self.client.get(url, {'format': 'columnar'}, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED, url)
+
+        # Same through the Accept header, served from the list cache
+        etag = self.client.get(self.list_url, HTTP_ACCEPT='application/json')['ETag']
+        response = self.client.get(
+            self.list_url, HTTP_ACCEPT='application/vnd.expense-tracker.columnar+json', HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['id'], [item['id'] for item in self.expected])
+
+    @skipUnless(find_spec('msgpack'), "needs msgpack")
+    def test_msgpack_list_and_create(self):
+        import msgpack
+        response = self.client.get(self.list_url, HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertIn('Accept', response['Vary'])
+        self.assertEqual(msgpack.unpackb(response.content), self.expected)
+
+        body = msgpack.packb({
+            'amount': '12.50', 'date': str(timezone.now().date()), 'description': 'Packed', 'category': 'LEISURE'
+        })
+        response = self.client.post(
+            f"{self.list_url}?format=msgpack", body, content_type='application/msgpack'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(msgpack.unpackb(response.content)['description'], 'Packed')
+
+        response = self.client.post(self.list_url, b'\xc1', content_type='application/msgpack')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @skipUnless(find_spec('msgpack'), "needs msgpack")
+    async def test_async_view_negotiates(self):
+        import msgpack
+        token = await sync_to_async(lambda: str(RefreshToken.for_user(self.user).access_token))()
+        view = AsyncExpenseView.as_view()
+        factory = AsyncRequestFactory()
+        headers = {'Authorization': f'Bearer {token}'}
+        response = await view(factory.get('/', headers={**headers, 'Accept': 'application/msgpack'}))
+        self.assertEqual(msgpack.unpackb(response.content), self.expected)
+        response = await view(factory.get('/', {'format': 'columnar'}, headers=headers))
+        self.assertEqual(json.loads(response.content)['id'], [item['id'] for item in self.expected])
+        json_etag = (await view(factory.get('/', headers=headers)))['ETag']
+        self.assertNotEqual(response['ETag'], json_etag)
+        response = await view(factory.get('/', headers={**headers, 'Accept': 'application/msgpack', 'If-None-Match': json_etag}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = await view(factory.get('/', headers={**headers, 'Accept': 'text/csv'}))
+        self.assertEqual(response.status_code, status.HTTP_406_NOT_ACCEPTABLE)
+
+
+@override_settings(COMPRESSION_MIN_SIZE=200)
+class ResponseCompressionTests(APITestCase):
+    """
+    Responses above the size threshold are gzip- or brotli-encoded for clients that accept
+    it, with ETags that stay strong and still work in If-None-Match and If-Match.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="gzipuser", password="GzipPass123!",
+            email="gzipuser@example.com", first_name="Gzip", last_name="User"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.list_url = reverse('expense-list-create')
+        today = timezone.now().date()
+        self.expenses = [
+            Expense.objects.create(
+                user=self.user, amount=5 + i, date=today - timedelta(days=i % 30),
+                description=f"Compressed expense {i}", category="OTHERS"
+            )
+            for i in range(20)
+        ]
+        self.detail_url = reverse('expense-detail', args=[self.expenses[0].pk])
+
+    def test_gzip_list(self):
+        plain = self.client.get(self.list_url)
+        self.assertNotIn('Content-Encoding', plain)
+        response = self.client.get(self.list_url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertLess(int(response['Content-Length']), len(plain.content) // 3)
+        self.assertEqual(response['ETag'], plain['ETag'][:-1] + '-gzip"')
+
+    @skipUnless(find_spec('brotli'), "needs brotli")
+    def test_brotli_preferred(self):
+        import brotli
+        plain = self.client.get(self.list_url)
+        response = self.client.get(self.list_url, HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.content), plain.content)
+        response = self.client.get(self.list_url, HTTP_ACCEPT_ENCODING='br;q=0.5, gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+    def test_small_responses_not_compressed(self):
+        response = self.client.get(self.list_url, {'category': 'HEALTH'}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertNotIn('Content-Encoding', response)
+        self.assertNotIn('-gzip', response['ETag'])
+
+    def test_coded_etags_in_preconditions(self):
+        etag = self.client.get(self.list_url, HTTP_ACCEPT_ENCODING='gzip')['ETag']
+        response = self.client.get(self.list_url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+        with override_settings(COMPRESSION_MIN_SIZE=10):
+            etag = self.client.get(self.detail_url, HTTP_ACCEPT_ENCODING='gzip')['ETag']
+            self.assertTrue(etag.endswith('-gzip"'))
+            response = self.client.patch(self.detail_url, {"amount": "11.00"}, format='json', HTTP_IF_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            response = self.client.patch(self.detail_url, {"amount": "12.00"}, format='json', HTTP_IF_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+
+    def test_streamed_export(self):
+        plain = b''.join(self.client.get(reverse('expense-export')).streaming_content)
+        response = self.client.get(reverse('expense-export'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), plain)
+
+
+@override_settings(EXPENSE_CACHE_ENABLED=True)
+class ExpenseResponseCacheTests(APITestCase):
+    """
+    The list endpoint caches responses per user and data version; every write path
+    bumps the version so the next read is computed afresh.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="cacheuser", password="CachePass123!",
+            email="cacheuser@example.com", first_name="Cache", last_name="User"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.list_url = reverse('expense-list-create')
+        self.expense = Expense.objects.create(
+            user=self.user, amount=10, date=timezone.now().date(),
+            description="Cached", category="GROCERIES"
+        )
+
+    def get_list(self, query=''):
+        return self.client.get(f"{self.list_url}{query}")
+
+    @override_settings(EXPENSE_CACHE_ENABLED=False)
+    def test_off_without_a_shared_cache(self):
+        # The default with local memory: other workers would never see a write's invalidation
+        stats = list_cache.stats()
+        self.get_list()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.get_list().status_code, status.HTTP_200_OK)
+        self.assertGreater(len(queries), 0)
+        self.assertEqual(list_cache.stats(), stats)
+
+    def test_repeated_query_is_served_from_cache(self):
+        stats = list_cache.stats()
+        first = self.get_list("?filter=past_month&category=GROCERIES")
+        with self.assertNumQueries(0):
+            second = self.get_list("?category=GROCERIES&filter=past_month")
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual(list_cache.stats()['misses'], stats['misses'] + 1)
+        self.assertEqual(list_cache.stats()['hits'], stats['hits'] + 1)
+
+        # Other parameters are a separate entry, and so are paginated pages
+        self.assertEqual(self.get_list("?category=LEISURE").data, [])
+        self.assertEqual(len(self.get_list("?page_size=1").data['results']), 1)
+
+    def test_cache_is_per_user(self):
+        self.get_list()
+        other = User.objects.create_user(
+            username="othercache", password="OtherPass123!",
+            email="othercache@example.com", first_name="Other", last_name="Cache"
+        )
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.get_list().data, [])
+
+    def test_single_writes_invalidate(self):
+        self.assertEqual(len(self.get_list().data), 1)
+        response = self.client.post(self.list_url, {
+            "amount": "5.00", "date": timezone.now().date(), "description": "New", "category": "LEISURE"
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(self.get_list().data), 2)
+
+        detail_url = reverse('expense-detail', kwargs={'pk': self.expense.pk})
+        self.client.patch(detail_url, {"description": "Renamed"}, format='json')
+        self.assertIn("Renamed", [item['description'] for item in self.get_list().data])
+
+        self.client.delete(detail_url)
+        self.assertEqual(len(self.get_list().data), 1)
+
+    def test_bulk_writes_and_import_invalidate(self):
+        bulk_url = reverse('expense-bulk')
+        today = str(timezone.now().date())
+        self.get_list()
+        self.client.post(bulk_url, [
+            {"amount": "1.00", "date": today, "category": "LEISURE"},
+            {"amount": "2.00", "date": today, "category": "LEISURE"},
+        ], format='json')
+        self.assertEqual(len(self.get_list().data), 3)
+
+        self.client.patch(f"{bulk_url}?category=LEISURE", {"changes": {"category": "OTHERS"}}, format='json')
+        self.assertEqual(len(self.get_list("?category=OTHERS").data), 2)
+
+        self.client.delete(f"{bulk_url}?category=OTHERS")
+        self.assertEqual(len(self.get_list().data), 1)
+
+        upload = BytesIO(f"amount,date,category\n3.00,{today},LEISURE\n".encode('utf-8'))
+        upload.name = 'expenses.csv'
+        self.client.post(reverse('expense-import'), {'file': upload}, format='multipart')
+        self.assertEqual(len(self.get_list().data), 2)
+
+    def test_missing_version_is_not_reused(self):
+        # If the version key is evicted, entries cached under an earlier version stay unreachable
+        first = self.get_list()
+        get_cache().delete(f'expenses:version:{self.user.pk}')
+        Expense.objects.filter(pk=self.expense.pk).update(description="Changed behind the cache")
+        self.assertNotEqual(self.get_list().content, first.content)
+
+
+class ExpenseQueryBudgetTests(QueryBudgetMixin, APITestCase):
+    """
+    Every expense endpoint runs within a fixed number of queries and never repeats one.
+    """
+    budget_urlconf = expense_urls
+    query_budgets = {
+        ('expense-list-create', 'GET'): 2,
+        ('expense-list-create', 'POST'): 6,
+        ('expense-detail', 'GET'): 1,
+        ('expense-detail', 'PUT'): 10,
+        ('expense-detail', 'PATCH'): 10,
+        ('expense-detail', 'DELETE'): 7,
+        ('expense-bulk', 'POST'): 6,
+        ('expense-bulk', 'PATCH'): 6,
+        ('expense-bulk', 'DELETE'): 7,
+        ('expense-export', 'GET'): 1,
+        ('expense-import', 'POST'): 8,
+        ('expense-summary', 'GET'): 2,
+        ('expense-timeseries', 'GET'): 1,
+        ('budget-list-create', 'GET'): 2,
+        ('budget-list-create', 'POST'): 7,
+        ('budget-detail', 'GET'): 2,
+        ('budget-detail', 'PUT'): 8,
+        ('budget-detail', 'PATCH'): 9,
+        ('budget-detail', 'DELETE'): 3,
+    }
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="budgetuser", password="BudgetPass123!",
+            email="budgetuser@example.com", first_name="Budget", last_name="User"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.today = timezone.now().date()
+        self.expenses = [
+            Expense.objects.create(
+                user=self.user, amount=10 + i, date=self.today - timedelta(days=i),
+                description=f"Budget {i}", category=["GROCERIES", "LEISURE"][i % 2]
+            )
+            for i in range(6)
+        ]
+        self.detail_url = reverse('expense-detail', kwargs={'pk': self.expenses[0].pk})
+        self.payload = {"amount": "12.50", "date": str(self.today), "description": "Budgeted", "category": "HEALTH"}
+        # Writes to a budgeted category also update its spend and check its threshold
+        Budget.objects.create(user=self.user, category="HEALTH", amount=1000, period_start=current_period())
+
+    def test_list(self):
+        with self.assertQueryBudget('expense-list-create', 'GET'):
+            response = self.client.get(reverse('expense-list-create'), {'filter': 'past_month', 'page_size': 2})
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_create(self):
+        with self.assertQueryBudget('expense-list-create', 'POST'):
+            response = self.client.post(reverse('expense-list-create'), self.payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_detail(self):
+        with self.assertQueryBudget('expense-detail', 'GET'):
+            response = self.client.get(self.detail_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_update(self):
+        with self.assertQueryBudget('expense-detail', 'PUT'):
+            response = self.client.put(self.detail_url, self.payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with self.assertQueryBudget('expense-detail', 'PATCH'):
+            response = self.client.patch(self.detail_url, {"amount": "3.00"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_delete(self):
+        with self.assertQueryBudget('expense-detail', 'DELETE'):
+            response = self.client.delete(self.detail_url)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_bulk(self):
+        url = reverse('expense-bulk')
+        with self.assertQueryBudget('expense-bulk', 'POST'):
+            response = self.client.post(url, [self.payload] * 20, format='json')
+        self.assertEqual(response.data['created'], 20)
+        with self.assertQueryBudget('expense-bulk', 'PATCH'):
+            response = self.client.patch(f"{url}?category=HEALTH", {"changes": {"amount": "1.00"}}, format='json')
+        self.assertEqual(response.data['updated'], 20)
+        with self.assertQueryBudget('expense-bulk', 'DELETE'):
+            response = self.client.delete(f"{url}?category=HEALTH")
+        self.assertEqual(response.data['deleted'], 20)
+
+    def test_export(self):
+        with self.assertQueryBudget('expense-export', 'GET'):
+            response = self.client.get(reverse('expense-export'))
+            content = b''.join(response.streaming_content)
+        self.assertEqual(len(content.splitlines()), 7)
+
+    def test_import(self):
+        upload = BytesIO(f"amount,date,category\n1.00,{self.today},HEALTH\n2.00,{self.today},LEISURE\n".encode('utf-8'))
+        upload.name = 'expenses.csv'
+        with self.assertQueryBudget('expense-import', 'POST'):
+            response = self.client.post(reverse('expense-import'), {'file': upload}, format='multipart')
+        self.assertEqual(response.data['imported'], 2)
+
+    def test_summary(self):
+        rebuild_rollups([self.user.pk])
+        with self.assertQueryBudget('expense-summary', 'GET'):
+            response = self.client.get(reverse('expense-summary'), {'group_by': 'both'})
+        self.assertEqual(response.data['count'], 6)
+
+    def test_timeseries(self):
+        rebuild_rollups([self.user.pk])
+        with self.assertQueryBudget('expense-timeseries', 'GET'):
+            response = self.client.get(reverse('expense-timeseries'), {'interval': 'month', 'group_by': 'category'})
+        self.assertEqual(response.data['count'], 6)
+
+    def test_budgets(self):
+        with self.assertQueryBudget('budget-list-create', 'POST'):
+            response = self.client.post(reverse('budget-list-create'), {"category": "GROCERIES", "amount": "50"})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        with self.assertQueryBudget('budget-list-create', 'GET'):
+            self.assertEqual(len(self.client.get(reverse('budget-list-create')).data), 2)
+
+        url = reverse('budget-detail', kwargs={'category': 'GROCERIES'})
+        with self.assertQueryBudget('budget-detail', 'GET'):
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+        with self.assertQueryBudget('budget-detail', 'PUT'):
+            self.assertEqual(self.client.put(url, {"amount": "100"}).status_code, status.HTTP_200_OK)
+        with self.assertQueryBudget('budget-detail', 'PATCH'):
+            self.assertEqual(self.client.patch(url, {"threshold": 30}).status_code, status.HTTP_200_OK)
+        with self.assertQueryBudget('budget-detail', 'DELETE'):
+            self.assertEqual(self.client.delete(url).status_code, status.HTTP_204_NO_CONTENT)
+
+    @override_settings(QUERY_PROFILING=True)
+    def test_profiling_headers(self):
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response['X-DB-Query-Count'], '1')
+        self.assertEqual(response['X-DB-Duplicate-Queries'], '0')
+        self.assertIn('X-DB-Time-Ms', response)
+        self.assertTrue(response['Server-Timing'].startswith('db;dur='))
+
+
+@skipUnless(metrics.prometheus_client is not None, "prometheus_client is not installed")
+@override_settings(METRICS_PUBLIC=True)
+class MetricsEndpointTests(APITestCase):
+    """
+    /metrics exposes per-route request, latency, size, database and serialization metrics.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="metricsuser", password="MetricsPass123!",
+            email="metricsuser@example.com", first_name="Metrics", last_name="User"
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def sample(self, name, **labels):
+        return metrics.prometheus_client.REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_requests_are_recorded(self):
+        labels = {'route': 'expense-list-create', 'method': 'GET'}
+        before = self.sample('http_requests_total', status='200', **labels)
+        latency_before = self.sample('http_request_duration_seconds_count', **labels)
+        serialization_before = self.sample('serialization_duration_seconds_count', route='expense-list-create')
+
+        self.client.get(reverse('expense-list-create'), {'filter': 'past_week'})
+        self.assertEqual(self.sample('http_requests_total', status='200', **labels), before + 1)
+        self.assertEqual(self.sample('http_request_duration_seconds_count', **labels), latency_before + 1)
+        self.assertEqual(
+            self.sample('serialization_duration_seconds_count', route='expense-list-create'), serialization_before + 1
+        )
+        self.assertGreater(self.sample('http_response_size_bytes_sum', **labels), 0)
+
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        content = response.content.decode()
+        self.assertIn('http_request_db_seconds_bucket{', content)
+        self.assertIn('route="expense-list-create"', content)
+
+    @override_settings(EXPENSE_CACHE_ENABLED=True)
+    def test_cache_lookups_are_recorded(self):
+        url = reverse('expense-list-create')
+        hits = self.sample('response_cache_lookups_total', cache='list', result='hit')
+        misses = self.sample('response_cache_lookups_total', cache='list', result='miss')
+        self.client.get(url, {'category': 'TRAVEL'})
+        self.client.get(url, {'category': 'TRAVEL'})
+        self.assertEqual(self.sample('response_cache_lookups_total', cache='list', result='miss'), misses + 1)
+        self.assertEqual(self.sample('response_cache_lookups_total', cache='list', result='hit'), hits + 1)
+        self.assertIn('response_cache_lookups_total{', self.client.get('/metrics').content.decode())
+
+    def test_unmatched_routes_share_one_label(self):
+        before = self.sample('http_requests_total', route='unmatched', method='GET', status='404')
+        self.client.get('/no/such/page/')
+        self.assertEqual(self.sample('http_requests_total', route='unmatched', method='GET', status='404'), before + 1)
+
+    @skipUnless(connection.vendor == 'postgresql' and find_spec('psycopg_pool'), "needs PostgreSQL and psycopg_pool")
+    def test_pool_stats(self):
+        pooled = connection
+        if connection.pool is None:
+            # A pooled copy of the test connection; the alias must exist for contrib.postgres' type lookups
+            pooled = connection.copy()
+            pooled.settings_dict['OPTIONS']['pool'] = {'min_size': 1, 'max_size': 2}
+            self.addCleanup(pooled.close_pool)
+            self.addCleanup(pooled.close)
+        before = self.sample('db_pool_events_total', alias='default', stat='requests_num')
+        with pooled.cursor() as cursor:
+            cursor.execute("SELECT 1")
+
+        metrics.record_pool_stats('default', pooled.pool)
+        self.assertEqual(self.sample('db_pool', alias='default', stat='pool_max'), pooled.pool.max_size)
+        self.assertGreaterEqual(self.sample('db_pool', alias='default', stat='pool_size'), 1)
+        if pooled is not connection:
+            self.assertEqual(self.sample('db_pool_events_total', alias='default', stat='requests_num'), before + 1)
+
+    @override_settings(METRICS_TOKEN='scrape-secret')
+    def test_token_protects_endpoint(self):
+        self.assertEqual(self.client.get('/metrics').status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong-secret')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(METRICS_PUBLIC=False)
+    def test_private_without_a_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, status.HTTP_403_FORBIDDEN)
+        with override_settings(METRICS_TOKEN='scrape-secret'):
+            response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-secret')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class LoggingPipelineTests(APITestCase):
+    """
+    Log records are queued and written by a background thread as JSON lines carrying the
+    request's id, user and elapsed time; a full queue drops records instead of blocking.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="loguser", password="LogPass123!",
+            email="loguser@example.com", first_name="Log", last_name="User"
+        )
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.filename = os.path.join(directory.name, 'test.log')
+        self.logger = logging.getLogger('expense_tracker.tests.logging')
+        self.logger.propagate = False
+        self.addCleanup(setattr, self.logger, 'propagate', True)
+
+    def make_handler(self, **options):
+        handler = log.QueueLogHandler(self.filename, console=False, **options)
+        self.logger.addHandler(handler)
+        self.addCleanup(handler.close)
+        self.addCleanup(self.logger.removeHandler, handler)
+        return handler
+
+    def read_lines(self, filename=None):
+        with open(filename or self.filename, encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+
+    def test_request_id_header(self):
+        self.client.force_authenticate(user=self.user)
+        url = reverse('expense-list-create')
+        generated = self.client.get(url)['X-Request-ID']
+        self.assertRegex(generated, r'^[0-9a-f]{32}$')
+        self.assertEqual(self.client.get(url, HTTP_X_REQUEST_ID='abc-123')['X-Request-ID'], 'abc-123')
+        self.assertNotEqual(self.client.get(url, HTTP_X_REQUEST_ID='bad id\n')['X-Request-ID'], 'bad id\n')
+
+    def test_json_lines_with_request_fields(self):
+        handler = self.make_handler()
+        request = RequestFactory().get('/api/v1/expenses/')
+        request.user = self.user
+        token = log.current_request.set(log.RequestContext('req-1', request))
+        try:
+            self.logger.info("Loaded %d expenses", 3, extra={'route': 'expense-list-create'})
+            try:
+                raise ValueError("boom")
+            except ValueError as e:
+                self.logger.error("Unexpected error in %s: %s", 'get', e, exc_info=e)
+        finally:
+            log.current_request.reset(token)
+        self.logger.warning("Outside a request")
+        handler.flush()
+
+        info, error, outside = self.read_lines()
+        self.assertEqual(info['message'], "Loaded 3 expenses")
+        self.assertEqual(info['level'], 'INFO')
+        self.assertEqual((info['request_id'], info['user_id'], info['route']), ('req-1', self.user.pk, 'expense-list-create'))
+        self.assertGreaterEqual(info['elapsed_ms'], 0)
+        self.assertEqual(error['message'], "Unexpected error in get: boom")
+        self.assertIn('ValueError: boom', error['exception'])
+        self.assertNotIn('request_id', outside)
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        handler = self.make_handler(queue_size=2)
+        file_handler = handler.targets[0]
+        # Hold the writer up so the queue fills; logging must still return at once
+        with file_handler.lock:
+            for index in range(10):
+                self.logger.warning("Record %d", index)
+            self.assertGreaterEqual(handler.dropped, 7)
+        handler.flush()
+        handler.stop()
+
+        lines = self.read_lines()
+        written = [line for line in lines if line['message'].startswith('Record')]
+        self.assertEqual(len(written) + handler.dropped, 10)
+        self.assertEqual(lines[-1]['message'], f"Log queue full: dropped {handler.dropped} records ({handler.dropped} since start)")
+
+    def test_rotates_by_size(self):
+        handler = self.make_handler(max_bytes=500, backup_count=2)
+        for index in range(6):
+            self.logger.warning("Record %d %s", index, 'x' * 100)
+            handler.flush()
+        self.assertTrue(os.path.exists(f'{self.filename}.1'))
+        self.assertTrue(os.path.exists(f'{self.filename}.2'))
+        self.assertFalse(os.path.exists(f'{self.filename}.3'))
+        self.assertLessEqual(os.path.getsize(self.filename), 500)
+        self.assertEqual(self.read_lines()[-1]['message'], f"Record 5 {'x' * 100}")
+
+    def test_rotation_limit_counts_bytes(self):
+        # Each record is about 145 characters but 225 bytes: two must not fit in 400 bytes
+        handler = log.BatchRotatingFileHandler(self.filename, maxBytes=400, backupCount=5, encoding='utf-8')
+        handler.setFormatter(log.JSONFormatter())
+        self.addCleanup(handler.close)
+        for index in range(4):
+            handler.emit_batch([logging.makeLogRecord({'msg': f"Record {index} {'€' * 40}"})])
+        for filename in (self.filename, f'{self.filename}.1', f'{self.filename}.2'):
+            self.assertLessEqual(os.path.getsize(filename), 400)
+
+    def test_handlers_sharing_a_file_rotate_it_once(self):
+        # Two handlers on one file stand in for two worker processes
+        handlers = []
+        for _ in range(2):
+            handler = log.BatchRotatingFileHandler(self.filename, maxBytes=400, backupCount=20, encoding='utf-8')
+            handler.setFormatter(log.JSONFormatter())
+            self.addCleanup(handler.close)
+            handlers.append(handler)
+        for index in range(20):
+            handlers[index % 2].emit_batch([logging.makeLogRecord({'msg': f"Record {index} {'x' * 50}"})])
+
+        # Two records fit in a file: each rollover by one handler is seen by the other, so
+        # there are ten files, oldest backup first, with every record once and in order
+        files = [f'{self.filename}.{n}' for n in range(20, 0, -1) if os.path.exists(f'{self.filename}.{n}')]
+        files.append(self.filename)
+        self.assertEqual(len(files), 10)
+        messages = [line['message'] for filename in files for line in self.read_lines(filename)]
+        self.assertEqual(messages, [f"Record {index} {'x' * 50}" for index in range(20)])
+        for filename in files:
+            self.assertLessEqual(os.path.getsize(filename), 400)
+
+
+class AsyncExpenseViewTests(APITestCase):
+    """
+    AsyncExpenseView answers exactly like ExpenseView: reads on the async ORM, writes
+    through ExpenseView's handlers in a worker thread.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="asyncuser", password="AsyncPass123!",
+            email="asyncuser@example.com", first_name="Async", last_name="User"
+        )
+        self.other = User.objects.create_user(
+            username="asyncother", password="OtherPass123!",
+            email="asyncother@example.com", first_name="Async", last_name="Other"
+        )
+        today = timezone.now().date()
+        for day, category, description in [(1, "GROCERIES", "Weekly shop"), (3, "LEISURE", "Cinema tickets"),
+                                            (3, "HEALTH", "Pharmacy"), (40, "GROCERIES", "Bakery")]:
+            Expense.objects.create(
+                user=self.user, amount=10 + day, date=today - timedelta(days=day),
+                description=description, category=category
+            )
+        self.expense = Expense.objects.filter(user=self.user).order_by('pk').first()
+        self.other_expense = Expense.objects.create(
+            user=self.other, amount=5, date=today, description="Not yours", category="OTHERS"
+        )
+        rebuild_rollups()
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+        self.factory = AsyncRequestFactory()
+        self.view = AsyncExpenseView.as_view()
+
+    async def call(self, method, path='/', data=None, pk=None, token=True, headers=None):
+        headers = dict(headers or {})
+        if token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        if data is not None:
+            request = getattr(self.factory, method)(
+                path, json.dumps(data), content_type='application/json', headers=headers
+            )
+        else:
+            request = getattr(self.factory, method)(path, headers=headers)
+        return await (self.view(request, pk=pk) if pk is not None else self.view(request))
+
+    async def sync_get(self, path):
+        await get_cache().aclear()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        response = await sync_to_async(self.client.get)(path)
+        await get_cache().aclear()
+        return response
+
+    async def test_list_matches_sync_view(self):
+        list_url = reverse('expense-list-create')
+        for query in ['', '?filter=past_month&ordering=amount', '?search=pharmacy', '?page_size=2&ordering=-amount',
+                      '?fields=id,amount', '?page_size=2&ordering=date&exclude=date,description']:
+            response = await self.call('get', f'{list_url}{query}')
+            expected = await self.sync_get(f'{list_url}{query}')
+            self.assertEqual(response.status_code, status.HTTP_200_OK, query)
+            self.assertEqual(response.content, expected.content, query)
+            self.assertEqual(response['ETag'], expected['ETag'], query)
+
+    async def test_pagination_cursor(self):
+        first = json.loads((await self.call('get', '/?page_size=3')).content)
+        self.assertEqual(len(first['results']), 3)
+        query = first['next'].split('?', 1)[1]
+        second = json.loads((await self.call('get', f'/?{query}')).content)
+        self.assertEqual(len(second['results']), 1)
+        self.assertIsNone(second['next'])
+
+    async def test_detail_and_conditional_requests(self):
+        response = await self.call('get', pk=self.expense.pk)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(response.content), ExpenseSerializer(self.expense).data)
+        not_modified = await self.call('get', pk=self.expense.pk, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+        sparse = await self.call('get', '/?fields=id,category', pk=self.expense.pk)
+        self.assertEqual(json.loads(sparse.content), {'id': self.expense.pk, 'category': self.expense.category})
+
+        listed = await self.call('get')
+        self.assertEqual(
+            (await self.call('get', headers={'If-None-Match': listed['ETag']})).status_code, status.HTTP_304_NOT_MODIFIED
+        )
+
+    async def test_errors(self):
+        response = await self.call('get', token=False)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn('Bearer', response['WWW-Authenticate'])
+        self.assertEqual((await self.call('get', pk=self.other_expense.pk)).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual((await self.call('get', '/?filter=custom')).status_code, status.HTTP_400_BAD_REQUEST)
+        invalid = await self.call('post', data={'amount': '-1', 'date': '2024-01-01', 'category': 'OTHERS'})
+        self.assertEqual(invalid.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_writes_keep_rollups_and_cache_in_sync(self):
+        await self.call('get')
+        created = await self.call('post', data={
+            'amount': '12.50', 'date': str(timezone.now().date()), 'description': 'Async', 'category': 'UTILITIES',
+        })
+        self.assertEqual(created.status_code, status.HTTP_201_CREATED)
+        created_id = json.loads(created.content)['id']
+        self.assertEqual(len(json.loads((await self.call('get')).content)), 5)
+
+        patched = await self.call('patch', data={'amount': '20.00'}, pk=created_id)
+        self.assertEqual(patched.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(patched.content)['amount'], '20.00')
+        self.assertEqual((await self.call('put', data={'amount': '1'}, pk=created_id)).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        self.assertEqual((await self.call('delete', pk=self.other_expense.pk)).status_code,
+                         status.HTTP_404_NOT_FOUND)
+        self.assertEqual((await self.call('delete', pk=created_id)).status_code, status.HTTP_204_NO_CONTENT)
+
+        self.assertEqual(len(json.loads((await self.call('get')).content)), 4)
+        self.assertEqual(await sync_to_async(find_rollup_drift)(), [])
+
+    @skipUnless(metrics.prometheus_client is not None, "prometheus_client is not installed")
+    async def test_metrics_middleware_records_async_queries(self):
+        middleware = metrics.MetricsMiddleware(self.view)
+        self.assertTrue(middleware.async_mode)
+        labels = {'route': 'unmatched', 'method': 'GET'}
+        sample = metrics.prometheus_client.REGISTRY.get_sample_value
+        before = sample('http_request_db_queries_sum', labels) or 0
+        request = self.factory.get('/', headers={'Authorization': f'Bearer {self.token}'})
+        response = await middleware(request)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertGreater(sample('http_request_db_queries_sum', labels), before)
+
+
+class SeedExpensesCommandTests(APITestCase):
+    """
+    seed_expenses generates deterministic, valid data and keeps the rollups and budgets in sync.
+    """
+    def test_seeds_users_and_expenses(self):
+        out = StringIO()
+        call_command('seed_expenses', users=3, expenses=500, batch_size=200, seed=7, stdout=out)
+        self.assertIn("Seeded 500 expense(s) for 3 user(s)", out.getvalue())
+
+        users = User.objects.filter(username__startswith='seed').order_by('pk')
+        self.assertEqual(users.count(), 3)
+        self.assertEqual(Expense.objects.count(), 500)
+        for user in users:
+            self.assertGreaterEqual(Expense.objects.filter(user=user).count(), 166)
+        categories = {code for code, _ in Expense.CATEGORY_CHOICES}
+        self.assertTrue(set(Expense.objects.values_list('category', flat=True)) <= categories)
+        self.assertFalse(Expense.objects.filter(amount__lte=0).exists())
+        self.assertFalse(Expense.objects.filter(date__gt=timezone.now().date()).exists())
+        self.assertEqual(find_rollup_drift(), [])
+
+        # Running again reuses the users and adds more expenses
+        call_command('seed_expenses', users=3, expenses=100, stdout=StringIO())
+        self.assertEqual(User.objects.filter(username__startswith='seed').count(), 3)
+        self.assertEqual(Expense.objects.count(), 600)
+
+    def test_reconciles_budgets(self):
+        user = User.objects.create_user(username='seed0', password='SeedPass123!')
+        budget = Budget.objects.create(user=user, category='GROCERIES', amount=1000, period_start=current_period())
+        call_command('seed_expenses', users=1, expenses=300, days=1, stdout=StringIO())
+
+        budget.refresh_from_db()
+        self.assertGreater(budget.spent, 0)
+        self.assertEqual(find_budget_drift([user.pk]), [])
+
+    def test_generation_is_deterministic(self):
+        today = timezone.now().date()
+        rows = list(ExpenseGenerator(seed=1, today=today).rows(0, 100, [1, 2], 0))
+        self.assertEqual(rows, list(ExpenseGenerator(seed=1, today=today).rows(0, 100, [1, 2], 0)))
+        self.assertNotEqual(rows, list(ExpenseGenerator(seed=2, today=today).rows(0, 100, [1, 2], 0)))
+        self.assertEqual([row[0] for row in rows[:4]], [1, 2, 1, 2])
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(CommandError):
+            call_command('seed_expenses', users=0, stdout=StringIO())
+
+
+@skipUnless(connection.vendor == 'postgresql', "partitioning needs PostgreSQL")
+class ExpensePartitionTests(APITestCase):
+    """
+    expense_partitions converts the expense table to monthly partitions and back without
+    changing what the API returns, and date filters only scan the partitions they need.
+    The DDL runs inside the test transaction, so each test starts from a plain table.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="partitionuser", password="PartitionPass123!",
+            email="partitionuser@example.com", first_name="Partition", last_name="User"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.today = timezone.now().date()
+        for days in [0, 10, 45, 100, 400]:
+            Expense.objects.create(
+                user=self.user, amount=days + 1, date=self.today - timedelta(days=days),
+                description=f"Lunch {days}", category="GROCERIES"
+            )
+        rebuild_rollups()
+        self.list_url = reverse('expense-list-create')
+
+    def convert(self, *args):
+        out = StringIO()
+        call_command('expense_partitions', 'convert', *args, stdout=out)
+        return out.getvalue()
+
+    def test_convert_keeps_rows_and_api(self):
+        before = self.client.get(self.list_url).content
+        last_id = Expense.objects.order_by('-id').values_list('id', flat=True).first()
+        self.assertIn("Partitioned expenses_expense by month", self.convert())
+        self.assertTrue(partitions.is_partitioned())
+        get_cache().clear()
+        self.assertEqual(self.client.get(self.list_url).content, before)
+
+        response = self.client.post(self.list_url, {
+            'amount': '5.00', 'date': str(self.today), 'description': 'Dinner', 'category': 'LEISURE'
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertGreater(response.data['id'], last_id)
+        self.assertEqual(len(self.client.get(self.list_url, {'search': 'dinner'}).data), 1)
+
+        # Moving an expense to another month moves it to another partition
+        moved = self.client.patch(
+            reverse('expense-detail', args=[response.data['id']]),
+            {'date': str(self.today - timedelta(days=200))}, format='json'
+        )
+        self.assertEqual(moved.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.delete(reverse('expense-detail', args=[last_id])).status_code,
+                         status.HTTP_204_NO_CONTENT)
+        self.assertEqual(Expense.objects.count(), 5)
+        self.assertEqual(find_rollup_drift(), [])
+
+        call_command('expense_partitions', 'revert', stdout=StringIO())
+        self.assertFalse(partitions.is_partitioned())
+        self.assertEqual(Expense.objects.count(), 5)
+
+    def test_date_filters_prune_partitions(self):
+        self.convert()
+        filters = ExpenseFilterMixin()
+        past_month = filters.apply_filters(Expense.objects.filter(user=self.user), {'filter': 'past_month'})
+        scanned = partitions.scanned_partitions(past_month)
+        old = partitions.partition_name(partitions.interval_start(self.today - timedelta(days=100), 'month'), 'month')
+        current = partitions.partition_name(partitions.interval_start(self.today, 'month'), 'month')
+        self.assertIn(current, scanned)
+        self.assertNotIn(old, scanned)
+        self.assertLess(len(scanned), len(partitions.list_partitions()))
+
+        custom = filters.apply_filters(Expense.objects.all(), {
+            'filter': 'custom', 'start_date': str(self.today - timedelta(days=100)),
+            'end_date': str(self.today - timedelta(days=100)),
+        })
+        self.assertEqual(partitions.scanned_partitions(custom), [old])
+
+    def test_maintain_creates_and_detaches(self):
+        self.convert('--ahead', '0', '--since', str(self.today - timedelta(days=60)))
+        self.assertEqual(Expense.objects.count(), 5)
+        out = StringIO()
+        call_command('expense_partitions', 'maintain', '--ahead', '2', '--retain', '1', stdout=out)
+        output = out.getvalue()
+        upcoming = partitions.next_start(partitions.interval_start(self.today, 'month'), 'month')
+        self.assertIn(f"Created {partitions.partition_name(upcoming, 'month')}", output)
+        self.assertIn("Detached", output)
+
+        # Rows in detached months leave the table and the summaries; older rows stay in the default partition
+        cutoff = partitions.interval_start(partitions.interval_start(self.today, 'month') - timedelta(days=1), 'month')
+        self.assertFalse(Expense.objects.filter(date__gte=self.today - timedelta(days=60), date__lt=cutoff).exists())
+        self.assertTrue(Expense.objects.filter(date=self.today - timedelta(days=400)).exists())
+        self.assertEqual(find_rollup_drift(), [])
+
+    def test_not_partitioned(self):
+        with self.assertRaises(CommandError):
+            call_command('expense_partitions', 'maintain', stdout=StringIO())
+        self.assertIn("not partitioned", self.call_status())
+
+    def call_status(self):
+        out = StringIO()
+        call_command('expense_partitions', 'status', stdout=out)
+        return out.getvalue()
+
+
+@skipUnless(connection.vendor == 'postgresql', "read replicas are PostgreSQL only")
+@override_settings(DATABASE_REPLICAS=['replica_test'])
+class ReadReplicaTests(APITestCase):
+    """
+    Expense list, detail and summary reads go to a replica unless the user wrote recently
+    or the replica is lagging or unreachable; writes always go to the primary.
+
+    The replica is a second connection to the test database. It can't see the rows the test
+    hasn't committed, so it behaves like a replica that hasn't replayed them yet.
+    """
+    replica = 'replica_test'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Added after the test case set up its databases, so the replica stays outside its transaction
+        settings_dict = {**connections['default'].settings_dict, 'TEST': {'MIRROR': 'default'}}
+        settings_dict['OPTIONS'] = {
+            name: value for name, value in settings_dict['OPTIONS'].items() if name != 'pool'
+        }
+        connections.settings[cls.replica] = settings_dict
+        cls.databases = cls.databases | {cls.replica}
+
+    @classmethod
+    def tearDownClass(cls):
+        connections[cls.replica].close()
+        del connections[cls.replica]
+        del connections.settings[cls.replica]
+        cls.databases = cls.databases - {cls.replica}
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="replicauser", password="ReplicaPass123!",
+            email="replicauser@example.com", first_name="Replica", last_name="User"
+        )
+        self.expense = Expense.objects.create(
+            user=self.user, amount=12, date=timezone.now().date(), description="Lunch", category="GROCERIES"
+        )
+        rebuild_rollups()
+        self.client.force_authenticate(user=self.user)
+        self.list_url = reverse('expense-list-create')
+        db_router.replica_health.checked.clear()
+        # Creating the user and the expense pinned them to the primary
+        get_cache().delete(db_router.pin_key(self.user.pk))
+
+    def replica_queries(self):
+        return CaptureQueriesContext(connections[self.replica])
+
+    def test_reads_use_replica(self):
+        with self.replica_queries() as queries:
+            self.assertEqual(self.client.get(self.list_url).data, [])
+            detail = self.client.get(reverse('expense-detail', args=[self.expense.pk]))
+            summary = self.client.get(reverse('expense-summary'))
+        self.assertEqual(detail.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(summary.data['count'], 0)
+        self.assertGreater(len(queries), 0)
+
+    def test_writes_pin_user_to_primary(self):
+        with self.replica_queries() as queries:
+            response = self.client.post(self.list_url, {
+                'amount': '5.00', 'date': str(timezone.now().date()), 'description': 'Dinner', 'category': 'LEISURE'
+            }, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.assertTrue(db_router.is_pinned(self.user.pk))
+            self.assertEqual(len(self.client.get(self.list_url).data), 2)
+            detail = self.client.get(reverse('expense-detail', args=[response.data['id']]))
+        self.assertEqual(detail.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries), 0)
+
+    @override_settings(DB_PRIMARY_STICKY_SECONDS=0)
+    def test_unpinned_reads_can_be_stale(self):
+        self.client.post(self.list_url, {
+            'amount': '5.00', 'date': str(timezone.now().date()), 'description': 'Dinner', 'category': 'LEISURE'
+        }, format='json')
+        self.assertFalse(db_router.is_pinned(self.user.pk))
+        self.assertEqual(self.client.get(self.list_url).data, [])
+
+    @override_settings(DB_REPLICA_MAX_LAG=-1, DB_REPLICA_CHECK_INTERVAL=60)
+    def test_lagging_replica_falls_back_to_primary(self):
+        with self.assertLogs('expense_tracker.db_router', 'WARNING'):
+            self.assertEqual(len(self.client.get(self.list_url).data), 1)
+        checked = db_router.replica_health.checked[self.replica]
+        self.assertEqual(checked[1], 0.0)
+        # The lag is measured once per check interval, not per request
+        with self.replica_queries() as queries:
+            self.assertEqual(len(self.client.get(self.list_url, {'category': 'GROCERIES'}).data), 1)
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(db_router.replica_health.checked[self.replica], checked)
+
+    def test_unreachable_replica_falls_back_to_primary(self):
+        replica = connections[self.replica]
+        replica.close()
+        host = replica.settings_dict['HOST']
+        replica.settings_dict['HOST'] = '/nonexistent'
+        try:
+            with self.assertLogs('expense_tracker.db_router', 'WARNING'):
+                response = self.client.get(self.list_url)
+        finally:
+            replica.settings_dict['HOST'] = host
+        self.assertEqual(len(response.data), 1)
+        self.assertIsNone(db_router.replica_health.checked[self.replica][1])
+
+    async def test_async_view_reads_use_replica(self):
+        token = await sync_to_async(lambda: str(RefreshToken.for_user(self.user).access_token))()
+        request = AsyncRequestFactory().get('/', headers={'Authorization': f'Bearer {token}'})
+        response = await AsyncExpenseView.as_view()(request)
+        self.assertEqual(json.loads(response.content), [])
+
+    def test_router_keeps_writes_and_migrations_on_primary(self):
+        router = db_router.ReplicaRouter()
+        with db_router.request_routing():
+            self.assertEqual(db_router.use_replica(self.user.pk), self.replica)
+            self.assertEqual(router.db_for_read(Expense), self.replica)
+            self.assertEqual(router.db_for_write(Expense), 'default')
+        self.assertEqual(router.db_for_read(Expense), 'default')
+        self.assertFalse(router.allow_migrate(self.replica, 'expenses'))
+        self.assertIsNone(router.allow_migrate('default', 'expenses'))
+
+
+class DeploymentCheckTests(SimpleTestCase):
+    """
+    System checks reject caches that only work in one process where workers must share them.
+    """
+    def check_ids(self):
+        return [error.id for error in checks.check_replica_pins(None)]
+
+    def test_response_cache_in_local_memory_warns(self):
+        with override_settings(EXPENSE_CACHE_ENABLED=True):
+            self.assertEqual([error.id for error in checks.check_response_cache(None)], ['expense_tracker.W001'])
+        with override_settings(EXPENSE_CACHE_ENABLED=False):
+            self.assertEqual(checks.check_response_cache(None), [])
+
+    def test_user_cache_in_local_memory_warns(self):
+        with override_settings(AUTH_USER_CACHE_ENABLED=True):
+            self.assertEqual([error.id for error in checks.check_user_cache(None)], ['expense_tracker.W002'])
+        with override_settings(AUTH_USER_CACHE_ENABLED=False):
+            self.assertEqual(checks.check_user_cache(None), [])
+
+    def test_replica_pins_need_a_shared_cache(self):
+        self.assertEqual(self.check_ids(), [])
+        with override_settings(DATABASE_REPLICAS=['replica_1']):
+            self.assertEqual(self.check_ids(), ['expense_tracker.E001'])
+            with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}):
+                self.assertEqual(self.check_ids(), [])
@@ -0,0 +1,70 @@
+from datetime import timedelta
+
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+
+#Database truncation for each interval; weeks start on Monday in every backend.
+INTERVALS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+#The range covered when no start_date/end_date is given, in intervals ending today.
+DEFAULT_PERIODS = {
+    'day': 30,
+    'week': 12,
+    'month': 12,
+}
+
+
+def truncate(interval, date):
+    """
+    Start of the bucket `date` falls in, as the database's Trunc* computes it.
+    """
+    if interval == 'week':
+        return date - timedelta(days=date.weekday())
+    if interval == 'month':
+        return date.replace(day=1)
+    return date
+
+
+def next_bucket(interval, start):
+    if interval == 'day':
+        return start + timedelta(days=1)
+    if interval == 'week':
+        return start + timedelta(weeks=1)
+    return (start + timedelta(days=32)).replace(day=1)
+
+
+def bucket_starts(interval, start_date, end_date):
+    """
+    Every bucket from the one containing start_date to the one containing end_date, so
+    periods without expenses are returned too.
+    """
+    bucket = truncate(interval, start_date)
+    while bucket <= end_date:
+        yield bucket
+        bucket = next_bucket(interval, bucket)
+
+
+def count_buckets(interval, start_date, end_date):
+    first, last = truncate(interval, start_date), truncate(interval, end_date)
+    if interval == 'day':
+        return (last - first).days + 1
+    if interval == 'week':
+        return (last - first).days // 7 + 1
+    return (last.year - first.year) * 12 + last.month - first.month + 1
+
+
+def default_range(interval, today):
+    """
+    The last DEFAULT_PERIODS[interval] buckets up to and including today.
+    """
+    start = truncate(interval, today)
+    for _ in range(DEFAULT_PERIODS[interval] - 1):
+        start = truncate(interval, start - timedelta(days=1))
+    return start, today
+
+
+def format_period(interval, bucket):
+    return bucket.strftime('%Y-%m') if interval == 'month' else bucket.isoformat()
@@ -1,7 +1,26 @@
+from django.conf import settings
 from django.urls import path
-from .views import ExpenseView
+from .async_views import AsyncExpenseView
+from .views import (
+    ExpenseView,
+    ExpenseSummaryView,
+    ExpenseTimeSeriesView,
+    ExpenseBulkView,
+    ExpenseExportView,
+    ExpenseImportView,
+    BudgetView,
+)
+
+expense_view = (AsyncExpenseView if settings.ASYNC_EXPENSE_VIEWS else ExpenseView).as_view()
 
 urlpatterns = [
-    path('', ExpenseView.as_view(), name='expense-list-create'),
-    path('<int:pk>/', ExpenseView.as_view(), name='expense-detail'),
+    path('', expense_view, name='expense-list-create'),
+    path('bulk/', ExpenseBulkView.as_view(), name='expense-bulk'),
+    path('export/', ExpenseExportView.as_view(), name='expense-export'),
+    path('import/', ExpenseImportView.as_view(), name='expense-import'),
+    path('summary/', ExpenseSummaryView.as_view(), name='expense-summary'),
+    path('timeseries/', ExpenseTimeSeriesView.as_view(), name='expense-timeseries'),
+    path('<int:pk>/', expense_view, name='expense-detail'),
+    path('budgets/', BudgetView.as_view(), name='budget-list-create'),
+    path('budgets/<str:category>/', BudgetView.as_view(), name='budget-detail'),
 ] 
\ No newline at end of file
@@ -1,15 +1,37 @@
 from rest_framework.views import APIView
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, SAFE_METHODS
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.exceptions import ValidationError, NotFound, PermissionDenied
-from django.db.models import Q
-from .models import Expense
-from .serializers import ExpenseSerializer
+from rest_framework.exceptions import APIException, ValidationError, NotFound, PermissionDenied
+from rest_framework.parsers import MultiPartParser
+from rest_framework.renderers import BrowsableAPIRenderer
+from .models import Budget, Expense, ExpenseRollup
+from .serializers import BudgetSerializer, ExpenseSerializer, EXPENSE_FIELDS, expense_columns, serialize_expense_rows
+from .renderers import EXPENSE_RENDERERS
+from .parsers import EXPENSE_PARSERS
+from .pagination import ExpenseKeysetPagination
+from .search import search_expenses
+from .rollups import RollupDelta
+from .budgets import roll_over
+from .export import CSVStreamRenderer, NDJSONStreamRenderer, export_rows
+from .importer import ExpenseImporter
+from .timeseries import INTERVALS, bucket_starts, count_buckets, default_range, format_period
+from .cache import invalidate_user, list_cache, timeseries_cache
+from expense_tracker.db_router import request_routing, use_replica
+from expense_tracker.metrics import observe_serialization
+from .conditional import check_preconditions, data_etag, expense_validators, list_validators, set_validators
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
 from django.utils import timezone
 from datetime import timedelta, datetime
+import csv
+import io
 import logging
+from contextlib import nullcontext
 from functools import wraps
+from operator import itemgetter
 
 logger = logging.getLogger(__name__)
 
@@ -17,46 +39,72 @@ def handle_exceptions_and_ownership(func):
     @wraps(func)
     def wrapper(self, request, *args, **kwargs):
         try:
-            if kwargs.get('pk') is not None:
-                expense = self.get_object(kwargs['pk'])
-                if expense.user != request.user:
+            if kwargs.get('pk') is None:
+                return func(self, request, *args, **kwargs)
+
+            # Fetch the expense once and pass the verified instance to the view method.
+            # Writes lock the row and run inside the same transaction, so precondition
+            # checks and rollup deltas see the row exactly as it is saved.
+            write = request.method not in SAFE_METHODS
+            with transaction.atomic() if write else nullcontext():
+                expense = self.get_object(kwargs['pk'], lock=write)
+                if expense.user_id != request.user.pk:
                     raise PermissionDenied("You do not have permission to access this expense.")
-                #kwargs['expense'] = expense  # Pass the verified expense to the view method
-            
-            return func(self, request, *args, **kwargs)
-        except ValidationError as e:
-            return Response(
-                {"detail": str(e)},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        except NotFound as e:
-            return Response(
-                {"detail": str(e)},
-                status=status.HTTP_404_NOT_FOUND
-            )
-        except PermissionDenied as e:
-            return Response(
-                {"detail": str(e)},
-                status=status.HTTP_403_FORBIDDEN
-            )
+                return func(self, request, *args, expense=expense, **kwargs)
         except Exception as e:
-            logger.error(f"Unexpected error in {func.__name__}: {str(e)}", exc_info=True)
-            return Response(
-                {"detail": f"An error occurred while {func.__name__.replace('_', ' ')}."},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+            return exception_response(e, func.__name__)
     return wrapper
 
-class ExpenseView(APIView):
-    permission_classes = [IsAuthenticated]
+def exception_response(e, action):
+    """
+    The error response for an exception raised by the view method named `action`.
+    """
+    if isinstance(e, ValidationError):
+        return Response(
+            {"detail": str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if isinstance(e, NotFound):
+        return Response(
+            {"detail": str(e)},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    if isinstance(e, PermissionDenied):
+        return Response(
+            {"detail": str(e)},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    if isinstance(e, APIException):
+        # Request-level errors such as an unparseable body (400) or an unsupported media type (415)
+        return Response(
+            {"detail": str(e)},
+            status=e.status_code
+        )
+    logger.error("Unexpected error in %s: %s", action, e, exc_info=e)
+    return Response(
+        {"detail": f"An error occurred while {action.replace('_', ' ')}."},
+        status=status.HTTP_500_INTERNAL_SERVER_ERROR
+    )
 
-    def get_object(self, pk=None):
-        try:
-            if pk is None:
-                return Expense.objects.filter(user=self.request.user)
-            return Expense.objects.get(pk=pk, user=self.request.user)
-        except Expense.DoesNotExist:
-            raise NotFound("Expense not found.")
+class ReplicaReadMixin:
+    """
+    Serve the view's safe requests from a read replica once the user is authenticated,
+    unless they wrote recently (see expense_tracker.db_router).
+    """
+    def dispatch(self, request, *args, **kwargs):
+        with request_routing():
+            return super().dispatch(request, *args, **kwargs)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS:
+            use_replica(request.user.pk)
+
+class ExpenseFilterMixin:
+    """
+    Query parameter filtering shared by the expense list and the endpoints that aggregate it.
+    """
+    filter_params = ['filter', 'search', 'category', 'min_amount', 'max_amount']
 
     def validate_date_range(self, start_date_str, end_date_str):
         try:
@@ -96,10 +144,7 @@ class ExpenseView(APIView):
         # Apply search
         search = params.get('search')
         if search:
-            queryset = queryset.filter(
-                Q(description__icontains=search) | 
-                Q(category__icontains=search)
-            )
+            queryset = search_expenses(queryset, search)
         
         # Apply category filter
         category = params.get('category')
@@ -116,51 +161,575 @@ class ExpenseView(APIView):
         
         return queryset
 
+class ExpenseListMixin(ExpenseFilterMixin):
+    """
+    Ordering and sparse fieldset rules of the expense list and detail, shared by the sync
+    and async views.
+    """
+    pagination_class = ExpenseKeysetPagination
+    ordering_fields = ['date', 'amount', 'created_at']
+
+    def get_fields(self, params):
+        """
+        The fields picked by ?fields= and/or ?exclude= (comma-separated, repeatable), in
+        ExpenseSerializer order, or None for all of them.
+        """
+        requested = {
+            name: [field.strip() for value in params.getlist(name) for field in value.split(',') if field.strip()]
+            for name in ('fields', 'exclude')
+        }
+        if not (requested['fields'] or requested['exclude']):
+            return None
+        unknown = [name for name in requested['fields'] + requested['exclude'] if name not in EXPENSE_FIELDS]
+        if unknown:
+            raise ValidationError(
+                f"Unknown field(s): {', '.join(unknown)}. Choose from: {', '.join(EXPENSE_FIELDS)}."
+            )
+        fields = [
+            name for name in EXPENSE_FIELDS
+            if (not requested['fields'] or name in requested['fields']) and name not in requested['exclude']
+        ]
+        if not fields:
+            raise ValidationError("fields and exclude leave no field to return.")
+        return fields
+
+    def only_fields(self, queryset, fields):
+        """
+        Defer the columns `fields` leaves out, keeping the owner and updated_at that the
+        ownership check and the validators read.
+        """
+        if fields is None:
+            return queryset
+        return queryset.only('user_id', 'updated_at', *expense_columns(fields))
+
+    def get_keyset_ordering(self, params, fields=None):
+        """
+        The ordering to paginate on, the columns to read page rows with, and how to read
+        the (value, id) position from such a row. The columns are those of `fields`, then
+        any the position needs that weren't asked for.
+        """
+        # Keyset pagination needs a whitelisted ordering to seek on
+        ordering = params.get('ordering')
+        if ordering is None or ordering.lstrip('-') not in self.ordering_fields:
+            ordering = '-date'
+        columns = expense_columns(fields)
+        columns = columns + [column for column in (ordering.lstrip('-'), 'id') if column not in columns]
+        return ordering, columns, itemgetter(columns.index(ordering.lstrip('-')), columns.index('id'))
+
+    def order_list(self, queryset, params):
+        ordering = params.get('ordering')
+        if ordering is None and params.get('search'):
+            # Rank search results by relevance unless an explicit ordering was asked for
+            return queryset.order_by('-search_rank', '-date', '-id')
+        ordering = ordering or '-date'
+        if ordering.lstrip('-') in self.ordering_fields:
+            queryset = queryset.order_by(ordering)
+        return queryset
+
+class ExpenseView(ReplicaReadMixin, ExpenseListMixin, APIView):
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [*EXPENSE_RENDERERS, BrowsableAPIRenderer]
+    parser_classes = EXPENSE_PARSERS
+
+    def get_object(self, pk=None, lock=False):
+        try:
+            if pk is None:
+                return Expense.objects.filter(user=self.request.user)
+            if lock:
+                queryset = Expense.objects.select_for_update()
+            else:
+                queryset = self.only_fields(Expense.objects.all(), self.get_fields(self.request.query_params))
+            return queryset.get(pk=pk, user=self.request.user)
+        except Expense.DoesNotExist:
+            raise NotFound("Expense not found.")
+
     @handle_exceptions_and_ownership
-    def get(self, request, pk=None):
-        queryset = self.get_object(pk)
-        
+    def get(self, request, pk=None, expense=None):
+        fields = self.get_fields(request.query_params)
         if pk is None:
+            # Serve repeated list queries from the per-user cache without touching the database
+            cache_key = list_cache.key(request)
+            cached = list_cache.get(cache_key)
+            if cached is not None:
+                data, etag = cached
+                not_modified = check_preconditions(request, etag, None)
+                if not_modified is not None:
+                    return not_modified
+                return set_validators(Response(data, status=status.HTTP_200_OK), etag, None)
+
             # Apply filters
-            queryset = self.apply_filters(queryset, request.query_params)
+            queryset = self.apply_filters(self.get_object(), request.query_params)
+
+            # Answer conditional requests before running the list query or serializing.
+            # Lists have no Last-Modified: it can't reflect deletes (see list_validators)
+            etag, last_modified = list_validators(queryset, request), None
+            not_modified = check_preconditions(request, etag, None)
+            if not_modified is not None:
+                return not_modified
             
             # Apply ordering
-            ordering = request.query_params.get('ordering', '-date')
-            if ordering.lstrip('-') in ['date', 'amount', 'created_at']:
-                queryset = queryset.order_by(ordering)
-            
-            serializer = ExpenseSerializer(queryset, many=True)
+            paginator = self.pagination_class()
+            if paginator.is_requested(request):
+                ordering, columns, position = self.get_keyset_ordering(request.query_params, fields)
+                page = paginator.paginate_queryset(
+                    queryset.values_list(*columns), request, view=self,
+                    ordering=ordering, position=position
+                )
+                with observe_serialization(request):
+                    response = paginator.get_paginated_response(serialize_expense_rows(page, fields))
+                list_cache.set(cache_key, (response.data, etag))
+                return set_validators(response, etag, None)
+
+            queryset = self.order_list(queryset, request.query_params)
+
+            # Read-optimised path: plain column tuples instead of model instances
+            with observe_serialization(request):
+                data = serialize_expense_rows(queryset.values_list(*expense_columns(fields)), fields)
+            list_cache.set(cache_key, (data, etag))
 
         else:
-            serializer = ExpenseSerializer(queryset)
+            etag, last_modified = expense_validators(expense, request, fields)
+            not_modified = check_preconditions(request, etag, last_modified)
+            if not_modified is not None:
+                return not_modified
+            with observe_serialization(request):
+                data = ExpenseSerializer(expense, fields=fields).data
         
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return set_validators(Response(data, status=status.HTTP_200_OK), etag, last_modified)
 
     @handle_exceptions_and_ownership
     def post(self, request):
         serializer = ExpenseSerializer(data=request.data, context={'request': request})
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        with observe_serialization(request):
+            serializer.is_valid(raise_exception=True)
+        expense = serializer.save()
+        return set_validators(Response(serializer.data, status=status.HTTP_201_CREATED), *expense_validators(expense, request))
+
+    @handle_exceptions_and_ownership
+    def put(self, request, pk, expense):
+        return self.update(request, expense, partial=False)
+
+    @handle_exceptions_and_ownership
+    def patch(self, request, pk, expense):
+        return self.update(request, expense, partial=True)
+
+    def update(self, request, expense, partial):
+        # The row is locked until the save commits, so If-Match / If-Unmodified-Since
+        # checks give clients optimistic concurrency control
+        precondition_failed = check_preconditions(request, *expense_validators(expense, request))
+        if precondition_failed is not None:
+            return precondition_failed
+        serializer = ExpenseSerializer(expense, data=request.data, partial=partial, context={'request': request})
+        with observe_serialization(request):
+            serializer.is_valid(raise_exception=True)
+        expense = serializer.save()
+        return set_validators(Response(serializer.data, status=status.HTTP_200_OK), *expense_validators(expense, request))
+
+    @handle_exceptions_and_ownership
+    def delete(self, request, pk, expense):
+        delta = RollupDelta(expense.user_id)
+        delta.remove(expense)
+        expense.delete()
+        delta.apply()
+        invalidate_user(expense.user_id)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+class RollupAggregateMixin(ExpenseFilterMixin):
+    """
+    Aggregates of the user's expenses served from the incrementally maintained
+    ExpenseRollup table. Filters the rollups cannot answer (search and amount ranges)
+    fall back to aggregating the expense table.
+    """
+    raw_only_params = ['search', 'min_amount', 'max_amount']
+
+    def get_queryset(self, params):
+        """
+        The filtered rows to aggregate, with the total and count aggregates to use on them.
+        """
+        if any(params.get(name) for name in self.raw_only_params):
+            queryset = Expense.objects.filter(user=self.request.user)
+            total, count = Sum('amount'), Count('id')
+        else:
+            queryset = ExpenseRollup.objects.filter(user=self.request.user)
+            total, count = Sum('total'), Sum('count')
+        return self.apply_filters(queryset, params), total, count
+
+class ExpenseSummaryView(ReplicaReadMixin, RollupAggregateMixin, APIView):
+    """
+    Totals and counts of the user's expenses grouped by category, month, or both.
+    """
+    permission_classes = [IsAuthenticated]
+    group_by_choices = {
+        'category': ['category'],
+        'month': ['month'],
+        'both': ['month', 'category'],
+    }
+
+    @handle_exceptions_and_ownership
+    def get(self, request):
+        group_by = request.query_params.get('group_by', 'category')
+        if group_by not in self.group_by_choices:
+            raise ValidationError(f"group_by must be one of: {', '.join(self.group_by_choices)}.")
+        fields = self.group_by_choices[group_by]
+
+        queryset, total, count = self.get_queryset(request.query_params)
+        overall = queryset.aggregate(sum_total=total, sum_count=count)
+        groups = (
+            queryset.annotate(month=TruncMonth('date'))
+            .values(*fields)
+            .annotate(sum_total=total, sum_count=count)
+            .filter(sum_count__gt=0)
+            .order_by(*fields)
+        )
+
+        results = []
+        for group in groups:
+            row = {}
+            if 'month' in group:
+                row['month'] = group['month'].strftime('%Y-%m')
+            if 'category' in group:
+                row['category'] = group['category']
+            row['total'] = f"{group['sum_total']:.2f}"
+            row['count'] = group['sum_count']
+            results.append(row)
+
+        return Response({
+            'total': f"{overall['sum_total'] or 0:.2f}",
+            'count': overall['sum_count'] or 0,
+            'results': results,
+        }, status=status.HTTP_200_OK)
+
+
+class ExpenseTimeSeriesView(ReplicaReadMixin, RollupAggregateMixin, APIView):
+    """
+    Spending per day, week or month between start_date and end_date, optionally split by
+    category, for charts.
+
+    Buckets are computed in the database with TruncDay/TruncWeek/TruncMonth, and buckets
+    without expenses are filled in with zeros. Responses are cached per user and query
+    until the user's next write.
+    """
+    permission_classes = [IsAuthenticated]
+    group_by_choices = ['category']
+    series_filter_params = ['search', 'category', 'min_amount', 'max_amount']
+    max_buckets = 3700
+
+    def get_range(self, params, interval):
+        start_date, end_date = params.get('start_date'), params.get('end_date')
+        if not (start_date or end_date):
+            return default_range(interval, timezone.now().date())
+        if not (start_date and end_date):
+            raise ValidationError("Provide both start_date and end_date, or neither.")
+        return self.validate_date_range(start_date, end_date)
+
+    @handle_exceptions_and_ownership
+    def get(self, request):
+        params = request.query_params
+        interval = params.get('interval', 'day')
+        if interval not in INTERVALS:
+            raise ValidationError(f"interval must be one of: {', '.join(INTERVALS)}.")
+        group_by = params.get('group_by')
+        if group_by is not None and group_by not in self.group_by_choices:
+            raise ValidationError(f"group_by must be one of: {', '.join(self.group_by_choices)}.")
+        start_date, end_date = self.get_range(params, interval)
+        if count_buckets(interval, start_date, end_date) > self.max_buckets:
+            raise ValidationError(
+                f"The range spans more than {self.max_buckets} {interval} buckets; use a longer interval."
+            )
+
+        cache_key = timeseries_cache.key(request)
+        cached = timeseries_cache.get(cache_key)
+        if cached is None:
+            data = self.get_series(params, interval, group_by, start_date, end_date)
+            cached = (data, data_etag('timeseries', data, request))
+            timeseries_cache.set(cache_key, cached)
+        data, etag = cached
+        not_modified = check_preconditions(request, etag, None)
+        if not_modified is not None:
+            return not_modified
+        return set_validators(Response(data, status=status.HTTP_200_OK), etag, None)
+
+    def get_series(self, params, interval, group_by, start_date, end_date):
+        queryset, total, count = self.get_queryset({name: params.get(name) for name in self.series_filter_params})
+        fields = ['bucket'] + ([group_by] if group_by else [])
+        groups = (
+            queryset.filter(date__range=[start_date, end_date])
+            .annotate(bucket=INTERVALS[interval]('date'))
+            .values(*fields)
+            .annotate(sum_total=total, sum_count=count)
+            .order_by()
+        )
+        sums = {}
+        for group in groups:
+            sums[(group['bucket'], group.get(group_by))] = (group['sum_total'] or 0, group['sum_count'] or 0)
+
+        category = params.get('category')
+        categories = [category] if category else [code for code, _ in Expense.CATEGORY_CHOICES]
+        results = []
+        for bucket in bucket_starts(interval, start_date, end_date):
+            if group_by:
+                split = {code: sums.get((bucket, code), (0, 0)) for code in categories}
+                bucket_total = sum(value[0] for value in split.values())
+                bucket_count = sum(value[1] for value in split.values())
+            else:
+                bucket_total, bucket_count = sums.get((bucket, None), (0, 0))
+            row = {
+                'period': format_period(interval, bucket),
+                'total': f"{bucket_total:.2f}",
+                'count': bucket_count,
+            }
+            if group_by:
+                row['categories'] = {
+                    code: {'total': f"{value[0]:.2f}", 'count': value[1]} for code, value in split.items()
+                }
+            results.append(row)
+
+        return {
+            'interval': interval,
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat(),
+            'total': f"{sum(value[0] for value in sums.values()):.2f}",
+            'count': sum(value[1] for value in sums.values()),
+            'results': results,
+        }
+
+class ExpenseBulkView(ExpenseFilterMixin, APIView):
+    """
+    Batched expense ingestion and set-based bulk changes.
+
+    POST a JSON array of expenses. Every item is validated with the ExpenseSerializer
+    rules in one pass and the valid ones are inserted with a single bulk_create in one
+    transaction. With ?mode=atomic (the default) any invalid item rejects the whole
+    batch; with ?mode=partial the valid items are saved and the invalid ones reported.
+
+    PATCH and DELETE select the user's expenses either by an "ids" list in the body or
+    by the list endpoint's filter query parameters, and run as one UPDATE/DELETE.
+    """
+    permission_classes = [IsAuthenticated]
+    parser_classes = EXPENSE_PARSERS
+    max_batch_size = 5000
+    modes = ['atomic', 'partial']
+
+    def validate_items(self, request):
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError("Expected a JSON array of expenses.")
+        if not items:
+            raise ValidationError("The expense array is empty.")
+        if len(items) > self.max_batch_size:
+            raise ValidationError(f"A batch can contain at most {self.max_batch_size} expenses.")
+
+        # One serializer instance validates every item, as ListSerializer would,
+        # but keeps the valid items instead of discarding the batch on the first error.
+        serializer = ExpenseSerializer(context={'request': request})
+        valid, errors = [], []
+        for index, item in enumerate(items):
+            try:
+                valid.append(serializer.run_validation(item))
+            except ValidationError as e:
+                errors.append({"index": index, "errors": e.detail})
+        return valid, errors
 
     @handle_exceptions_and_ownership
-    def put(self, request, pk):
-        expense = self.get_object(pk)
-        serializer = ExpenseSerializer(expense, data=request.data, context={'request': request})
+    def post(self, request):
+        mode = request.query_params.get('mode', 'atomic')
+        if mode not in self.modes:
+            raise ValidationError(f"mode must be one of: {', '.join(self.modes)}.")
+
+        valid, errors = self.validate_items(request)
+        if errors and (mode == 'atomic' or not valid):
+            return Response({"created": 0, "ids": [], "errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        expenses = [Expense(user=request.user, **data) for data in valid]
+        delta = RollupDelta(request.user.pk)
+        for expense in expenses:
+            delta.add(expense)
+        with transaction.atomic():
+            Expense.objects.bulk_create(expenses, batch_size=1000)
+            delta.apply()
+            invalidate_user(request.user.pk)
+
+        return Response({
+            "created": len(expenses),
+            "ids": [expense.pk for expense in expenses],
+            "errors": errors,
+        }, status=status.HTTP_201_CREATED)
+
+    def get_selection(self, request):
+        """
+        The user's expenses chosen by an "ids" list in the body or by filter query parameters.
+        One of the two is required so a bare request can never touch every expense.
+        """
+        queryset = Expense.objects.filter(user=request.user)
+        ids = request.data.get('ids') if isinstance(request.data, dict) else None
+        if ids is not None:
+            if not isinstance(ids, list) or not all(isinstance(pk, int) and not isinstance(pk, bool) for pk in ids):
+                raise ValidationError("ids must be a list of integers.")
+            if len(ids) > self.max_batch_size:
+                raise ValidationError(f"A batch can contain at most {self.max_batch_size} ids.")
+            queryset = queryset.filter(pk__in=ids)
+        elif not any(request.query_params.get(name) for name in self.filter_params):
+            raise ValidationError("Provide an ids list or at least one filter parameter.")
+        return self.apply_filters(queryset, request.query_params)
+
+    def rollup_delta(self, queryset, changes=None):
+        """
+        Rollup change for updating the selected rows with `changes`, or deleting them when
+        changes is None, computed from one GROUP BY over the selection before the write.
+        """
+        delta = RollupDelta(self.request.user.pk)
+        groups = queryset.values('date', 'category').annotate(
+            group_total=Sum('amount'), group_count=Count('id')
+        ).order_by()
+        for group in groups:
+            date, category = group['date'], group['category']
+            total, count = group['group_total'], group['group_count']
+            delta.add_amount(date, category, -total, count=-count)
+            if changes is not None:
+                new_total = changes['amount'] * count if 'amount' in changes else total
+                delta.add_amount(changes.get('date', date), changes.get('category', category), new_total, count=count)
+        return delta
+
+    @handle_exceptions_and_ownership
+    def patch(self, request):
+        changes = request.data.get('changes') if isinstance(request.data, dict) else None
+        if not isinstance(changes, dict) or not changes:
+            raise ValidationError("changes must be an object with the fields to update.")
+        serializer = ExpenseSerializer(data=changes, partial=True, context={'request': request})
         serializer.is_valid(raise_exception=True)
-        serializer.save()
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        changes = serializer.validated_data
+        if not changes:
+            raise ValidationError("changes does not contain any updatable field.")
+
+        queryset = self.get_selection(request)
+        with transaction.atomic():
+            delta = None
+            if changes.keys() & {'amount', 'date', 'category'}:
+                delta = self.rollup_delta(queryset, changes)
+            # update() bypasses auto_now, so stamp updated_at explicitly
+            updated = queryset.update(**changes, updated_at=timezone.now())
+            if delta is not None:
+                delta.apply()
+            invalidate_user(request.user.pk)
+        return Response({"updated": updated}, status=status.HTTP_200_OK)
 
     @handle_exceptions_and_ownership
-    def patch(self, request, pk):
-        expense = self.get_object(pk)
-        serializer = ExpenseSerializer(expense, data=request.data, partial=True, context={'request': request})
+    def delete(self, request):
+        queryset = self.get_selection(request)
+        with transaction.atomic():
+            delta = self.rollup_delta(queryset)
+            deleted, _ = queryset.delete()
+            delta.apply()
+            invalidate_user(request.user.pk)
+        return Response({"deleted": deleted}, status=status.HTTP_200_OK)
+
+
+class ExpenseExportView(ExpenseFilterMixin, APIView):
+    """
+    Stream every expense matching the list filters as CSV (default) or NDJSON.
+    Pick the format with ?format=csv|ndjson or the Accept header.
+    """
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [CSVStreamRenderer, NDJSONStreamRenderer]
+    ordering_fields = ExpenseView.ordering_fields
+
+    @handle_exceptions_and_ownership
+    def get(self, request):
+        queryset = self.apply_filters(Expense.objects.filter(user=request.user), request.query_params)
+        ordering = request.query_params.get('ordering', '-date')
+        if ordering.lstrip('-') not in self.ordering_fields:
+            ordering = '-date'
+        direction = '-' if ordering.startswith('-') else ''
+        queryset = queryset.order_by(ordering, f'{direction}id')
+
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.stream(export_rows(queryset)),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}',
+        )
+        response['Content-Disposition'] = f'attachment; filename="{renderer.filename}"'
+        return response
+
+
+class ExpenseImportView(APIView):
+    """
+    Import expenses from an uploaded CSV file (multipart field "file") with
+    amount, date, category and optional description columns.
+    """
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser]
+
+    @handle_exceptions_and_ownership
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise ValidationError("Upload the CSV as the 'file' field of a multipart request.")
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        try:
+            report = ExpenseImporter(request.user).run(stream)
+        except (ValueError, UnicodeDecodeError, csv.Error) as e:
+            raise ValidationError(f"Could not import the file: {e}")
+        return Response(report, status=status.HTTP_201_CREATED)
+
+
+
+class BudgetView(APIView):
+    """
+    The user's monthly spending limits per category: GET lists them and POST creates one.
+    A budget is addressed by its category, e.g. /budgets/GROCERIES/.
+
+    Each budget reports its spend in the current month, kept as a running total updated by
+    every expense write, and its status against its alert threshold.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        budgets = Budget.objects.filter(user=self.request.user)
+        # Budgets untouched since last month start the new one here
+        roll_over(budgets)
+        return budgets
+
+    def get_object(self, category, lock=False):
+        queryset = self.get_queryset()
+        if lock:
+            queryset = queryset.select_for_update()
+        try:
+            return queryset.get(category=category.upper())
+        except Budget.DoesNotExist:
+            raise NotFound("Budget not found.")
+
+    @handle_exceptions_and_ownership
+    def get(self, request, category=None):
+        if category is None:
+            data = BudgetSerializer(self.get_queryset().order_by('category'), many=True).data
+        else:
+            data = BudgetSerializer(self.get_object(category)).data
+        return Response(data, status=status.HTTP_200_OK)
+
+    @handle_exceptions_and_ownership
+    def post(self, request):
+        serializer = BudgetSerializer(data=request.data, context={'request': request})
         serializer.is_valid(raise_exception=True)
         serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @handle_exceptions_and_ownership
+    def put(self, request, category):
+        return self.update(request, category, partial=False)
+
+    @handle_exceptions_and_ownership
+    def patch(self, request, category):
+        return self.update(request, category, partial=True)
+
+    def update(self, request, category, partial):
+        with transaction.atomic():
+            budget = self.get_object(category, lock=True)
+            serializer = BudgetSerializer(budget, data=request.data, partial=partial, context={'request': request})
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @handle_exceptions_and_ownership
-    def delete(self, request, pk):
-        expense = self.get_object(pk)
-        expense.delete()
+    def delete(self, request, category):
+        self.get_object(category).delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
@@ -0,0 +1,38 @@
+#Gunicorn settings: gunicorn -c gunicorn.conf.py
+#ASGI mode: GUNICORN_WORKER_CLASS=uvicorn_worker.UvicornWorker ASYNC_EXPENSE_VIEWS=True gunicorn -c gunicorn.conf.py
+import os
+import shutil
+
+#Module-level names are read as gunicorn settings (including `config`), so plain os.environ is used here.
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 3))
+
+#The default sync workers serve the WSGI application, one request at a time per worker.
+#uvicorn workers serve the ASGI application, where async views wait on the database
+#without holding the worker (set ASYNC_EXPENSE_VIEWS=True to route to them).
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'sync')
+wsgi_app = os.environ.get(
+    'GUNICORN_APP',
+    'expense_tracker.asgi:application' if 'uvicorn' in worker_class.lower() else 'expense_tracker.wsgi:application',
+)
+
+#prometheus_client multiprocess mode: each worker writes its metrics to files in this directory
+#and /metrics sums them, so a scrape sees all workers no matter which one answers it.
+#Must be set before the workers import prometheus_client, i.e. here in the master.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/expense_tracker_metrics')
+
+try:
+    from prometheus_client import multiprocess
+except ImportError:
+    multiprocess = None
+
+
+def on_starting(server):
+    #Samples left over from a previous run would be added to the new totals.
+    shutil.rmtree(os.environ['PROMETHEUS_MULTIPROC_DIR'], ignore_errors=True)
+    os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'])
+
+
+def child_exit(server, worker):
+    if multiprocess is not None:
+        multiprocess.mark_process_dead(worker.pid)